@@ -2,72 +2,91 @@
 Implementação do protocolo E-LEACH
 '''
 import math
-import random
-from collections import defaultdict
-
-# --- Constantes de Energia baseadas no artigo do EESRA para comparação leal (https://ieeexplore.ieee.org/document/8765561) ---
-E_ELEC = 50e-9      # J/bit (Energia para eletrônica)
-E_FS = 10e-12       # J/bit/m² (Energia para espaço livre)
-E_MP = 0.0013e-12   # J/bit/m^4 (Energia para multi-percurso)
-D_THRESHOLD = 75   # Metros (Limiar de distância para modelo de energia)
-E_DA = 5e-9         # J/bit (Energia para agregação de dados)
-PACKET_SIZE = 2000  # bits (Tamanho do pacote)
-INITIAL_ENERGY = 2.0 # Joules (Energia inicial dos nós)
-P = 0.3             # Probabilidade de um nó se tornar CH (fixa)
-E_SENSE = 8e-5    #Joules por segundo (energia do sensoriamento)
-E_SLEEP = 15e-10  #Joules por intervalor de sleep
-NETWORK_FUNCTIONAL_THRESHOLD = 0.12
+from array import array
+
+from agrupamento import IncrementalClusters
+from aleatorio import make_rng
+from custos import cost_cache_for
+from espacial import QuadTreeIndex
+from parametros import DEFAULT_PARAMS
+from registro import ROUND, make_log
+from retencao import make_stores
+from topologia import read_coordinates_from_file
+from metricas import SimulationResult, make_sink
+from retomada import capture_simulation, make_checkpointer, restore_simulation
+from perfil import make_profiler
 
 # A rede é modelada em forma de um grafo ponderado. A classe SensorNode é considerada o vértice do grafo
 # e a aresta é calculada dinâmicamente baseado na distância entre ERB, CH ou Sensor comum.
 class SensorNode:
-    def __init__(self, node_id, x, y, base_station):
+    # __slots__ elimina o __dict__ de cada instância e as leituras ficam num buffer de floats de 8 bytes
+    # (array('d')) em vez de uma lista de objetos float. Os membros de um CH são guardados como índices
+    # (array('l') de node_id), e sensores que não são CH compartilham a tupla vazia
+    __slots__ = ('node_id', 'x', 'y', 'base_station', 'costs', 'params', 'energy', 'data', 'alive',
+                 'is_cluster_head', 'cluster_head', 'member_nodes', 'last_ch_round', 'is_direct', 'rounds_alive')
+
+    def __init__(self, node_id, x, y, base_station, costs=None, params=DEFAULT_PARAMS):
         self.node_id = node_id
         self.x = x
         self.y = y
         self.base_station = base_station
-        self.energy = INITIAL_ENERGY
-        self.data = []
+        self.costs = costs
+        self.params = params
+        self.energy = self.params.INITIAL_ENERGY
+        self.data = array('d')
         self.alive = True
         self.is_cluster_head = False
         self.cluster_head = None
-        self.member_nodes = []
+        self.member_nodes = ()
         self.last_ch_round = -1
         self.is_direct = False
         self.rounds_alive = 0
 
     # Calcula a distância euclidiana entre dois sensores no plano catersiano (x, y), conforme as posições passadas no dataset
+    # Quando existe um cache de custos de enlace, a distância é consultada nele
     def distance_to(self, other):
+        if self.costs is not None:
+            if other is self.base_station:
+                return self.costs.distance_to_bs(self.node_id)
+            return self.costs.distance(self.node_id, other.node_id)
         return math.sqrt((self.x - other.x)**2 + (self.y - other.y)**2)
     
     def sleep_mode(self):
-        self.energy -= E_SLEEP
+        self.energy -= self.params.E_SLEEP
         return
 
     # Calcula a energia necessária para transmitir dados a partir do tamanho do pacote e distância
     def transmit_energy(self, k, d):
-        if d <= D_THRESHOLD:
-            return k * (E_ELEC + E_FS * d**2)
+        if d <= self.params.D_THRESHOLD:
+            return k * (self.params.E_ELEC + self.params.E_FS * d**2)
         else:
-            return k * (E_ELEC + E_MP * d**4)
+            return k * (self.params.E_ELEC + self.params.E_MP * d**4)
+
+    # Energia para transmitir k bits até outro sensor ou a ERB, consultando o cache de custos quando disponível
+    def transmit_energy_to(self, k, other):
+        if self.costs is not None:
+            if other is self.base_station:
+                return self.costs.transmit_cost_to_bs(k, self.node_id)
+            return self.costs.transmit_cost(k, self.node_id, other.node_id)
+        return self.transmit_energy(k, self.distance_to(other))
 
     def receive_energy(self, k):
-        return k * E_ELEC
+        return k * self.params.E_ELEC
 
     # Calcula a quantidade de energia necessária para enviar os dados agregados à ERB
     def aggregate_energy(self, num_packets):
-        return num_packets * PACKET_SIZE * E_DA
+        return num_packets * self.params.PACKET_SIZE * self.params.E_DA
 
     def become_cluster_head(self, round_num):
         self.is_cluster_head = True
         self.cluster_head = None
-        self.member_nodes = []
+        self.member_nodes = array('l')
         self.last_ch_round = round_num
 
     def reset_cluster_role(self):
         self.is_cluster_head = False
         self.cluster_head = None
-        self.member_nodes = []
+        self.member_nodes = ()
         self.is_direct = False
 
     # Método para o sensor sensoriar a temperatura
@@ -75,12 +94,12 @@ class SensorNode:
         if not self.alive:
             return
         
-        if self.energy < E_SENSE:
+        if self.energy < self.params.E_SENSE:
             self.alive = False
             self.energy = 0
             return
 
-        self.energy -= E_SENSE
+        self.energy -= self.params.E_SENSE
         self.data.append(temperature)
 
     # Envia dados diretamente à ERB em alguns casos, como ERB mais próxima do sensor que o CH mais próximo
@@ -88,11 +107,8 @@ class SensorNode:
         if not self.alive or self.is_cluster_head or self.cluster_head or not self.is_direct or not self.data:
             return False
         
-        # Distância entre o sensor e a ERB
-        distance = self.distance_to(self.base_station)
-
         # Energia que será necessária para transmitir o pacote à ERB
-        tx_cost = self.transmit_energy(PACKET_SIZE, distance)
+        tx_cost = self.transmit_energy_to(self.params.PACKET_SIZE, self.base_station)
         
         # Energia não é mais suficiente para enviar dados
         if self.energy < tx_cost:
@@ -101,9 +117,10 @@ class SensorNode:
             return False
         
         # Envia os dados à ERB e desconta a energia usada para a transmissão no sensor
+        # A ERB lê o próprio buffer do sensor (sem cópia); depois ele é esvaziado no lugar e reaproveitado
         self.energy -= tx_cost
-        self.base_station.receive_data(self.node_id, self.data.copy())
-        self.data = []
+        self.base_station.receive_data(self.node_id, self.data)
+        del self.data[:]
 
         if self.energy <= 0:
             self.energy = 0
@@ -122,9 +139,8 @@ class SensorNode:
             self.cluster_head = None
             return False
 
-        distance = self.distance_to(ch)
-        tx_cost = self.transmit_energy(PACKET_SIZE, distance)
-        rx_cost_ch = ch.receive_energy(PACKET_SIZE)
+        tx_cost = self.transmit_energy_to(self.params.PACKET_SIZE, ch)
+        rx_cost_ch = ch.receive_energy(self.params.PACKET_SIZE)
 
         # Verifica se tem energia suficiente para enviar ao CH e o CH possui energia suficiente para receber
         if self.energy < tx_cost or ch.energy < rx_cost_ch:
@@ -137,9 +153,9 @@ class SensorNode:
         self.energy -= tx_cost
         ch.energy -= rx_cost_ch
 
-        # Envia os dados ao CH
-        ch.receive_data_from_member(self.node_id, self.data.copy())
-        self.data = []
+        # Envia os dados ao CH, que os acrescenta ao seu buffer
+        ch.receive_data_from_member(self.node_id, self.data)
+        del self.data[:]
 
         if ch.energy <= 0:
             ch.energy = 0
@@ -162,15 +178,12 @@ class SensorNode:
         if not self.alive or not self.is_cluster_head or not self.data:
             return False
 
-        # Distância do CH à ERB
-        distance_to_bs = self.distance_to(self.base_station)
-
         # Custo energético para enviar todos pacotes do cluster
         num_aggregated_packets = len(self.member_nodes)
         aggregate_cost = self.aggregate_energy(num_aggregated_packets)
 
 
-        transmit_cost = self.transmit_energy(PACKET_SIZE + aggregate_cost, distance_to_bs)
+        transmit_cost = self.transmit_energy_to(self.params.PACKET_SIZE + aggregate_cost, self.base_station)
         total_cost = transmit_cost
 
         # Energia não é suficiente para enviar os dados
@@ -180,8 +193,8 @@ class SensorNode:
             return False
 
         self.energy -= total_cost
-        self.base_station.receive_data(self.node_id, self.data.copy())
-        self.data = []
+        self.base_station.receive_data(self.node_id, self.data)
+        del self.data[:]
 
         if self.energy <= 0:
             self.energy = 0
@@ -189,25 +202,35 @@ class SensorNode:
             
         return True
 
+# Campos dos sensores que mudam de uma rodada para outra e entram nos pontos de retomada
+NODE_STATE = ('energy', 'alive', 'rounds_alive', 'last_ch_round')
+
 class BaseStation:
-    def __init__(self, x, y):
+    __slots__ = ('x', 'y', 'energy', 'received_data', 'alerts', 'log')
+
+    def __init__(self, x, y, log=None, retention=None):
         self.x = x
         self.y = y
         self.energy = float('inf')
-        self.received_data = defaultdict(list)
-        self.alerts = []
+        # Leituras e alertas recebidos, guardados conforme a política de retenção (por padrão, com memória limitada)
+        self.received_data, self.alerts = make_stores(retention)
+        self.log = make_log(log)
 
+    # data é o buffer do próprio sensor, esvaziado após a chamada: apenas os valores podem ser guardados
     def receive_data(self, node_id, data):
-        self.received_data[node_id].extend(data)
+        self.received_data.extend(node_id, data)
         for temp in data:
             if temp > 60:
                 self.alerts.append((node_id, temp))
-                print(f"ALERTA DE INCÊNDIO! CH {node_id} reportou temperatura {temp}°C")
+                self.log.packet("ALERTA DE INCÊNDIO! CH {} reportou temperatura {}°C", node_id, temp)
 
-def setup_eleach(nodes, round_num):
+def setup_eleach(nodes, round_num, params=DEFAULT_PARAMS, rng=None, clusters=None):
     '''Seleção de CHs usando o mecanismo probabilístico do E-LEACH'''
-    for node in nodes:
-        node.reset_cluster_role()
+    # Com clusters (agrupamento.IncrementalClusters), só o primeiro set-up é completo
+    incremental = clusters is not None and clusters.ready
+    if not incremental:
+        for node in nodes:
+            node.reset_cluster_role()
 
     alive_nodes = [node for node in nodes if node.alive]
 
@@ -215,29 +238,41 @@ def setup_eleach(nodes, round_num):
         return []
 
     cluster_heads = []
+    # Um sorteio por sensor vivo, feito em lote para a rodada inteira
+    draws = make_rng(rng).random(len(alive_nodes)).tolist()
 
-    for node in alive_nodes:
+    for node, draw in zip(alive_nodes, draws):
         # https://s3.ap-northeast-2.amazonaws.com/journal-home/journal/jips/fullText/456/10.pdf
         # Caso a quantidade de energia seja maior que 50%, é utilizado o limiar T(n) = P/(1-P*(r mod (1/P))) do LEACH original
-        if round_num - node.last_ch_round >= 1/P:
-            if node.energy > INITIAL_ENERGY * 0.5:
-                if P/(1 - P * (round_num % (1/P))) > random.random():
+        if round_num - node.last_ch_round >= 1/params.P:
+            if node.energy > params.INITIAL_ENERGY * 0.5:
+                if params.P/(1 - params.P * (round_num % (1/params.P))) > draw:
                     node.become_cluster_head(round_num)
                     cluster_heads.append(node)
         # Caso contrário, é utilizado o limiar T(n) = 2 * p * Eresidual/Einicial
         else:
-            if 2 * P * (node.energy/INITIAL_ENERGY) >= random.random():
+            if 2 * params.P * (node.energy/params.INITIAL_ENERGY) >= draw:
                 node.become_cluster_head(round_num)
                 cluster_heads.append(node)
 
+    if incremental:
+        clusters.update(cluster_heads, alive_nodes)
+        return cluster_heads
+
     # Formação dos clusters
     non_ch_nodes = [node for node in alive_nodes if not node.is_cluster_head]
+
+    # O índice espacial é reconstruído sobre os CHs eleitos e consultado em lote por todos os sensores
+    if len(cluster_heads) != 0:
+        index = QuadTreeIndex([ch.x for ch in cluster_heads], [ch.y for ch in cluster_heads])
+        closest_pos, closest_dist = index.nearest([node.x for node in non_ch_nodes], [node.y for node in non_ch_nodes])
+
     # Configura os sensores para enviarem mensagem pro cluster head mais próximo
-    for node in non_ch_nodes:
+    for i, node in enumerate(non_ch_nodes):
         if len(cluster_heads) != 0:
-            closest_ch = min(cluster_heads, key=lambda ch: node.distance_to(ch))
+            closest_ch = cluster_heads[closest_pos[i]]
+            dist_to_ch = closest_dist[i]
             dist_to_base = node.distance_to(node.base_station)
-            dist_to_ch = node.distance_to(closest_ch)
 
             # Caso a distância entre o sensor e a ERB seja menor que o sensor e o CH, envie diretamente para a ERB
             if dist_to_base < dist_to_ch:
@@ -245,67 +280,59 @@ def setup_eleach(nodes, round_num):
                 node.cluster_head = None
             else:
                 node.cluster_head = closest_ch
-                closest_ch.member_nodes.append(node)
+                closest_ch.member_nodes.append(node.node_id)
         else:
             # Caso não exista nenhum cluster head, os nós enviam diretamente para a ERB
             node.is_direct = True
 
+    if clusters is not None:
+        clusters.load(cluster_heads, alive_nodes)
     return cluster_heads
 
-# Lê os dados de um arquivo, onde:
-# 1º linha é referente a quantidade de sensores na RSSF
-# 2º linha: coordenada no plano cartesiano da ERB
-# 3º linha em diante: coordenadas no plano cartesiano dos sensores
-def read_coordinates_from_file(file_path):
-    with open(file_path, 'r') as file:
-        num_nodes = int(file.readline().strip())
-        
-        bs_line = file.readline().strip()
-        bs_line = bs_line.replace('"', '').replace("'", "")
-        bs_parts = bs_line.replace(',', ' ').split()
-        bs_pos = (float(bs_parts[0]), float(bs_parts[1]))
-        
-        sensor_coords = []
-        for _ in range(num_nodes):
-            line = file.readline().strip()
-            if not line:
-                continue
-            line = line.replace('"', '').replace("'", "")
-            parts = line.replace(',', ' ').split()
-            x = float(parts[0])
-            y = float(parts[1])
-            sensor_coords.append((x, y))
-            
-    return num_nodes, bs_pos, sensor_coords
-
 '''Executa a simulação do E-LEACH'''
-def simulate_eleach(file_path, num_rounds):
+def simulate_eleach(file_path, num_rounds, costs=None, params=DEFAULT_PARAMS, rng=None, log=None, retention=None, metrics=None, checkpoint=None, resume=None, profile=None, incremental=False):
     num_nodes, bs_pos, sensor_coords = read_coordinates_from_file(file_path)
 
-    base_station = BaseStation(bs_pos[0], bs_pos[1])
+    # O cache de custos pode ser compartilhado entre protocolos que usam a mesma topologia
+    costs = cost_cache_for(costs, sensor_coords, bs_pos, params)
+    rng = make_rng(rng)
+    log = make_log(log)
+    metrics = make_sink(metrics)
+    profiler = make_profiler(profile)
+    distances_before = costs.distance_evaluations
+
+    base_station = BaseStation(bs_pos[0], bs_pos[1], log, retention)
     nodes = [
-        SensorNode(i, x, y, base_station)
-        for i, (x,y) in enumerate(sensor_coords)
+        SensorNode(i, x, y, base_station, costs, params)
+        for i, (x,y) in enumerate(sensor_coords.tolist())
     ]
 
-    alive_history = [0 for _ in range(num_rounds)]
-    energy_history = [0 for _ in range(num_rounds)]
+    log.summary("Iniciando simulação E-LEACH com {} nós.", num_nodes)
+    log.summary("Energia Inicial: {} J, Pacote: {} bits, P={}", params.INITIAL_ENERGY, params.PACKET_SIZE, params.P)
+    log.summary("-" * 30)
 
-    print(f"Iniciando simulação E-LEACH com {num_nodes} nós.")
-    print(f"Energia Inicial: {INITIAL_ENERGY} J, Pacote: {PACKET_SIZE} bits, P={P}")
-    print("-" * 30)
+    # Manutenção incremental dos clusters (só os sensores afetados pela troca de CHs são reassociados)
+    clusters = IncrementalClusters(nodes) if incremental else None
 
-    first_node_death_round = None
+    # Continua de um ponto de retomada, se informado, e grava novos pontos conforme a política
+    checkpointer = make_checkpointer(checkpoint)
+    start_round, first_node_death_round = 0, None
+    if resume is not None:
+        start_round, first_node_death_round = restore_simulation(
+            resume, 'E-LEACH', params, nodes, NODE_STATE, base_station, rng, metrics)
+        log.summary("Retomando a partir da rodada {}.", start_round + 1)
 
-    for round_num in range(num_rounds):
+    for round_num in range(start_round, num_rounds):
+        t = profiler.start()
         alive_nodes = sum(node.alive for node in nodes)
         percent_network_alive = alive_nodes/num_nodes
 
         if alive_nodes != num_nodes and first_node_death_round == None:
             first_node_death_round = round_num + 1
 
-        if percent_network_alive <= NETWORK_FUNCTIONAL_THRESHOLD:
+        if percent_network_alive <= params.NETWORK_FUNCTIONAL_THRESHOLD:
             break
+        t = profiler.lap('round_check', t)
 
         # Fase de Setup
 
@@ -313,22 +340,25 @@ def simulate_eleach(file_path, num_rounds):
         nodes_sent_direct = 0
 
         # Fase de Set-Up (https://iris.uniroma1.it/retrieve/e3835329-b073-15e8-e053-a505fe0a3de9/Zanaj_post-print_LEACH_2015.pdf)
-        cluster_heads = setup_eleach(nodes, round_num)
-        ch_ids = [ch.node_id for ch in cluster_heads if ch.alive]
-        print(f"\n--- Rodada {round_num + 1} ---")
-        print(f"CHs Eleitos ({len(ch_ids)}): {ch_ids}")
+        cluster_heads = setup_eleach(nodes, round_num, params, rng, clusters)
+        if log.enabled(ROUND):
+            ch_ids = [ch.node_id for ch in cluster_heads if ch.alive]
+            log.round("\n--- Rodada {} ---", round_num + 1)
+            log.round("CHs Eleitos ({}): {}", len(ch_ids), ch_ids)
 
         if not any(node.alive for node in nodes):
-            print("Todos os nós morreram. Fim da simulação.")
+            log.round("Todos os nós morreram. Fim da simulação.")
             break
+        t = profiler.lap('setup', t)
 
         alive_nodes = [node for node in nodes if node.alive]
         # Fase de Steady-State
         # Todos os nós sensoreiam (membros e CHs)
-        for node in alive_nodes:
+        temps = rng.uniform(20, 70, len(alive_nodes)).tolist()
+        for node, temp in zip(alive_nodes, temps):
             node.rounds_alive += 1
-            temp = random.uniform(20, 70)
             node.sense_environment(temp)
+        t = profiler.lap('sense', t)
 
         # Sensores não CH enviam os dados sensoriados para o CH ou diretamente à ERB, dependendo da distância 
         for node in nodes:
@@ -340,7 +370,8 @@ def simulate_eleach(file_path, num_rounds):
                     if node.send_data_to_cluster_head():
                         nodes_sent_to_ch += 1
 
-        print(f"Dados enviados para CHs: {nodes_sent_to_ch}, Direto para BS: {nodes_sent_direct}")
+        log.round("Dados enviados para CHs: {}, Direto para BS: {}", nodes_sent_to_ch, nodes_sent_direct)
+        t = profiler.lap('transmit', t)
 
         # CHs enviam dados agregados dos sensores membros do cluster à ERB
         chs_sent_to_bs = 0
@@ -349,51 +380,69 @@ def simulate_eleach(file_path, num_rounds):
                 if ch.send_aggregated_data_to_base():
                     chs_sent_to_bs += 1
 
-        print(f"CHs que enviaram dados para BS: {chs_sent_to_bs}")
+        log.round("CHs que enviaram dados para BS: {}", chs_sent_to_bs)
+        t = profiler.lap('aggregate', t)
 
         # representa o sensor entrar em modo sleep
         for node in nodes:
             if node.alive:
                 node.sleep_mode()
+        t = profiler.lap('sleep', t)
 
         # Estatísticas da rodada
         alive_nodes = sum(1 for node in nodes if node.alive)
         total_energy = sum(node.energy for node in nodes if node.alive)
         avg_energy = total_energy / len(nodes)
         
-        alive_history[round_num] = alive_nodes
-        energy_history[round_num] = avg_energy
+        metrics.push(round_num + 1, alive_nodes, avg_energy, len(cluster_heads),
+                     nodes_sent_direct, nodes_sent_to_ch, chs_sent_to_bs)
 
-        print(f"Nós vivos: {alive_nodes}/{num_nodes}")
-        print(f"Energia média dos nós vivos: {avg_energy:.6f} J")
+        log.round("Nós vivos: {}/{}", alive_nodes, num_nodes)
+        log.round("Energia média dos nós vivos: {:.6f} J", avg_energy)
+        profiler.count('packets', nodes_sent_direct + nodes_sent_to_ch + chs_sent_to_bs)
+        profiler.count('cluster_heads', len(cluster_heads))
+        t = profiler.lap('stats', t)
 
         if alive_nodes == 0:
-            print("\nTodos os nós morreram. Fim da simulação.")
+            log.round("\nTodos os nós morreram. Fim da simulação.")
             break
+
+        if checkpointer.due(round_num + 1):
+            checkpointer.save(capture_simulation('E-LEACH', params, nodes, NODE_STATE, base_station, rng,
+                                                 metrics, round_num + 1, first_node_death_round))
+            profiler.lap('checkpoint', t)
             
-    print(f"\n--- Fim da Simulação (Após {len(alive_history)} rodadas) ---")
-    show_final_results(nodes, base_station)
+    log.summary("\n--- Fim da Simulação (Após {} rodadas) ---", num_rounds)
+    show_final_results(nodes, base_station, log)
 
     rounds_vividas = [node.rounds_alive for node in nodes]
     media_vida_nos = sum(rounds_vividas) / len(rounds_vividas)
-    print(f"Média de rodadas vividas por nó: {media_vida_nos:.2f}")
-
-    return nodes, base_station, alive_history, energy_history, media_vida_nos, first_node_death_round
-
-def show_final_results(nodes, base_station):
+    log.summary("Média de rodadas vividas por nó: {:.2f}", media_vida_nos)
+
+    # Os históricos têm uma posição por rodada executada
+    profiler.count('distance_evaluations', costs.distance_evaluations - distances_before)
+    if clusters is not None:
+        profiler.count('reassigned_nodes', clusters.reassigned)
+    result = metrics.close()
+    result.profile = profiler if profiler.enabled else None
+    return SimulationResult((nodes, base_station, result.alive, result.mean_energy, media_vida_nos, first_node_death_round),
+                            result)
+
+def show_final_results(nodes, base_station, log=None):
+    log = make_log(log)
     num_nodes = len(nodes)
     alive_nodes_list = [node for node in nodes if node.alive]
     dead_nodes_list = [node for node in nodes if not node.alive]
     alive_count = len(alive_nodes_list)
     dead_count = len(dead_nodes_list)
 
-    print(f"\n--- Resultados Finais ---")
-    print(f"Total de alertas de incêndio: {len(base_station.alerts)}")
-    print(f"Nós Vivos: {alive_count}/{num_nodes}")
-    print(f"Nós Mortos: {dead_count}/{num_nodes}")
+    log.summary("\n--- Resultados Finais ---")
+    log.summary("Total de alertas de incêndio: {}", len(base_station.alerts))
+    log.summary("Nós Vivos: {}/{}", alive_count, num_nodes)
+    log.summary("Nós Mortos: {}/{}", dead_count, num_nodes)
 
     if alive_nodes_list:
         avg_energy_alive = sum(node.energy for node in alive_nodes_list) / alive_count
-        print(f"Energia média final dos nós vivos: {avg_energy_alive:.6f} J")
+        log.summary("Energia média final dos nós vivos: {:.6f} J", avg_energy_alive)
     else:
-        print("Nenhum nó sobreviveu.")
\ No newline at end of file
+        log.summary("Nenhum nó sobreviveu.")
@@ -0,0 +1,273 @@
+'''
+Implementação do protocolo PEGASIS
+
+Os sensores formam uma única corrente, montada de forma gulosa: começa no sensor mais distante
+da ERB e cada elo liga o fim da corrente ao sensor ainda fora dela mais próximo. A cada rodada um
+líder (em rodízio ao longo da corrente) envia à ERB; os dados percorrem a corrente das duas pontas
+até ele, e cada sensor recebe o pacote do vizinho, funde com a própria leitura e transmite um
+único pacote ao próximo.
+
+A busca do mais próximo usa o índice em grade de espacial.GridIndex, com remoção dos sensores já
+encadeados, em vez de percorrer todos os sensores restantes a cada elo (O(N²)). A corrente é uma
+lista duplamente encadeada: quando um sensor morre, os vizinhos dele passam a se ligar
+diretamente, em O(1), sem remontar a corrente.
+'''
+import math
+
+import numpy as np
+
+from aleatorio import make_rng
+from custos import cost_cache_for, per_bit_cost
+from espacial import GridIndex
+from LEACH import BaseStation, SensorNode, show_final_results
+from metricas import SimulationResult, make_sink
+from parametros import DEFAULT_PARAMS
+from perfil import make_profiler
+from registro import ROUND, make_log
+from topologia import read_coordinates_from_file
+
+def build_chain(sensor_coords, bs_pos):
+    '''Ordem dos sensores na corrente gulosa, começando pelo sensor mais distante da ERB.'''
+    num_nodes = len(sensor_coords)
+    if num_nodes == 0:
+        return []
+    x, y = sensor_coords[:, 0], sensor_coords[:, 1]
+    current = int(((x - bs_pos[0])**2 + (y - bs_pos[1])**2).argmax())
+
+    index = GridIndex(x, y)
+    xs, ys = index.x, index.y
+    order = [current]
+    index.remove(current)
+    for _ in range(num_nodes - 1):
+        current, _ = index.nearest(xs[current], ys[current])
+        order.append(current)
+        index.remove(current)
+    return order
+
+class Chain:
+    '''Corrente como lista duplamente encadeada de node_ids, com remoção em O(1) e rodízio do líder.
+
+    link[i] é o custo por bit do elo entre i e next[i] (o modelo de rádio é simétrico), calculado
+    na montagem e refeito só para o elo novo quando um sensor sai da corrente.
+    '''
+    def __init__(self, order, sensor_coords, params=DEFAULT_PARAMS):
+        num_nodes = len(sensor_coords)
+        self.coords = sensor_coords
+        self.params = params
+        self.prev = [None] * num_nodes
+        self.next = [None] * num_nodes
+        self.link = [0.0] * num_nodes
+        for a, b in zip(order, order[1:]):
+            self.next[a] = b
+            self.prev[b] = a
+        if len(order) > 1:
+            a, b = sensor_coords[order[:-1]], sensor_coords[order[1:]]
+            distances = np.sqrt(((a - b)**2).sum(axis=1))
+            for i, cost in zip(order, per_bit_cost(distances, params).tolist()):
+                self.link[i] = cost
+        self.head = order[0] if order else None
+        self.tail = order[-1] if order else None
+        self.size = len(order)
+        # Último líder escolhido (o próximo é o sensor seguinte a ele na corrente)
+        self.cursor = None
+
+    def __len__(self):
+        return self.size
+
+    def remove(self, i):
+        '''Liga os vizinhos de i diretamente um ao outro.'''
+        before, after = self.prev[i], self.next[i]
+        if before is None:
+            self.head = after
+        else:
+            self.next[before] = after
+            if after is not None:
+                dx, dy = self.coords[before] - self.coords[after]
+                self.link[before] = float(per_bit_cost(math.sqrt(dx * dx + dy * dy), self.params))
+        if after is None:
+            self.tail = before
+        else:
+            self.prev[after] = before
+        self.prev[i] = self.next[i] = None
+        self.size -= 1
+        if self.cursor == i:
+            self.cursor = before
+
+    def rotate(self):
+        '''Próximo líder: o sensor seguinte ao último líder, voltando ao início no fim da corrente.'''
+        if self.size == 0:
+            return None
+        following = self.head if self.cursor is None else self.next[self.cursor]
+        self.cursor = self.head if following is None else following
+        return self.cursor
+
+    def link_cost(self, i, j):
+        '''Custo por bit entre dois sensores vizinhos na corrente.'''
+        return self.link[i] if self.next[i] == j else self.link[j]
+
+def pass_token(nodes, chain, start, step, leader, params=DEFAULT_PARAMS):
+    '''Leva os dados de uma ponta da corrente até o vizinho do líder.
+
+    Cada sensor recebe o pacote do anterior, funde com a própria leitura e transmite ao próximo
+    sensor em direção ao líder. Se um sensor não tem energia para isso, ele morre, sai da corrente
+    e as leituras que o pacote carregava se perdem; o sensor seguinte começa um pacote novo.
+    Retorna os sensores cujas leituras chegaram ao líder e a quantidade de transmissões.
+    '''
+    k = params.PACKET_SIZE
+    carried = []
+    sent = 0
+    i = start
+    while i is not None and i != leader:
+        node = nodes[i]
+        following = step[i]
+        cost = k * chain.link_cost(i, following)
+        if carried:
+            cost += node.receive_energy(k) + node.aggregate_energy(1)
+
+        if node.energy < cost:
+            node.energy = 0
+            node.alive = False
+            for lost in carried:
+                del lost.data[:]
+            del node.data[:]
+            carried = []
+            chain.remove(i)
+        else:
+            node.energy -= cost
+            carried.append(node)
+            sent += 1
+        i = following
+    return carried, sent
+
+'''Executa a simulação do PEGASIS'''
+def simulate_pegasis(file_path, num_rounds, costs=None, params=DEFAULT_PARAMS, rng=None, log=None, retention=None, metrics=None, profile=None):
+    num_nodes, bs_pos, sensor_coords = read_coordinates_from_file(file_path)
+
+    costs = cost_cache_for(costs, sensor_coords, bs_pos, params)
+    rng = make_rng(rng)
+    log = make_log(log)
+    metrics = make_sink(metrics)
+    profiler = make_profiler(profile)
+    distances_before = costs.distance_evaluations
+
+    base_station = BaseStation(bs_pos[0], bs_pos[1], log, retention)
+    nodes = [
+        SensorNode(i, x, y, base_station, costs, params)
+        for i, (x,y) in enumerate(sensor_coords.tolist())
+    ]
+
+    t = profiler.start()
+    chain = Chain(build_chain(sensor_coords, bs_pos), sensor_coords, params)
+    profiler.lap('chain_build', t)
+
+    log.summary("Iniciando simulação PEGASIS com {} nós.", num_nodes)
+    log.summary("Energia Inicial: {} J, Pacote: {} bits", params.INITIAL_ENERGY, params.PACKET_SIZE)
+    log.summary("-" * 30)
+
+    first_node_death_round = None
+    k = params.PACKET_SIZE
+
+    for round_num in range(num_rounds):
+        t = profiler.start()
+        alive_nodes = sum(node.alive for node in nodes)
+        percent_network_alive = alive_nodes/num_nodes
+
+        if alive_nodes != num_nodes and first_node_death_round == None:
+            first_node_death_round = round_num + 1
+
+        if percent_network_alive <= params.NETWORK_FUNCTIONAL_THRESHOLD:
+            break
+        t = profiler.lap('round_check', t)
+
+        alive_nodes = [node for node in nodes if node.alive]
+        if not alive_nodes:
+            log.round("Todos os nós morreram. Fim da simulação.")
+            break
+
+        # Todos os nós sensoreiam; os que morrem saem da corrente antes da escolha do líder
+        temps = rng.uniform(20, 70, len(alive_nodes)).tolist()
+        for node, temp in zip(alive_nodes, temps):
+            node.rounds_alive += 1
+            node.sense_environment(temp)
+            if not node.alive:
+                chain.remove(node.node_id)
+        t = profiler.lap('sense', t)
+
+        leader = chain.rotate()
+        if log.enabled(ROUND):
+            log.round("\n--- Rodada {} ---", round_num + 1)
+            log.round("Líder da corrente: {}", leader)
+        t = profiler.lap('setup', t)
+
+        # Os dados percorrem a corrente das duas pontas até o líder
+        hops_sent = 0
+        delivered = []
+        if leader is not None:
+            for start, step in ((chain.head, chain.next), (chain.tail, chain.prev)):
+                carried, sent = pass_token(nodes, chain, start, step, leader, params)
+                delivered.append(carried)
+                hops_sent += sent
+        log.round("Transmissões na corrente: {}", hops_sent)
+        t = profiler.lap('transmit', t)
+
+        # O líder recebe os pacotes das duas pontas, funde com a própria leitura e envia à ERB
+        leader_sent_to_bs = 0
+        if leader is not None:
+            ch = nodes[leader]
+            tokens = sum(1 for carried in delivered if carried)
+            cost = ch.transmit_energy_to(k, base_station) + tokens * (ch.receive_energy(k) + ch.aggregate_energy(1))
+            if ch.energy < cost:
+                ch.energy = 0
+                ch.alive = False
+                del ch.data[:]
+                for carried in delivered:
+                    for lost in carried:
+                        del lost.data[:]
+                chain.remove(leader)
+            else:
+                ch.energy -= cost
+                for carried in delivered:
+                    for node in carried:
+                        base_station.receive_data(node.node_id, node.data)
+                        del node.data[:]
+                base_station.receive_data(ch.node_id, ch.data)
+                del ch.data[:]
+                leader_sent_to_bs = 1
+        log.round("Líder enviou para BS: {}", leader_sent_to_bs)
+        t = profiler.lap('aggregate', t)
+
+        # representa o sensor entrar em modo sleep
+        for node in nodes:
+            if node.alive:
+                node.sleep_mode()
+        t = profiler.lap('sleep', t)
+
+        # Estatísticas da rodada
+        alive_nodes = sum(1 for node in nodes if node.alive)
+        total_energy = sum(node.energy for node in nodes if node.alive)
+        avg_energy = total_energy / len(nodes)
+
+        metrics.push(round_num + 1, alive_nodes, avg_energy, 1 if leader is not None else 0,
+                     0, hops_sent, leader_sent_to_bs)
+
+        log.round("Nós vivos: {}/{}", alive_nodes, num_nodes)
+        log.round("Energia média dos nós vivos: {:.6f} J", avg_energy)
+        profiler.count('packets', hops_sent + leader_sent_to_bs)
+        profiler.lap('stats', t)
+
+        if alive_nodes == 0:
+            log.round("\nTodos os nós morreram. Fim da simulação.")
+            break
+
+    log.summary("\n--- Fim da Simulação (Após {} rodadas) ---", num_rounds)
+    show_final_results(nodes, base_station, log)
+
+    rounds_vividas = [node.rounds_alive for node in nodes]
+    media_vida_nos = sum(rounds_vividas) / len(rounds_vividas)
+    log.summary("Média de rodadas vividas por nó: {:.2f}", media_vida_nos)
+
+    profiler.count('distance_evaluations', costs.distance_evaluations - distances_before)
+    result = metrics.close()
+    result.profile = profiler if profiler.enabled else None
+    return SimulationResult((nodes, base_station, result.alive, result.mean_energy, media_vida_nos, first_node_death_round),
+                            result)
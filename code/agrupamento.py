@@ -0,0 +1,178 @@
+'''
+Manutenção incremental dos clusters para LEACH.py e ELEACH.py.
+
+Sem ela, o set-up de cada rodada chama reset_cluster_role() em todos os sensores e refaz todas as
+associações sensor-CH. IncrementalClusters guarda, para cada sensor vivo, o CH eleito mais próximo
+e a distância até ele, e a cada rodada só mexe no que mudou desde a anterior:
+
+- sensores que morreram saem do cluster em que estavam;
+- os membros de CHs que deixaram de ser CH (ou morreram), e os próprios CHs que voltam a ser
+  membros, são associados ao CH mais próximo entre os eleitos;
+- cada CH novo "rouba" os sensores que ficaram mais perto dele do que do CH atual, encontrados
+  por uma consulta de raio na grade de espacial.GridIndex (nenhum sensor está a mais que a maior
+  distância sensor-CH atual do seu CH);
+- só os clusters que ganharam ou perderam membros têm member_nodes refeito.
+
+O resultado (CH, is_direct e member_nodes de cada sensor) é o mesmo do set-up completo, inclusive
+no desempate pelo CH de menor node_id. O custo acompanha a troca de CHs entre rodadas: quando a
+maior parte dos CHs muda a cada rodada, como no LEACH com P alto, ele se aproxima do set-up completo.
+'''
+import math
+from array import array
+
+import numpy as np
+
+from espacial import GridIndex, QuadTreeIndex
+
+NO_HEAD = -1
+
+# Acima desta fração de CHs trocados (novos + retirados, em relação aos eleitos) todos os sensores
+# são reassociados de uma vez, que sai mais barato que as consultas de raio de cada CH novo
+FULL_REASSIGN_CHURN = 0.5
+
+class IncrementalClusters:
+    def __init__(self, nodes):
+        self.nodes = nodes
+        num_nodes = len(nodes)
+        self.grid = GridIndex([node.x for node in nodes], [node.y for node in nodes])
+        self.head_of = [NO_HEAD] * num_nodes
+        # Distância ao CH mais próximo (0 para CHs, mortos e sensores ainda sem CH), para o raio de busca
+        self.distance = np.zeros(num_nodes, dtype=np.float64)
+        self.members = {}
+        self.heads = set()
+        self.alive = set()
+        self.member_arrays = {}
+        # False até o primeiro set-up: o primeiro é completo, feito por setup_leach/setup_eleach
+        self.ready = False
+        self.reassigned = 0
+
+    def load(self, cluster_heads, alive_nodes):
+        '''Registra os clusters formados pelo set-up completo da rodada.'''
+        self.head_of = [NO_HEAD] * len(self.nodes)
+        self.distance[:] = 0
+        self.heads = {ch.node_id for ch in cluster_heads}
+        self.members = {h: set() for h in self.heads}
+        self.alive = {node.node_id for node in alive_nodes}
+        if self.heads:
+            self._assign([node.node_id for node in alive_nodes if not node.is_cluster_head])
+        self.member_arrays = {ch.node_id: ch.member_nodes for ch in cluster_heads}
+        self.ready = True
+
+    def _assign(self, ids):
+        '''Associa os sensores ids ao CH eleito mais próximo (empate: menor node_id) e retorna os CHs
+        cujos clusters mudaram.'''
+        nodes, head_of, members = self.nodes, self.head_of, self.members
+        heads = sorted(self.heads)
+        index = QuadTreeIndex([nodes[h].x for h in heads], [nodes[h].y for h in heads])
+        pos, distances = index.nearest([nodes[i].x for i in ids], [nodes[i].y for i in ids])
+        touched = set()
+        for i, p in zip(ids, pos.tolist()):
+            old, h = head_of[i], heads[p]
+            if old != h:
+                if old in members:
+                    members[old].discard(i)
+                    touched.add(old)
+                head_of[i] = h
+                members[h].add(i)
+                touched.add(h)
+        self.distance[ids] = distances
+        return touched
+
+    def update(self, cluster_heads, alive_nodes):
+        '''Ajusta os clusters aos CHs eleitos na rodada. Os CHs já passaram por become_cluster_head.'''
+        nodes, head_of, members = self.nodes, self.head_of, self.members
+        new_heads = {ch.node_id for ch in cluster_heads}
+        alive = {node.node_id for node in alive_nodes}
+        died = self.alive - alive
+        retired = self.heads - new_heads
+        added = new_heads - self.heads
+        # Sem CHs na rodada anterior (todos enviavam direto) ou com troca grande, todos são reassociados
+        full = not self.heads or len(added) + len(retired) > FULL_REASSIGN_CHURN * len(new_heads)
+        affected = set(alive) if full else set()
+        self.alive = alive
+
+        dirty = set()
+
+        for i in died:
+            h = head_of[i]
+            if h != NO_HEAD:
+                members[h].discard(i)
+                dirty.add(h)
+            head_of[i] = NO_HEAD
+            self.distance[i] = 0
+            nodes[i].reset_cluster_role()
+
+        # Membros que perderam o CH; o CH que deixou de ser CH volta a ser membro
+        for h in retired:
+            affected |= members.pop(h)
+            self.member_arrays.pop(h, None)
+            if h in alive:
+                nodes[h].reset_cluster_role()
+                affected.add(h)
+
+        # Sensores eleitos saem do cluster em que estavam
+        for h in added:
+            old = head_of[h]
+            if old in members:
+                members[old].discard(h)
+                dirty.add(old)
+            head_of[h] = NO_HEAD
+            self.distance[h] = 0
+            members[h] = set()
+            dirty.add(h)
+
+        # CHs que continuam recuperam o member_nodes apagado por become_cluster_head
+        for h in new_heads - added:
+            nodes[h].member_nodes = self.member_arrays[h]
+
+        self.heads = new_heads
+        affected -= died
+        affected -= new_heads
+        changed = set(affected)
+
+        if new_heads:
+            if affected:
+                dirty |= self._assign(sorted(affected))
+
+            # CHs novos tomam os sensores que ficaram mais perto deles do que do CH atual
+            radius = float(self.distance.max())
+            for a in ([] if full else sorted(added)):
+                ax, ay = nodes[a].x, nodes[a].y
+                for i in self.grid.within(ax, ay, radius):
+                    h = head_of[i]
+                    if h == NO_HEAD or h == a:
+                        continue
+                    dx, dy = nodes[i].x - ax, nodes[i].y - ay
+                    d = math.sqrt(dx * dx + dy * dy)
+                    if d < self.distance[i] or (d == self.distance[i] and a < h):
+                        members[h].discard(i)
+                        members[a].add(i)
+                        head_of[i] = a
+                        self.distance[i] = d
+                        dirty.add(h)
+                        changed.add(i)
+        else:
+            for i in affected:
+                head_of[i] = NO_HEAD
+                self.distance[i] = 0
+
+        # Sensores com CH novo: envio direto à ERB se ela estiver mais perto que o CH
+        for i in changed:
+            node = nodes[i]
+            h = head_of[i]
+            if h == NO_HEAD:
+                node.is_direct = True
+                node.cluster_head = None
+            elif node.distance_to(node.base_station) < self.distance[i]:
+                node.is_direct = True
+                node.cluster_head = None
+            else:
+                node.is_direct = False
+                node.cluster_head = nodes[h]
+
+        for h in dirty & new_heads:
+            ch = nodes[h]
+            ch.member_nodes = array('l', sorted(i for i in members[h] if not nodes[i].is_direct))
+            self.member_arrays[h] = ch.member_nodes
+
+        self.reassigned += len(changed)
@@ -0,0 +1,36 @@
+'''
+Geradores de números aleatórios das simulações.
+
+Cada simulate_* recebe rng, que pode ser uma semente inteira, um numpy.random.SeedSequence ou um
+numpy.random.Generator já criado (None sorteia uma semente nova, como antes). Os sorteios de
+uma rodada (eleição de CHs e temperaturas) são feitos em lote, com uma chamada por fase.
+'''
+import numpy as np
+
+def make_rng(rng=None):
+    '''Retorna o Generator informado ou cria um a partir da semente.'''
+    if isinstance(rng, np.random.Generator):
+        return rng
+    return np.random.default_rng(rng)
+
+def spawn_seeds(seed, n):
+    '''n SeedSequences com fluxos independentes derivadas da mesma semente, para repetições em paralelo.
+
+    Podem ser passadas como rng a qualquer simulate_* (inclusive em outro processo) e geram os
+    mesmos fluxos de spawn_rngs.
+    '''
+    return np.random.SeedSequence(seed).spawn(n)
+
+def spawn_rngs(seed, n):
+    '''n geradores com fluxos independentes derivados da mesma semente.'''
+    return [np.random.default_rng(s) for s in spawn_seeds(seed, n)]
+
+def seed_label(rng):
+    '''Identificação reproduzível de rng, para nomes de arquivo, CSVs e chaves de cache: o próprio
+    inteiro, "entropia-índice" para uma SeedSequence derivada (spawn_seeds) ou None para um
+    Generator ou None, que não podem ser repetidos a partir de um rótulo.'''
+    if isinstance(rng, (int, np.integer)):
+        return int(rng)
+    if isinstance(rng, np.random.SeedSequence) and isinstance(rng.entropy, int):
+        return '-'.join(str(v) for v in (rng.entropy, *rng.spawn_key))
+    return None
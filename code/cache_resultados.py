@@ -0,0 +1,243 @@
+'''
+Cache em disco dos resultados das simulações, endereçado pelo conteúdo das entradas.
+
+A chave de uma execução é o SHA-256 de: conteúdo do arquivo da topologia, protocolo, parâmetros
+(SimulationParams), quantidade de rodadas, semente e versão do motor. A versão do motor é o hash
+do código-fonte do módulo do simulate_* e dos módulos desta pasta que ele usa (custos, LEACH,
+espacial...), junto com ENGINE_VERSION: qualquer mudança nesse código invalida as entradas antigas,
+enquanto mudanças nos gráficos ou em main.py não.
+
+Cada entrada é um .npz com as colunas de metricas.ROUND_FIELDS e as métricas escalares, gravado
+de forma atômica (arquivo temporário + os.replace), então vários processos podem usar o mesmo
+diretório. A data de modificação marca o último acesso: quando o diretório passa de max_bytes
+(ou de max_entries), as entradas usadas há mais tempo são apagadas.
+
+Só passam pelo cache execuções com semente inteira ou SeedSequence derivada (aleatorio.seed_label);
+com rng=None ou um Generator elas não são reproduzíveis.
+'''
+import hashlib
+import inspect
+import json
+import os
+import sys
+import types
+
+import numpy as np
+
+from aleatorio import seed_label
+from metricas import MemorySink, ROUND_FIELDS
+from parametros import DEFAULT_PARAMS
+from registro import SILENT
+from topologia import read_coordinates_from_file
+
+# Incrementar quando uma mudança fora do código-fonte dos motores alterar os resultados
+ENGINE_VERSION = 1
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'results', '.cache')
+DEFAULT_MAX_BYTES = 256 * 1024**2
+
+# Argumentos de simulate que não mudam o resultado
+NEUTRAL_KWARGS = ('log', 'profile')
+
+_CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+_file_digests = {}
+_engine_digests = {}
+
+def file_digest(path):
+    '''SHA-256 do conteúdo do arquivo, lembrado por (caminho, tamanho, data de modificação).'''
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _file_digests.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        digest = _file_digests[memo_key] = h.hexdigest()
+    return digest
+
+def _local_module(obj):
+    '''Módulo desta pasta de onde obj vem (ele mesmo, se for um módulo), ou None.'''
+    module = obj if isinstance(obj, types.ModuleType) else sys.modules.get(getattr(obj, '__module__', None) or '')
+    path = getattr(module, '__file__', None)
+    if path is None or os.path.dirname(os.path.abspath(path)) != _CODE_DIR:
+        return None
+    return module
+
+def engine_digest(simulate):
+    '''Versão do motor: hash do código do módulo de simulate e dos módulos locais que ele usa, recursivamente.'''
+    simulate = getattr(simulate, 'func', simulate)
+    module = _local_module(simulate)
+    if module is None:
+        return f'{ENGINE_VERSION}:{simulate.__module__}.{simulate.__qualname__}'
+    digest = _engine_digests.get(module.__name__)
+    if digest is None:
+        seen = {}
+        pending = [module]
+        while pending:
+            current = pending.pop()
+            if current.__name__ in seen:
+                continue
+            seen[current.__name__] = file_digest(inspect.getsourcefile(current))
+            for value in vars(current).values():
+                dependency = _local_module(value)
+                if dependency is not None and dependency.__name__ not in seen:
+                    pending.append(dependency)
+        h = hashlib.sha256(str(ENGINE_VERSION).encode())
+        for name in sorted(seen):
+            h.update(f'{name}:{seen[name]}'.encode())
+        digest = _engine_digests[module.__name__] = h.hexdigest()
+    return digest
+
+def options_key(kwargs, file_path):
+    '''Parte da chave dada pelos argumentos extras de simulate.
+
+    log e profile não mudam o resultado e ficam de fora. Um costs em float64 criado para a própria
+    topologia de file_path dá o mesmo resultado que costs=None e também fica de fora; qualquer outro
+    entra pelo tipo de ponto flutuante e pelo hash das posições (o modelo de rádio já é conferido por
+    custos.cost_cache_for). Chaves de motor simples (incremental=, fast_forward=, radius=...) entram
+    pelo valor; qualquer outro argumento gera TypeError, em vez de um acerto errado.
+    '''
+    options = {}
+    for name, value in kwargs.items():
+        if name in NEUTRAL_KWARGS or value is None:
+            continue
+        if name == 'costs':
+            _, bs_pos, sensor_coords = read_coordinates_from_file(file_path)
+            if (value.dtype == np.float64 and value.bs_pos == (float(bs_pos[0]), float(bs_pos[1]))
+                    and np.array_equal(value.x, sensor_coords[:, 0]) and np.array_equal(value.y, sensor_coords[:, 1])):
+                continue
+            h = hashlib.sha256(value.x.tobytes())
+            h.update(value.y.tobytes())
+            h.update(repr(value.bs_pos).encode())
+            options[name] = [value.dtype.str, h.hexdigest()]
+        elif isinstance(value, (bool, int, float, str)):
+            options[name] = value
+        else:
+            raise TypeError(f"O argumento {name}={value!r} não pode entrar na chave do cache de resultados")
+    return options
+
+class ResultCache:
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES, max_entries=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, file_path, protocolo, simulate, num_rounds, seed, params=DEFAULT_PARAMS, options=None):
+        '''options: argumentos extras de simulate que mudam o resultado (ver options_key).'''
+        payload = [file_digest(file_path), protocolo, params.as_dict(), num_rounds, seed_label(seed),
+                   engine_digest(simulate), options or {}]
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def get(self, key):
+        '''Resultado guardado (como em run_cached) ou None; um acerto conta como uso recente.'''
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                columns = {field: data[field] for field in ROUND_FIELDS}
+                media_vida_nos = float(data['media_vida_nos'])
+                first_node_death_round = int(data['first_node_death_round'])
+            os.utime(path)
+        except (OSError, KeyError, ValueError):
+            # Entrada ausente, apagada por outro processo ou incompleta
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {
+            'columns': columns,
+            'media_vida_nos': media_vida_nos,
+            'first_node_death_round': None if first_node_death_round < 0 else first_node_death_round,
+        }
+
+    def put(self, key, result):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        first_node_death_round = result['first_node_death_round']
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **result['columns'], media_vida_nos=result['media_vida_nos'],
+                     first_node_death_round=-1 if first_node_death_round is None else first_node_death_round)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def entries(self):
+        '''(data de acesso, tamanho, caminho) de cada entrada.'''
+        found = []
+        try:
+            scan = os.scandir(self.directory)
+        except FileNotFoundError:
+            return found
+        with scan:
+            for entry in scan:
+                if not entry.name.endswith('.npz'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                found.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return found
+
+    def evict(self):
+        '''Apaga as entradas usadas há mais tempo até caber em max_bytes e max_entries.'''
+        found = sorted(self.entries())
+        total = sum(size for _, size, _ in found)
+        count = len(found)
+        for _, size, path in found:
+            if total <= self.max_bytes and (self.max_entries is None or count <= self.max_entries):
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            count -= 1
+
+    def clear(self):
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def make_cache(cache=None):
+    '''Retorna o cache informado; com True cria um ResultCache no diretório padrão e, com um caminho, nele.'''
+    if cache is None or cache is False:
+        return None
+    if cache is True:
+        return ResultCache()
+    if isinstance(cache, (str, os.PathLike)):
+        return ResultCache(cache)
+    return cache
+
+def run_cached(cache, protocolo, simulate, file_path, num_rounds, seed, params=DEFAULT_PARAMS, **kwargs):
+    '''Executa simulate sem saída no terminal, ou devolve o resultado guardado das mesmas entradas.
+
+    Retorna {'columns': métricas por rodada, 'media_vida_nos', 'first_node_death_round'}. kwargs
+    (ex.: costs, incremental=True) vão para simulate e, com exceção de log e profile, entram na
+    chave (ver options_key).
+    '''
+    cache = make_cache(cache)
+    key = None
+    if cache is not None and seed_label(seed) is not None:
+        key = cache.key(file_path, protocolo, simulate, num_rounds, seed, params, options_key(kwargs, file_path))
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+    sink = MemorySink()
+    _, _, _, _, media_vida_nos, first_node_death_round = simulate(
+        file_path, num_rounds, params=params, rng=seed, log=kwargs.pop('log', SILENT), metrics=sink, **kwargs)
+    result = {
+        'columns': sink.result.as_dict(),
+        'media_vida_nos': media_vida_nos,
+        'first_node_death_round': first_node_death_round,
+    }
+    if key is not None:
+        cache.put(key, result)
+    return result
@@ -0,0 +1,104 @@
+'''
+Cache dos custos de enlace (distância e energia de transmissão por bit) entre os sensores
+e entre cada sensor e a estação base.
+
+As posições dos sensores não mudam durante a simulação, então a distância e o custo de uma
+aresta do grafo podem ser calculados uma única vez. As linhas da tabela sensor-sensor são
+preenchidas sob demanda e ficam guardadas enquanto couberem no limite de memória; acima dele,
+as linhas passam a ser calculadas a cada consulta, sem serem armazenadas.
+'''
+import numpy as np
+
+from parametros import DEFAULT_PARAMS
+
+# Memória máxima (bytes) ocupada pelas linhas sensor-sensor guardadas no cache
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+def per_bit_cost(d, params=DEFAULT_PARAMS):
+    '''Energia por bit transmitido a uma distância d (mesmo modelo de SensorNode.transmit_energy).'''
+    d = np.asarray(d, dtype=np.float64)
+    return np.where(d <= params.D_THRESHOLD, params.E_ELEC + params.E_FS * d**2, params.E_ELEC + params.E_MP * d**4)
+
+# Campos de SimulationParams que influenciam o custo de um enlace
+RADIO_FIELDS = ('E_ELEC', 'E_FS', 'E_MP', 'D_THRESHOLD')
+
+def cost_cache_for(costs, sensor_coords, bs_pos, params=DEFAULT_PARAMS):
+    '''Retorna o cache informado, se ele usa o mesmo modelo de rádio de params, ou cria um novo.'''
+    if costs is None:
+        return LinkCostCache(sensor_coords, bs_pos, params=params)
+    for name in RADIO_FIELDS:
+        if getattr(costs.params, name) != getattr(params, name):
+            raise ValueError(f"O cache de custos foi criado com {name}={getattr(costs.params, name)}, "
+                             f"mas a simulação usa {name}={getattr(params, name)}")
+    return costs
+
+class LinkCostCache:
+    def __init__(self, sensor_coords, bs_pos, dtype=np.float64, max_bytes=MAX_CACHE_BYTES, params=DEFAULT_PARAMS):
+        self.params = params
+        coords = np.asarray(sensor_coords, dtype=np.float64).reshape(-1, 2)
+        self.num_nodes = len(coords)
+        self.x = coords[:, 0].copy()
+        self.y = coords[:, 1].copy()
+        self.bs_pos = (float(bs_pos[0]), float(bs_pos[1]))
+        self.dtype = np.dtype(dtype)
+
+        # Custos até a ERB: O(N), sempre calculados e guardados em float64
+        self.bs_distance = np.sqrt((self.x - self.bs_pos[0])**2 + (self.y - self.bs_pos[1])**2)
+        self.bs_per_bit = per_bit_cost(self.bs_distance, params)
+        # Quantidade de distâncias calculadas (sensor-ERB e linhas sensor-sensor), usada no perfil das fases
+        self.distance_evaluations = self.num_nodes
+
+        # Cada linha guarda a distância e o custo por bit até todos os sensores
+        row_bytes = max(1, 2 * self.num_nodes * self.dtype.itemsize)
+        self.max_rows = min(self.num_nodes, max_bytes // row_bytes)
+        self._rows = {}
+
+    def _compute_row(self, i, targets=None):
+        if targets is None:
+            dx = self.x - self.x[i]
+            dy = self.y - self.y[i]
+        else:
+            dx = self.x[targets] - self.x[i]
+            dy = self.y[targets] - self.y[i]
+        distances = np.sqrt(dx**2 + dy**2)
+        self.distance_evaluations += distances.size
+        return distances.astype(self.dtype, copy=False), per_bit_cost(distances, self.params).astype(self.dtype, copy=False)
+
+    def row(self, i):
+        '''Retorna (distâncias, custos por bit) do sensor i até todos os sensores.'''
+        cached = self._rows.get(i)
+        if cached is not None:
+            return cached
+
+        computed = self._compute_row(i)
+        if len(self._rows) < self.max_rows:
+            self._rows[i] = computed
+        return computed
+
+    def _lookup(self, i, targets):
+        '''Distâncias e custos por bit de i até targets, sem calcular a linha inteira se ela não couber no cache.'''
+        cached = self._rows.get(i)
+        if cached is None and len(self._rows) >= self.max_rows:
+            return self._compute_row(i, targets)
+        distances, per_bit = self.row(i)
+        return distances[targets], per_bit[targets]
+
+    def distance(self, i, j):
+        return float(self._lookup(i, j)[0])
+
+    def distance_to_bs(self, i):
+        return float(self.bs_distance[i])
+
+    def transmit_cost(self, k, i, j):
+        '''Energia para o sensor i transmitir k bits ao sensor j.'''
+        return k * float(self._lookup(i, j)[1])
+
+    def transmit_cost_to_bs(self, k, i):
+        '''Energia para o sensor i transmitir k bits à ERB.'''
+        return k * float(self.bs_per_bit[i])
+
+    def nearest(self, i, candidates):
+        '''Posição (em candidates) e distância do candidato mais próximo de i; empates ficam com o primeiro.'''
+        distances = self._lookup(i, candidates)[0]
+        pos = int(np.argmin(distances))
+        return pos, float(distances[pos])
@@ -0,0 +1,180 @@
+'''
+Medição de desempenho (vazão) dos motores de simulação.
+
+Cada caso (motor, quantidade de sensores, quantidade de rodadas) roda em um processo novo, com
+semente fixa e sem saída no terminal, sobre uma topologia uniforme gerada pelo gerador e gravada
+no formato binário. São medidos:
+
+- rodadas por segundo e nó-rodadas por segundo (soma dos nós vivos em cada rodada executada);
+- pico de memória residente (RSS) do processo;
+- tempo por fase: 'load' (criação do cache de custos e tudo o que o motor faz fora das fases do
+  perfil: leitura da topologia, criação dos sensores e resumo final), 'simulate' (soma das fases
+  do perfil, de onde saem as vazões) e o tempo de cada fase medido pelo perfil do motor
+  (perfil.PhaseProfiler), junto com os contadores dele (pacotes, distâncias calculadas).
+
+O melhor tempo de repeats execuções é o que vale. Os resultados são gravados em JSON e podem ser
+comparados com uma execução anterior (baseline): casos cuja vazão caiu mais que tolerance são
+marcados como regressão.
+'''
+import json
+import os
+import platform
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from custos import LinkCostCache
+from direto import simulate_direct_communication
+from ELEACH import simulate_eleach
+from eventos import simulate_direct_event_driven
+from gerador import generate_topology
+from LEACH import simulate_leach
+from multisalto import simulate_multihop
+from PEGASIS import simulate_pegasis
+from perfil import PhaseProfiler
+from registro import SILENT
+from topologia import read_coordinates_from_file, write_binary_topology
+from vetorizado import simulate_eleach_vetorizado, simulate_kmeans_vetorizado, simulate_leach_vetorizado
+
+ENGINES = {
+    'Direta': simulate_direct_communication,
+    'Direta (fast-forward)': partial(simulate_direct_communication, fast_forward=True),
+    'Direta (eventos)': simulate_direct_event_driven,
+    'LEACH': simulate_leach,
+    'E-LEACH': simulate_eleach,
+    'LEACH (vetorizado)': simulate_leach_vetorizado,
+    'E-LEACH (vetorizado)': simulate_eleach_vetorizado,
+    'K-means (vetorizado)': simulate_kmeans_vetorizado,
+    'Multissalto': simulate_multihop,
+    'PEGASIS': simulate_pegasis,
+}
+
+DEFAULT_SIZES = (100, 1_000, 10_000)
+DEFAULT_ROUNDS = (100,)
+
+# Queda de vazão (fração) a partir da qual um caso é considerado regressão
+REGRESSION_TOLERANCE = 0.2
+
+def _peak_rss_mb():
+    # ru_maxrss é dado em KiB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_case(engine, file_path, num_rounds, seed=0, repeats=3):
+    '''Executa um caso repeats vezes no processo atual e devolve as medidas da execução mais rápida.'''
+    simulate = ENGINES[engine]
+    best = None
+    for _ in range(repeats):
+        _, bs_pos, sensor_coords = read_coordinates_from_file(file_path)
+        start = time.perf_counter()
+        costs = LinkCostCache(sensor_coords, bs_pos)
+        built = time.perf_counter()
+        profiler = PhaseProfiler()
+        result = simulate(file_path, num_rounds, costs=costs, rng=seed, log=SILENT, profile=profiler)
+        finished = time.perf_counter()
+
+        # O simulate lê a topologia de novo e cria os sensores antes da primeira fase medida: esse
+        # tempo (fora das fases do perfil) vai para 'load', junto com a criação do cache de custos
+        simulated = sum(profiler.seconds.values())
+        phases = {'load': (built - start) + (finished - built - simulated), 'simulate': simulated, **profiler.seconds}
+        if best is None or phases['simulate'] < best[0]['simulate']:
+            best = (phases, profiler.counters, np.asarray(result[2]))
+
+    phases, counters, alive_history = best
+    seconds = phases['simulate']
+    executed = len(alive_history)
+    return {
+        'engine': engine,
+        'nodes': len(sensor_coords),
+        'rounds': num_rounds,
+        'executed_rounds': executed,
+        'seconds': seconds,
+        'rounds_per_sec': executed / seconds if seconds > 0 else 0.0,
+        'node_rounds_per_sec': float(alive_history.sum()) / seconds if seconds > 0 else 0.0,
+        'peak_rss_mb': _peak_rss_mb(),
+        'phases': phases,
+        'counters': counters,
+    }
+
+def _case_key(case):
+    return (case['engine'], case['nodes'], case['rounds'])
+
+def run_benchmarks(sizes=DEFAULT_SIZES, rounds=DEFAULT_ROUNDS, engines=None, seed=0, repeats=3,
+                   output=None, baseline=None, tolerance=REGRESSION_TOLERANCE, topology_dir=None):
+    '''Executa todos os casos, cada um em um processo novo (para o pico de RSS ser só dele).
+
+    Grava o relatório em output (JSON), se informado, e compara com baseline (caminho ou
+    relatório), marcando as regressões em report['regressions'].
+    '''
+    engines = list(engines or ENGINES)
+    cases = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        topology_dir = topology_dir or tmp_dir
+        for num_nodes in sizes:
+            file_path = os.path.join(topology_dir, f'bench_{num_nodes}_{seed}.topo')
+            if not os.path.isfile(file_path):
+                write_binary_topology(file_path, *generate_topology(num_nodes, seed=seed))
+            for num_rounds in rounds:
+                for engine in engines:
+                    with ProcessPoolExecutor(max_workers=1) as executor:
+                        cases.append(executor.submit(run_case, engine, file_path, num_rounds, seed, repeats).result())
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'seed': seed,
+        'repeats': repeats,
+        'cases': cases,
+    }
+    if baseline is not None:
+        report['regressions'] = compare_to_baseline(report, baseline, tolerance)
+    if output is not None:
+        save_report(output, report)
+    return report
+
+def save_report(path, report):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+def load_report(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def compare_to_baseline(report, baseline, tolerance=REGRESSION_TOLERANCE):
+    '''Casos presentes nos dois relatórios cuja vazão (rodadas/s) caiu mais que tolerance.'''
+    if isinstance(baseline, (str, os.PathLike)):
+        baseline = load_report(baseline)
+    previous = {_case_key(case): case for case in baseline['cases']}
+
+    regressions = []
+    for case in report['cases']:
+        old = previous.get(_case_key(case))
+        if old is None or old['rounds_per_sec'] <= 0:
+            continue
+        ratio = case['rounds_per_sec'] / old['rounds_per_sec']
+        if ratio < 1 - tolerance:
+            regressions.append({
+                'engine': case['engine'],
+                'nodes': case['nodes'],
+                'rounds': case['rounds'],
+                'baseline_rounds_per_sec': old['rounds_per_sec'],
+                'rounds_per_sec': case['rounds_per_sec'],
+                'ratio': ratio,
+            })
+    return regressions
+
+def show_benchmarks(report):
+    print(f"{'Motor':<22} {'Nós':>9} {'Rodadas':>8} {'Rodadas/s':>11} {'Nó-rodadas/s':>14} {'RSS (MiB)':>10} {'Carga (s)':>10}")
+    for case in report['cases']:
+        print(f"{case['engine']:<22} {case['nodes']:>9} {case['executed_rounds']:>8} {case['rounds_per_sec']:>11.1f} "
+              f"{case['node_rounds_per_sec']:>14.0f} {case['peak_rss_mb']:>10.1f} {case['phases']['load']:>10.3f}")
+
+    for regression in report.get('regressions', ()):
+        print(f"REGRESSÃO: {regression['engine']} com {regression['nodes']} nós e {regression['rounds']} rodadas: "
+              f"{regression['rounds_per_sec']:.1f} rodadas/s (baseline {regression['baseline_rounds_per_sec']:.1f}, "
+              f"{regression['ratio']:.0%})")
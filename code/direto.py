@@ -4,48 +4,64 @@ com parâmetros de energia equivalentes ao EESRA e LEACH adaptado
 para fins de comparação.
 '''
 import math
-import random
-from collections import defaultdict
+from array import array
 import numpy as np
 
-# --- Constantes de Energia (Baseadas no EESRA) ---
-E_ELEC = 50e-9      # J/bit (Energia para eletrônica)
-E_FS = 10e-12       # J/bit/m² (Energia para espaço livre)
-E_MP = 0.0013e-12   # J/bit/m^4 (Energia para multi-percurso)
-D_THRESHOLD = 75   # Metros (Limiar de distância para modelo de energia)
-E_DA = 5e-9         # J/bit (Energia para agregação de dados)
-PACKET_SIZE = 2000  # bits (Tamanho do pacote)
-INITIAL_ENERGY = 2.0 # Joules (Energia inicial dos nós)
-E_SENSE = 8e-5
-E_SLEEP = 15e-10
-NETWORK_FUNCTIONAL_THRESHOLD = 0.12
+from aleatorio import make_rng
+from custos import cost_cache_for
+from parametros import DEFAULT_PARAMS
+from registro import make_log
+from retencao import make_stores
+from topologia import read_coordinates_from_file
+from metricas import SimulationResult, make_sink
+from retomada import capture_simulation, make_checkpointer, restore_simulation
+from perfil import make_profiler
 
 class SensorNode:
-    def __init__(self, node_id, x, y, base_station):
+    # __slots__ elimina o __dict__ de cada instância e as leituras ficam num buffer de floats de 8 bytes
+    # (array('d')) em vez de uma lista de objetos float, reduzindo a memória por sensor em redes grandes
+    __slots__ = ('node_id', 'x', 'y', 'base_station', 'costs', 'params', 'energy', 'data', 'alive',
+                 'sleeping', 'rounds_alive')
+
+    def __init__(self, node_id, x, y, base_station, costs=None, params=DEFAULT_PARAMS):
         self.node_id = node_id
         self.x = x
         self.y = y
         self.base_station = base_station
-        self.energy = INITIAL_ENERGY  # Energia inicial em Joules (igual ao EESRA)
-        self.data = []
+        self.costs = costs
+        self.params = params
+        self.energy = self.params.INITIAL_ENERGY  # Energia inicial em Joules (igual ao EESRA)
+        self.data = array('d')
         self.alive = True
         self.sleeping = False
         self.rounds_alive = 0
         
     def distance_to(self, other):
         '''Calcula a distância Euclidiana para outro nó ou estação base.'''
+        if self.costs is not None:
+            if other is self.base_station:
+                return self.costs.distance_to_bs(self.node_id)
+            return self.costs.distance(self.node_id, other.node_id)
         return math.sqrt((self.x - other.x)**2 + (self.y - other.y)**2)
         
     def transmit_energy(self, k, d):
         '''Calcula a energia gasta para transmitir k bits a uma distância d.'''
-        if d <= D_THRESHOLD:
-            return k * (E_ELEC + E_FS * d**2)
+        if d <= self.params.D_THRESHOLD:
+            return k * (self.params.E_ELEC + self.params.E_FS * d**2)
         else:
-            return k * (E_ELEC + E_MP * d**4)
+            return k * (self.params.E_ELEC + self.params.E_MP * d**4)
+
+    def transmit_energy_to(self, k, other):
+        '''Calcula a energia para transmitir k bits até outro nó ou a estação base, consultando o cache de custos.'''
+        if self.costs is not None:
+            if other is self.base_station:
+                return self.costs.transmit_cost_to_bs(k, self.node_id)
+            return self.costs.transmit_cost(k, self.node_id, other.node_id)
+        return self.transmit_energy(k, self.distance_to(other))
 
     def receive_energy(self, k):
         '''Calcula a energia gasta para receber k bits.'''
-        return k * E_ELEC
+        return k * self.params.E_ELEC
     
     
     def sense_environment(self, temperature):
@@ -53,12 +69,12 @@ class SensorNode:
         if not self.alive or self.sleeping:
             return
 
-        if self.energy <= E_SENSE:
+        if self.energy <= self.params.E_SENSE:
             self.alive = False
             self.energy = 0
             return
 
-        self.energy -= E_SENSE            
+        self.energy -= self.params.E_SENSE            
         self.data.append(temperature)
     
     def send_data_to_base(self):
@@ -66,11 +82,8 @@ class SensorNode:
         if not self.alive or self.sleeping or not self.data:
             return False
         
-        # Calcula distância até a base
-        distance = self.distance_to(self.base_station)
-        
-        # Calcula consumo de energia para envio usando o modelo do EESRA
-        tx_energy = self.transmit_energy(PACKET_SIZE, distance)
+        # Calcula consumo de energia para envio até a base usando o modelo do EESRA
+        tx_energy = self.transmit_energy_to(self.params.PACKET_SIZE, self.base_station)
         
         # Verifica se tem energia suficiente
         if self.energy < tx_energy:
@@ -81,162 +94,294 @@ class SensorNode:
         # Deduz energia do envio
         self.energy -= tx_energy
         
-        # Envia os dados para a base
-        self.base_station.receive_data(self.node_id, self.data.copy())
-        self.data = []  # Limpa os dados após envio
+        # Envia os dados para a base: a ERB lê o próprio buffer do nó (sem cópia) e o buffer é
+        # esvaziado no lugar, mantendo a memória já alocada para a próxima rodada
+        self.base_station.receive_data(self.node_id, self.data)
+        del self.data[:]
 
         return True
     
     def sleep_mode(self):
-        if self.energy <= E_SLEEP:
+        if self.energy <= self.params.E_SLEEP:
             self.alive = False
             self.energy = 0
             return
         
-        self.energy -= E_SLEEP
+        self.energy -= self.params.E_SLEEP
         return
 
+# Campos dos sensores que mudam de uma rodada para outra e entram nos pontos de retomada
+NODE_STATE = ('energy', 'alive', 'rounds_alive', 'sleeping')
+
 class BaseStation:
-    def __init__(self, x, y):
+    __slots__ = ('x', 'y', 'energy', 'received_data', 'alerts', 'log')
+
+    def __init__(self, x, y, log=None, retention=None):
         self.x = x
         self.y = y
         self.energy = float('inf')  # Energia infinita
-        self.received_data = defaultdict(list)
-        self.alerts = []
+        # Leituras e alertas recebidos, guardados conforme a política de retenção (por padrão, com memória limitada)
+        self.received_data, self.alerts = make_stores(retention)
+        self.log = make_log(log)
     
     def receive_data(self, node_id, data):
-        """Recebe dados dos nós sensores"""
-        self.received_data[node_id].extend(data)
+        """Recebe dados dos nós sensores (data é o buffer do nó, esvaziado após a chamada)"""
+        self.received_data.extend(node_id, data)
         
         # Verifica alertas de incêndio
         for temp in data:
             if temp > 60:  # Limite de temperatura para incêndio
                 self.alerts.append((node_id, temp))
-                print(f"ALERTA DE INCÊNDIO! Nó {node_id} detectou temperatura {temp}°C")
+                self.log.packet("ALERTA DE INCÊNDIO! Nó {} detectou temperatura {}°C", node_id, temp)
 
-def read_coordinates_from_file(file_path):
-    with open(file_path, 'r') as file:
-        num_nodes = int(file.readline().strip())
-        
-        bs_line = file.readline().strip()
-        bs_line = bs_line.replace('"', '').replace("'", "")
-        bs_parts = bs_line.replace(',', ' ').split()
-        bs_pos = (float(bs_parts[0]), float(bs_parts[1]))
-        
-        sensor_coords = []
-        for _ in range(num_nodes):
-            line = file.readline().strip()
-            if not line:
-                continue
-            line = line.replace('"', '').replace("'", "")
-            parts = line.replace(',', ' ').split()
-            x = float(parts[0])
-            y = float(parts[1])
-            sensor_coords.append((x, y))
-            
-    return num_nodes, bs_pos, sensor_coords
+def simulate_direct_communication(file_path, num_rounds, fast_forward=False, costs=None, params=DEFAULT_PARAMS, rng=None, log=None, retention=None, metrics=None, checkpoint=None, resume=None, profile=None):
+    '''Executa a simulação de comunicação direta.
+
+    Com fast_forward=True a rodada de morte de cada nó é calculada em forma fechada
+    (ver simulate_direct_fast_forward) e nenhuma temperatura é sorteada, então rng é ignorado;
+    o laço rodada a rodada abaixo é a implementação de referência. O fast-forward não executa
+    rodadas, então também ignora checkpoint e resume.
+    '''
+    if fast_forward:
+        return simulate_direct_fast_forward(file_path, num_rounds, costs, params, log, retention, metrics, profile)
 
-def simulate_direct_communication(file_path, num_rounds):
-    '''Executa a simulação de comunicação direta.'''
     num_nodes, bs_pos, sensor_coords = read_coordinates_from_file(file_path)
 
-    base_station = BaseStation(bs_pos[0], bs_pos[1])
+    # O cache de custos pode ser compartilhado entre protocolos que usam a mesma topologia
+    costs = cost_cache_for(costs, sensor_coords, bs_pos, params)
+    rng = make_rng(rng)
+    log = make_log(log)
+    metrics = make_sink(metrics)
+    profiler = make_profiler(profile)
+    distances_before = costs.distance_evaluations
+
+    base_station = BaseStation(bs_pos[0], bs_pos[1], log, retention)
     # Cria nós sensores com posições aleatórias
     nodes = [
-        SensorNode(i, x, y, base_station)
-        for i, (x,y) in enumerate(sensor_coords)
+        SensorNode(i, x, y, base_station, costs, params)
+        for i, (x,y) in enumerate(sensor_coords.tolist())
     ]
 
-    alive_history = [0 for _ in range(num_rounds)]
-    energy_history = [0 for _ in range(num_rounds)]
+    log.summary("Iniciando simulação de Comunicação Direta com {} nós.", num_nodes)
+    log.summary("Energia Inicial: {} J, Pacote: {} bits", params.INITIAL_ENERGY, params.PACKET_SIZE)
+    log.summary("-" * 30)
 
-    print(f"Iniciando simulação de Comunicação Direta com {num_nodes} nós.")
-    print(f"Energia Inicial: {INITIAL_ENERGY} J, Pacote: {PACKET_SIZE} bits")
-    print("-" * 30)
+    # Continua de um ponto de retomada, se informado, e grava novos pontos conforme a política
+    checkpointer = make_checkpointer(checkpoint)
+    start_round, first_node_death_round = 0, None
+    if resume is not None:
+        start_round, first_node_death_round = restore_simulation(
+            resume, 'Direta', params, nodes, NODE_STATE, base_station, rng, metrics)
+        log.summary("Retomando a partir da rodada {}.", start_round + 1)
+    round_num = start_round - 1
 
-    first_node_death_round = None
-
-    for round_num in range(num_rounds):
+    for round_num in range(start_round, num_rounds):
+        t = profiler.start()
         alive_nodes = sum(node.alive for node in nodes)
         percent_network_alive = alive_nodes/num_nodes
 
         if alive_nodes != num_nodes and first_node_death_round == None:
             first_node_death_round = round_num + 1
 
-        if percent_network_alive <= NETWORK_FUNCTIONAL_THRESHOLD:
+        if percent_network_alive <= params.NETWORK_FUNCTIONAL_THRESHOLD:
             break
 
-        print(f'\n--- Rodada {round_num + 1} ---')
+        log.round('\n--- Rodada {} ---', round_num + 1)
 
         if not any(node.alive for node in nodes):
-            print("Todos os nós morreram. Fim da simulação.")
+            log.round("Todos os nós morreram. Fim da simulação.")
             break
+        t = profiler.lap('round_check', t)
                 
         # Alguns nós detectam temperatura e enviam dados
+        # Cada nó só altera o próprio estado, então os vivos no início da rodada são os que sensoriam
+        alive_nodes = [node for node in nodes if node.alive]
+        # Simula detecção de temperatura, sorteada em lote para todos os nós vivos
+        fire = rng.random(len(alive_nodes)) < 0.1  # 10% chance de incêndio
+        temps = np.where(fire, rng.uniform(60, 100, len(alive_nodes)), rng.uniform(20, 50, len(alive_nodes))).tolist()
+
         nodes_sent = 0
-        for node in nodes:
-            #if node.alive and random.random() < 0.3:  # 30% chance de atividade por rodada
-            if node.alive:
-                node.rounds_alive += 1
-                # Simula detecção de temperatura
-                if random.random() < 0.1:  # 10% chance de incêndio
-                    temp = random.uniform(60, 100)
-                else:
-                    temp = random.uniform(20, 50)
-                
-                node.sense_environment(temp)
-                
-                # Tenta enviar dados para a BS
-                if node.alive and node.data:
-                    if node.send_data_to_base():
-                        nodes_sent += 1
+        for node, temp in zip(alive_nodes, temps):
+            node.rounds_alive += 1
+            node.sense_environment(temp)
+
+            # Tenta enviar dados para a BS
+            if node.alive and node.data:
+                if node.send_data_to_base():
+                    nodes_sent += 1
 
-        print(f"Nós que enviaram dados para BS: {nodes_sent}")
+        log.round("Nós que enviaram dados para BS: {}", nodes_sent)
+        t = profiler.lap('sense_send', t)
 
         for node in nodes:
             if node.alive:
                 node.sleep_mode()
+        t = profiler.lap('sleep', t)
 
         # Relatórios da rodada
         alive_nodes = sum(1 for node in nodes if node.alive)
         total_energy = sum(node.energy for node in nodes if node.alive)
         avg_energy = total_energy / max(1, num_nodes)
         
-        alive_history[round_num] = alive_nodes
-        energy_history[round_num] = avg_energy
+        metrics.push(round_num + 1, alive_nodes, avg_energy, sent_direct=nodes_sent)
 
-        print(f"Nós vivos: {alive_nodes}/{num_nodes}")
-        print(f"Energia média dos nós vivos: {avg_energy:.6f} J")
+        log.round("Nós vivos: {}/{}", alive_nodes, num_nodes)
+        log.round("Energia média dos nós vivos: {:.6f} J", avg_energy)
+        profiler.count('packets', nodes_sent)
+        t = profiler.lap('stats', t)
 
         if alive_nodes == 0:
-            print("\nTodos os nós morreram. Fim da simulação.")
+            log.round("\nTodos os nós morreram. Fim da simulação.")
             break
+
+        if checkpointer.due(round_num + 1):
+            checkpointer.save(capture_simulation('Direta', params, nodes, NODE_STATE, base_station, rng,
+                                                 metrics, round_num + 1, first_node_death_round))
+            profiler.lap('checkpoint', t)
             
-    print(f"\n--- Fim da Simulação (Após {round_num + 1} rodadas) ---")
-    show_final_results(nodes, base_station)
+    log.summary("\n--- Fim da Simulação (Após {} rodadas) ---", round_num + 1)
+    show_final_results(nodes, base_station, log)
+
+    rounds_vividas = [node.rounds_alive for node in nodes]
+    media_vida_nos = sum(rounds_vividas) / len(rounds_vividas)
+
+    log.summary("{}", media_vida_nos)
+
+    # Os históricos têm uma posição por rodada executada
+    profiler.count('distance_evaluations', costs.distance_evaluations - distances_before)
+    result = metrics.close()
+    result.profile = profiler if profiler.enabled else None
+    return SimulationResult((nodes, base_station, result.alive, result.mean_energy, media_vida_nos, first_node_death_round),
+                            result)
+
+def _survives_round(energy, tx_cost, params):
+    '''Indica se um nó com a energia dada completa uma rodada (sensoriamento, envio e sleep).'''
+    after_sense = energy - params.E_SENSE
+    after_send = after_sense - tx_cost
+    return (energy > params.E_SENSE) & (after_sense >= tx_cost) & (after_send > params.E_SLEEP)
+
+def simulate_direct_fast_forward(file_path, num_rounds, costs=None, params=DEFAULT_PARAMS, log=None, retention=None, metrics=None, profile=None):
+    '''Calcula a simulação de comunicação direta em forma fechada, sem executar as rodadas.
+
+    Cada nó paga o mesmo custo por rodada (params.E_SENSE + transmissão até a BS + params.E_SLEEP) e a
+    temperatura sorteada não influencia a energia. Assim, a quantidade de rodadas completas
+    de cada nó sai de uma divisão, e as curvas de nós vivos e energia média são montadas a
+    partir das rodadas de morte ordenadas. As leituras de temperatura não são sorteadas,
+    então a estação base retornada não possui dados nem alertas.
+    '''
+    num_nodes, bs_pos, sensor_coords = read_coordinates_from_file(file_path)
+
+    costs = cost_cache_for(costs, sensor_coords, bs_pos, params)
+    log = make_log(log)
+    metrics = make_sink(metrics)
+    profiler = make_profiler(profile)
+    distances_before = costs.distance_evaluations
+
+    base_station = BaseStation(bs_pos[0], bs_pos[1], log, retention)
+    nodes = [
+        SensorNode(i, x, y, base_station, costs, params)
+        for i, (x,y) in enumerate(sensor_coords.tolist())
+    ]
+    num_nodes = len(nodes)
+
+    log.summary("Iniciando simulação de Comunicação Direta (fast-forward) com {} nós.", num_nodes)
+    log.summary("Energia Inicial: {} J, Pacote: {} bits", params.INITIAL_ENERGY, params.PACKET_SIZE)
+    log.summary("-" * 30)
+
+    t = profiler.start()
+    tx_cost = params.PACKET_SIZE * costs.bs_per_bit
+    round_cost = params.E_SENSE + tx_cost + params.E_SLEEP
+
+    # full_rounds[i]: quantidade de rodadas completadas pelo nó i (ele morre na rodada seguinte).
+    # A estimativa pela divisão é corrigida pelas mesmas verificações do laço de referência.
+    full_rounds = np.floor(params.INITIAL_ENERGY / round_cost).astype(np.int64)
+    while True:
+        grow = _survives_round(params.INITIAL_ENERGY - full_rounds * round_cost, tx_cost, params)
+        if not grow.any():
+            break
+        full_rounds += grow
+    while True:
+        shrink = (full_rounds > 0) & ~_survives_round(params.INITIAL_ENERGY - (full_rounds - 1) * round_cost, tx_cost, params)
+        if not shrink.any():
+            break
+        full_rounds -= shrink
+
+    # No início da rodada r (base 0) estão vivos os nós com full_rounds >= r
+    order = np.argsort(full_rounds, kind='stable')
+    sorted_rounds = full_rounds[order]
+
+    def alive_at_start(r):
+        return num_nodes - np.searchsorted(sorted_rounds, r, side='left')
+
+    # Rodada em que a rede deixa de ser funcional (a simulação para no início dela)
+    last_checked = min(num_rounds, int(sorted_rounds[-1]) + 1)
+    starts = np.arange(last_checked + 1)
+    below = np.flatnonzero(alive_at_start(starts) / num_nodes <= params.NETWORK_FUNCTIONAL_THRESHOLD)
+    executed = min(num_rounds, int(below[0]) if len(below) else num_rounds)
+
+    first_node_death_round = None
+    min_rounds = int(sorted_rounds[0])
+    if min_rounds + 1 <= min(executed, num_rounds - 1):
+        first_node_death_round = min_rounds + 2
+
+    # Históricos: após a rodada j (base 1) estão vivos os nós com full_rounds >= j
+    rounds = np.arange(1, executed + 1)
+    first_alive = np.searchsorted(sorted_rounds, rounds, side='left')
+    alive_counts = num_nodes - first_alive
+    suffix_cost = np.concatenate((np.cumsum(round_cost[order][::-1])[::-1], [0.0]))
+    total_energy = alive_counts * params.INITIAL_ENERGY - rounds * suffix_cost[first_alive]
+
+    # Envios da rodada j: os nós que a completam e os que morrem no sleep dela (já tinham enviado)
+    death_energy = params.INITIAL_ENERGY - full_rounds * round_cost
+    sends_on_death = (death_energy > params.E_SENSE) & (death_energy - params.E_SENSE >= tx_cost)
+    dying_senders = np.bincount(full_rounds[sends_on_death] + 1, minlength=executed + 1)[1:executed + 1]
+
+    metrics.extend(round=rounds, alive=alive_counts, mean_energy=total_energy / max(1, num_nodes),
+                   sent_direct=alive_counts + dying_senders)
+    profiler.count('packets', int(alive_counts.sum() + dying_senders.sum()))
+    t = profiler.lap('closed_form', t)
+
+    # Estado final dos nós
+    for node, completed, cost in zip(nodes, full_rounds.tolist(), round_cost.tolist()):
+        node.rounds_alive = min(completed + 1, executed)
+        if completed < executed:
+            node.alive = False
+            node.energy = 0
+        else:
+            node.energy = params.INITIAL_ENERGY - executed * cost
+    profiler.lap('final_state', t)
+
+    log.summary("\n--- Fim da Simulação (Após {} rodadas) ---", executed)
+    show_final_results(nodes, base_station, log)
 
     rounds_vividas = [node.rounds_alive for node in nodes]
     media_vida_nos = sum(rounds_vividas) / len(rounds_vividas)
 
-    print(media_vida_nos)
+    log.summary("{}", media_vida_nos)
 
-    return nodes, base_station, alive_history, energy_history, media_vida_nos, first_node_death_round
+    # Os históricos têm uma posição por rodada executada
+    profiler.count('distance_evaluations', costs.distance_evaluations - distances_before)
+    result = metrics.close()
+    result.profile = profiler if profiler.enabled else None
+    return SimulationResult((nodes, base_station, result.alive, result.mean_energy, media_vida_nos, first_node_death_round),
+                            result)
 
-def show_final_results(nodes, base_station):
+def show_final_results(nodes, base_station, log=None):
     '''Mostra os resultados finais da simulação.'''
+    log = make_log(log)
     num_nodes = len(nodes)
     alive_nodes_list = [node for node in nodes if node.alive]
     dead_nodes_list = [node for node in nodes if not node.alive]
     alive_count = len(alive_nodes_list)
     dead_count = len(dead_nodes_list)
 
-    print(f"\n--- Resultados Finais ---")
-    print(f"Total de alertas de incêndio: {len(base_station.alerts)}")
-    print(f"Nós Vivos: {alive_count}/{num_nodes}")
-    print(f"Nós Mortos: {dead_count}/{num_nodes}")
+    log.summary("\n--- Resultados Finais ---")
+    log.summary("Total de alertas de incêndio: {}", len(base_station.alerts))
+    log.summary("Nós Vivos: {}/{}", alive_count, num_nodes)
+    log.summary("Nós Mortos: {}/{}", dead_count, num_nodes)
 
     if alive_nodes_list:
         avg_energy_alive = sum(node.energy for node in alive_nodes_list) / alive_count
-        print(f"Energia média final dos nós vivos: {avg_energy_alive:.6f} J")
+        log.summary("Energia média final dos nós vivos: {:.6f} J", avg_energy_alive)
     else:
-        print("Nenhum nó sobreviveu.")
\ No newline at end of file
+        log.summary("Nenhum nó sobreviveu.")
@@ -0,0 +1,353 @@
+'''
+Índice espacial (quadtree em ordem de Morton) para a busca do cluster head mais próximo.
+
+O índice é reconstruído uma vez por rodada sobre os CHs eleitos e responde em lote à consulta
+de todos os sensores membros. Os CHs são ordenados pelo código de Morton da célula mais fina,
+de modo que cada célula de qualquer nível da árvore corresponde a um trecho contíguo do vetor
+ordenado, e cada célula guarda a caixa envolvente dos seus CHs. A consulta desce a árvore nível
+a nível com todos os pares (sensor, célula) de uma vez, descartando as células cuja distância
+mínima até o sensor supera a menor distância máxima já garantida. Isso mantém o custo perto de
+N log N mesmo quando os CHs se concentram numa parte do campo, em vez de O(N·C) da busca exaustiva.
+'''
+import math
+
+import numpy as np
+
+# Abaixo desta quantidade de pares (consulta, ponto) a busca exaustiva é mais barata que montar a árvore
+BRUTE_FORCE_PAIRS = 20_000
+# Quantidade média de pontos por folha da árvore
+LEAF_SIZE = 8
+MAX_DEPTH = 16
+
+def _spread_bits(v):
+    '''Intercala zeros entre os bits de v (até 16 bits), para montar o código de Morton.'''
+    v = v.astype(np.uint64) & np.uint64(0xFFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x33333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x55555555)
+    return v
+
+def _segments(owner):
+    '''Início de cada trecho de valores iguais em owner (que está agrupado).'''
+    return np.flatnonzero(np.concatenate(([True], owner[1:] != owner[:-1])))
+
+def _expand(first, counts):
+    '''Para cada i, gera first[i], first[i] + 1, ..., first[i] + counts[i] - 1, concatenados.'''
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(first - offsets, counts) + np.arange(counts.sum())
+
+def _box_distances(nodes, cells, px, py):
+    '''Distância mínima e máxima de cada ponto (px, py) até a caixa envolvente da célula correspondente.
+
+    As duas são calculadas com as mesmas operações da distância exata, então, mesmo em ponto
+    flutuante, nenhum ponto da célula fica mais perto que a mínima nem mais longe que a máxima.
+    '''
+    bx0, bx1 = nodes['x0'][cells], nodes['x1'][cells]
+    by0, by1 = nodes['y0'][cells], nodes['y1'][cells]
+    dx = np.maximum(np.maximum(bx0 - px, px - bx1), 0)
+    dy = np.maximum(np.maximum(by0 - py, py - by1), 0)
+    fx = np.maximum(np.abs(px - bx0), np.abs(px - bx1))
+    fy = np.maximum(np.abs(py - by0), np.abs(py - by1))
+    return np.sqrt(dx**2 + dy**2), np.sqrt(fx**2 + fy**2)
+
+class QuadTreeIndex:
+    def __init__(self, x, y):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.size = len(self.x)
+        self.levels = []
+
+    def _build(self):
+        x0, y0 = self.x.min(), self.y.min()
+        side = max(self.x.max() - x0, self.y.max() - y0)
+        if side <= 0:
+            side = 1.0
+
+        depth = 0
+        while depth < MAX_DEPTH and 4**depth * LEAF_SIZE < self.size:
+            depth += 1
+        self.depth = depth
+
+        cells = 2**depth
+        cx = np.minimum(((self.x - x0) / side * cells).astype(np.int64), cells - 1)
+        cy = np.minimum(((self.y - y0) / side * cells).astype(np.int64), cells - 1)
+        codes = _spread_bits(cx) | (_spread_bits(cy) << np.uint64(1))
+
+        self.order = np.argsort(codes, kind='stable')
+        codes = codes[self.order]
+        sx, sy = self.x[self.order], self.y[self.order]
+
+        # Para cada nível: chaves das células não vazias, trecho [start, end) dos pontos e caixa envolvente
+        self.levels = []
+        for level in range(depth + 1):
+            keys = codes >> np.uint64(2 * (depth - level))
+            start = _segments(keys)
+            self.levels.append({
+                'keys': keys[start],
+                'start': start,
+                'end': np.append(start[1:], self.size),
+                'x0': np.minimum.reduceat(sx, start),
+                'x1': np.maximum.reduceat(sx, start),
+                'y0': np.minimum.reduceat(sy, start),
+                'y1': np.maximum.reduceat(sy, start),
+            })
+
+        # Filhos de cada célula: trecho contíguo das células do nível seguinte
+        for level in range(depth):
+            parent_keys = self.levels[level + 1]['keys'] >> np.uint64(2)
+            keys = self.levels[level]['keys']
+            self.levels[level]['child_lo'] = np.searchsorted(parent_keys, keys, side='left')
+            self.levels[level]['child_hi'] = np.searchsorted(parent_keys, keys, side='right')
+
+    def _seed_bound(self, qx, qy):
+        '''Desce a árvore pelo filho de menor distância mínima até uma folha e mede a distância aos
+        pontos dela: um limite superior, em geral muito próximo do exato, para cada consulta.'''
+        owners = np.arange(len(qx))
+        cells = np.zeros(len(qx), dtype=np.int64)
+
+        for level in range(self.depth):
+            nodes = self.levels[level]
+            counts = nodes['child_hi'][cells] - nodes['child_lo'][cells]
+            children = _expand(nodes['child_lo'][cells], counts)
+            child_owners = np.repeat(owners, counts)
+            lower, _ = _box_distances(self.levels[level + 1], children, qx[child_owners], qy[child_owners])
+            seg = np.cumsum(counts) - counts
+            best = np.minimum.reduceat(lower, seg)
+            first = np.where(lower == np.repeat(best, counts), np.arange(len(children)), len(children))
+            cells = children[np.minimum.reduceat(first, seg)]
+
+        leaves = self.levels[-1]
+        counts = leaves['end'][cells] - leaves['start'][cells]
+        candidates = self.order[_expand(leaves['start'][cells], counts)]
+        point_owners = np.repeat(owners, counts)
+        d = np.sqrt((qx[point_owners] - self.x[candidates])**2 + (qy[point_owners] - self.y[candidates])**2)
+        return np.minimum.reduceat(d, np.cumsum(counts) - counts)
+
+    def nearest(self, qx, qy):
+        '''Para cada consulta (qx[i], qy[i]) retorna a posição do ponto indexado mais próximo e a distância.
+
+        Em caso de empate vence o ponto de menor posição, como no min() sobre a lista de CHs.
+        '''
+        qx = np.asarray(qx, dtype=np.float64)
+        qy = np.asarray(qy, dtype=np.float64)
+        num_queries = len(qx)
+        if num_queries == 0 or self.size == 0:
+            return np.full(num_queries, -1, dtype=np.int64), np.full(num_queries, np.inf)
+
+        if num_queries * self.size <= BRUTE_FORCE_PAIRS:
+            return self._nearest_brute_force(qx, qy)
+
+        if not self.levels:
+            self._build()
+
+        # Pares (consulta, célula) ainda candidatos; os pares de uma consulta ficam sempre contíguos
+        bound = self._seed_bound(qx, qy)
+        owners = np.arange(num_queries)
+        cells = np.zeros(num_queries, dtype=np.int64)
+
+        for level, nodes in enumerate(self.levels):
+            lower, upper = _box_distances(nodes, cells, qx[owners], qy[owners])
+
+            # Toda célula não vazia tem um ponto a no máximo "upper"; células com "lower" maior que o
+            # melhor limite da consulta são descartadas
+            seg = _segments(owners)
+            bound[owners[seg]] = np.minimum(bound[owners[seg]], np.minimum.reduceat(upper, seg))
+            keep = lower <= bound[owners]
+            owners, cells = owners[keep], cells[keep]
+
+            if level < self.depth:
+                counts = nodes['child_hi'][cells] - nodes['child_lo'][cells]
+                cells = _expand(nodes['child_lo'][cells], counts)
+                owners = np.repeat(owners, counts)
+
+        # Folhas restantes: distância exata até cada ponto
+        leaves = self.levels[-1]
+        counts = leaves['end'][cells] - leaves['start'][cells]
+        candidates = self.order[_expand(leaves['start'][cells], counts)]
+        owners = np.repeat(owners, counts)
+        d = np.sqrt((qx[owners] - self.x[candidates])**2 + (qy[owners] - self.y[candidates])**2)
+
+        seg = _segments(owners)
+        lengths = np.diff(np.append(seg, len(owners)))
+        best_dist = np.minimum.reduceat(d, seg)
+        ties = np.where(d == np.repeat(best_dist, lengths), candidates, self.size)
+        best_pos = np.minimum.reduceat(ties, seg)
+        return best_pos, best_dist
+
+    def _nearest_brute_force(self, qx, qy):
+        '''Busca exaustiva em blocos, usada quando há poucos pares (consulta, ponto).'''
+        best_pos = np.empty(len(qx), dtype=np.int64)
+        best_dist = np.empty(len(qx), dtype=np.float64)
+        step = max(1, BRUTE_FORCE_PAIRS * 100 // self.size)
+
+        for start in range(0, len(qx), step):
+            bx, by = qx[start:start + step], qy[start:start + step]
+            d = np.sqrt((bx[:, None] - self.x)**2 + (by[:, None] - self.y)**2)
+            pos = np.argmin(d, axis=1)
+            best_pos[start:start + step] = pos
+            best_dist[start:start + step] = d[np.arange(len(bx)), pos]
+
+        return best_pos, best_dist
+
+# Células vizinhas visitadas por radius_pairs: a própria e metade das 8 adjacentes (a outra metade
+# é visitada a partir da célula vizinha), para cada par de células aparecer uma única vez
+_FORWARD_CELLS = ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1))
+
+def radius_pairs(x, y, radius):
+    '''Todos os pares (i, j), i < j, de pontos a no máximo radius um do outro, e a distância de cada par.
+
+    Os pontos são agrupados em uma grade de células de lado radius; só pontos da mesma célula ou
+    de células adjacentes podem formar um par, e todos os pares candidatos de cada deslocamento
+    de célula são gerados e filtrados de uma vez.
+    '''
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) < 2 or radius <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    cx = np.floor((x - x.min()) / radius).astype(np.int64)
+    cy = np.floor((y - y.min()) / radius).astype(np.int64)
+    # Uma coluna vazia de folga em cada lado faz os deslocamentos dy = ±1 não caírem na coluna vizinha
+    rows = int(cy.max()) + 3
+    key = (cx + 1) * rows + (cy + 1)
+    order = np.argsort(key, kind='stable')
+    sorted_key = key[order]
+    starts = _segments(sorted_key)
+    cells = sorted_key[starts]
+    counts = np.diff(np.append(starts, len(sorted_key)))
+
+    first, second = [], []
+    for dx, dy in _FORWARD_CELLS:
+        target = cells + dx * rows + dy
+        pos = np.minimum(np.searchsorted(cells, target), len(cells) - 1)
+        a = np.flatnonzero(cells[pos] == target)
+        b = pos[a]
+        pair_counts = counts[a] * counts[b]
+        # r-ésimo par de um par de células: ponto r // nb da célula a com o ponto r % nb da célula b
+        r = _expand(np.zeros(len(a), dtype=np.int64), pair_counts)
+        nb = np.repeat(counts[b], pair_counts)
+        i = np.repeat(starts[a], pair_counts) + r // nb
+        j = np.repeat(starts[b], pair_counts) + r % nb
+        if dx == 0 and dy == 0:
+            keep = i < j
+            i, j = i[keep], j[keep]
+        first.append(order[i])
+        second.append(order[j])
+
+    i = np.concatenate(first)
+    j = np.concatenate(second)
+    distances = np.sqrt((x[i] - x[j])**2 + (y[i] - y[j])**2)
+    close = distances <= radius
+    i, j, distances = i[close], j[close], distances[close]
+    swap = i > j
+    i[swap], j[swap] = j[swap], i[swap]
+    return i, j, distances
+
+class GridIndex:
+    '''Grade de células com remoção de pontos, para consultas unitárias do vizinho mais próximo e
+    dos pontos dentro de um raio.
+
+    Serve a algoritmos gulosos que consultam um ponto por vez e retiram o ponto escolhido (como
+    a montagem da corrente do PEGASIS). A busca percorre anéis de células em torno da consulta e
+    para quando o anel seguinte não pode ter ponto mais perto que o melhor encontrado. Quando
+    restam menos de um quarto dos pontos da última montagem, a grade é refeita com células
+    maiores sobre os pontos restantes, para a busca não atravessar muitas células vazias.
+    '''
+    def __init__(self, x, y, points_per_cell=2):
+        self.x = np.asarray(x, dtype=np.float64).tolist()
+        self.y = np.asarray(y, dtype=np.float64).tolist()
+        self.points_per_cell = points_per_cell
+        self.present = [True] * len(self.x)
+        self.size = len(self.x)
+        self._build(range(self.size))
+
+    def __len__(self):
+        return self.size
+
+    def _build(self, points):
+        points = list(points)
+        self.built_size = len(points)
+        if not points:
+            self.cols = self.rows = 0
+            self.cells = []
+            return
+        px = [self.x[i] for i in points]
+        py = [self.y[i] for i in points]
+        self.x0, self.y0 = min(px), min(py)
+        width, height = max(px) - self.x0, max(py) - self.y0
+        side = math.sqrt(max(width * height, 1e-12) * self.points_per_cell / len(points))
+        self.side = max(side, max(width, height) / 4096, 1e-9)
+        self.cols = int(width / self.side) + 1
+        self.rows = int(height / self.side) + 1
+        self.cells = [[] for _ in range(self.cols * self.rows)]
+        for i, cx, cy in zip(points, px, py):
+            self.cells[int((cx - self.x0) / self.side) * self.rows + int((cy - self.y0) / self.side)].append(i)
+
+    def remove(self, i):
+        if not self.present[i]:
+            return
+        self.present[i] = False
+        self.size -= 1
+        cx = int((self.x[i] - self.x0) / self.side)
+        cy = int((self.y[i] - self.y0) / self.side)
+        self.cells[cx * self.rows + cy].remove(i)
+        if self.size and self.size * 4 < self.built_size:
+            self._build(i for i in range(len(self.present)) if self.present[i])
+
+    def within(self, px, py, radius):
+        '''Pontos restantes a no máximo radius de (px, py).'''
+        if self.size == 0:
+            return []
+        side, rows, cells, xs, ys = self.side, self.rows, self.cells, self.x, self.y
+        x_lo = int(max((px - radius - self.x0) / side, 0))
+        x_hi = int(min((px + radius - self.x0) / side, self.cols - 1))
+        y_lo = int(max((py - radius - self.y0) / side, 0))
+        y_hi = int(min((py + radius - self.y0) / side, rows - 1))
+        limit = radius * radius
+        found = []
+        for gx in range(x_lo, x_hi + 1):
+            for key in range(gx * rows + y_lo, gx * rows + y_hi + 1):
+                for i in cells[key]:
+                    dx, dy = xs[i] - px, ys[i] - py
+                    if dx * dx + dy * dy <= limit:
+                        found.append(i)
+        return found
+
+    def nearest(self, px, py):
+        '''Ponto restante mais próximo de (px, py) e a distância; (-1, inf) se não restar nenhum.
+        Em caso de empate vence o ponto de menor índice.'''
+        if self.size == 0:
+            return -1, math.inf
+        side, cols, rows, cells, xs, ys = self.side, self.cols, self.rows, self.cells, self.x, self.y
+        cx = math.floor((px - self.x0) / side)
+        cy = math.floor((py - self.y0) / side)
+        # Distância da consulta até a borda da própria célula: o anel r fica a pelo menos (r - 1)·side + gap
+        gap = min(px - (self.x0 + cx * side), self.x0 + (cx + 1) * side - px,
+                  py - (self.y0 + cy * side), self.y0 + (cy + 1) * side - py)
+        best = (math.inf, -1)
+        first_ring = max(0, cx - (cols - 1), -cx, cy - (rows - 1), -cy)
+        last_ring = max(cx, cols - 1 - cx, cy, rows - 1 - cy)
+
+        for r in range(first_ring, last_ring + 1):
+            if r > 0 and (r - 1) * side + gap > best[0]:
+                break
+            x_lo, x_hi = max(cx - r, 0), min(cx + r, cols - 1)
+            y_lo, y_hi = max(cy - r, 0), min(cy + r, rows - 1)
+            ring = []
+            for gx in range(x_lo, x_hi + 1):
+                if gx == cx - r or gx == cx + r:
+                    ring.extend(gx * rows + gy for gy in range(y_lo, y_hi + 1))
+                else:
+                    if 0 <= cy - r < rows:
+                        ring.append(gx * rows + cy - r)
+                    if 0 <= cy + r < rows:
+                        ring.append(gx * rows + cy + r)
+            for key in ring:
+                for i in cells[key]:
+                    dx, dy = xs[i] - px, ys[i] - py
+                    candidate = (math.sqrt(dx * dx + dy * dy), i)
+                    if candidate < best:
+                        best = candidate
+
+        return best[1], best[0]
@@ -0,0 +1,193 @@
+'''
+Motor de eventos discretos para a comunicação direta com ciclos de trabalho heterogêneos.
+
+O tempo é contado em ticks (um tick equivale a uma rodada de direto.py). O sensor i acorda
+nos ticks offsets[i], offsets[i] + periods[i], ...: nesses ticks ele executa a mesma sequência
+de uma rodada do laço de referência (sensoriamento, envio à ERB e sleep). Nos demais ticks ele
+só dorme e paga params.E_SLEEP.
+
+Em vez de visitar todos os sensores a cada tick, cada sensor tem um único evento pendente em um
+heap: o próximo despertar ou, se a energia acabar antes dele, a morte durante o sleep. Os ticks
+ociosos entre dois eventos são descontados de uma vez (k · E_SLEEP), então monitorar uma rede
+que sensoria a cada 10 minutos durante um ano custa proporcional ao número de despertares, e
+não ao número de ticks. Com periods=1 e offsets=0 o resultado (nós vivos por tick, morte do
+primeiro nó e média de rodadas vividas) é o mesmo de simulate_direct_communication.
+'''
+import heapq
+
+import numpy as np
+
+from aleatorio import make_rng
+from custos import cost_cache_for
+from direto import BaseStation, SensorNode, show_final_results
+from metricas import SimulationResult, make_sink
+from parametros import DEFAULT_PARAMS
+from perfil import make_profiler
+from registro import make_log
+from topologia import read_coordinates_from_file
+
+# Tipos de evento (o tick vem primeiro na tupla do heap e o node_id desempata, como a ordem do laço de referência)
+WAKE = 0
+DEATH = 1
+
+def _temperatures(rng, block=4096):
+    '''Leituras de temperatura como em direto.py (10% de chance de incêndio), sorteadas em blocos.'''
+    while True:
+        fire = rng.random(block) < 0.1
+        yield from np.where(fire, rng.uniform(60, 100, block), rng.uniform(20, 50, block)).tolist()
+
+def idle_ticks_survived(energy, e_sleep):
+    '''Quantos ticks seguidos de sleep um sensor com a energia dada completa (sleep_mode exige energia > e_sleep).'''
+    if e_sleep <= 0:
+        return float('inf')
+    ticks = max(0, int(np.ceil(energy / e_sleep)) - 1)
+    # Corrige o arredondamento da divisão com a mesma comparação de sleep_mode
+    while ticks > 0 and not energy - (ticks - 1) * e_sleep > e_sleep:
+        ticks -= 1
+    while energy - ticks * e_sleep > e_sleep:
+        ticks += 1
+    return ticks
+
+def _per_node(values, num_nodes):
+    values = np.broadcast_to(np.asarray(values, dtype=np.int64), (num_nodes,))
+    return values.tolist()
+
+def simulate_direct_event_driven(file_path, num_ticks, periods=1, offsets=0, report_interval=1, costs=None,
+                                 params=DEFAULT_PARAMS, rng=None, log=None, retention=None, metrics=None, profile=None):
+    '''Executa a comunicação direta dirigida por eventos.
+
+    periods e offsets podem ser um inteiro (igual para todos) ou um valor por sensor. As métricas
+    são registradas ao fim de cada report_interval ticks e do último tick executado; sent_direct é
+    a quantidade de envios desde o registro anterior.
+    '''
+    num_nodes, bs_pos, sensor_coords = read_coordinates_from_file(file_path)
+
+    costs = cost_cache_for(costs, sensor_coords, bs_pos, params)
+    rng = make_rng(rng)
+    log = make_log(log)
+    metrics = make_sink(metrics)
+    profiler = make_profiler(profile)
+
+    base_station = BaseStation(bs_pos[0], bs_pos[1], log, retention)
+    nodes = [
+        SensorNode(i, x, y, base_station, costs, params)
+        for i, (x,y) in enumerate(sensor_coords.tolist())
+    ]
+    num_nodes = len(nodes)
+
+    periods = _per_node(periods, num_nodes)
+    offsets = _per_node(offsets, num_nodes)
+    if num_nodes and (min(periods) < 1 or min(offsets) < 0):
+        raise ValueError("periods deve ser >= 1 e offsets deve ser >= 0")
+    if report_interval < 1:
+        raise ValueError("report_interval deve ser >= 1")
+
+    log.summary("Iniciando simulação de Comunicação Direta (eventos discretos) com {} nós.", num_nodes)
+    log.summary("Energia Inicial: {} J, Pacote: {} bits", params.INITIAL_ENERGY, params.PACKET_SIZE)
+    log.summary("-" * 30)
+
+    e_sleep = params.E_SLEEP
+    temperatures = _temperatures(rng)
+
+    # clock[i]: tick em cujo início node.energy é válida (os ticks ociosos anteriores já foram pagos)
+    clock = [0] * num_nodes
+    death_tick = [None] * num_nodes
+
+    def next_event(i, wake_tick):
+        '''Próximo despertar do sensor i ou, se a energia não durar os ticks ociosos até lá, a morte no sleep.'''
+        survived = idle_ticks_survived(nodes[i].energy, e_sleep)
+        if survived >= wake_tick - clock[i]:
+            return (wake_tick, i, WAKE)
+        return (clock[i] + survived, i, DEATH)
+
+    heap = [next_event(i, offsets[i]) for i in range(num_nodes)]
+    heapq.heapify(heap)
+
+    # Somas sobre os sensores vivos, para a energia média sem percorrer a rede a cada registro
+    alive_count = num_nodes
+    energy_sum = float(sum(node.energy for node in nodes))
+    clock_sum = 0
+
+    stop = num_ticks
+    if num_nodes == 0 or 1 <= params.NETWORK_FUNCTIONAL_THRESHOLD:
+        stop = 0
+    first_node_death_round = None
+    next_report = report_interval - 1
+    sent_since_report = 0
+    events = 0
+
+    def report(tick):
+        total_energy = energy_sum - e_sleep * (alive_count * (tick + 1) - clock_sum)
+        metrics.push(tick + 1, alive_count, total_energy / max(1, num_nodes), sent_direct=sent_since_report)
+
+    t = profiler.start()
+    while heap and heap[0][0] < stop:
+        tick, i, kind = heapq.heappop(heap)
+        events += 1
+
+        while next_report < tick:
+            report(next_report)
+            sent_since_report = 0
+            next_report += report_interval
+
+        node = nodes[i]
+        energy_sum -= node.energy
+        clock_sum -= clock[i]
+
+        if kind == WAKE:
+            # Ticks ociosos desde o último evento, depois a mesma rodada do laço de referência
+            node.energy -= (tick - clock[i]) * e_sleep
+            node.sense_environment(next(temperatures))
+            if node.alive and node.data:
+                if node.send_data_to_base():
+                    sent_since_report += 1
+            if node.alive:
+                node.sleep_mode()
+        else:
+            node.alive = False
+            node.energy = 0
+
+        if node.alive:
+            clock[i] = tick + 1
+            energy_sum += node.energy
+            clock_sum += clock[i]
+            heapq.heappush(heap, next_event(i, tick + periods[i]))
+            continue
+
+        death_tick[i] = tick
+        alive_count -= 1
+        if first_node_death_round is None and tick + 1 < num_ticks:
+            first_node_death_round = tick + 2
+        # A rede deixa de ser funcional no início do tick seguinte
+        if alive_count / num_nodes <= params.NETWORK_FUNCTIONAL_THRESHOLD:
+            stop = min(stop, tick + 1)
+
+    executed = min(stop, num_ticks)
+    while next_report < executed:
+        report(next_report)
+        sent_since_report = 0
+        next_report += report_interval
+    if executed > 0 and next_report - report_interval != executed - 1:
+        report(executed - 1)
+    t = profiler.lap('events', t)
+
+    # Estado final: os sensores vivos pagam os ticks ociosos até o fim da simulação
+    for i, node in enumerate(nodes):
+        if death_tick[i] is None:
+            node.energy -= (executed - clock[i]) * e_sleep
+            node.rounds_alive = executed
+        else:
+            node.rounds_alive = death_tick[i] + 1
+    profiler.lap('final_state', t)
+    profiler.count('events', events)
+
+    log.summary("\n--- Fim da Simulação (Após {} ticks, {} eventos) ---", executed, events)
+    show_final_results(nodes, base_station, log)
+
+    media_vida_nos = sum(node.rounds_alive for node in nodes) / max(1, num_nodes)
+    log.summary("Média de ticks vividos por nó: {:.2f}", media_vida_nos)
+
+    result = metrics.close()
+    result.profile = profiler if profiler.enabled else None
+    return SimulationResult((nodes, base_station, result.alive, result.mean_energy, media_vida_nos, first_node_death_round),
+                            result)
@@ -0,0 +1,100 @@
+'''
+Gerador de topologias sintéticas para estudos de escala.
+
+Todas as coordenadas de uma topologia são sorteadas de uma vez com NumPy, então redes de
+1 milhão de sensores são geradas em frações de segundo. Disposições disponíveis:
+
+- 'uniform': sensores uniformemente distribuídos no campo (como os arquivos de dataset/);
+- 'clustered': manchas gaussianas em torno de centros sorteados no campo (parâmetro clusters);
+- 'grid': grade regular, preenchida linha a linha até num_nodes sensores;
+- 'corridor': faixa horizontal de largura corridor_width no meio do campo.
+
+Por padrão a ERB fica no centro do campo quadrado de lado field_size (os arquivos de dataset/
+usam um campo de 1000 m). Cada topologia pode ser gravada em texto (.txt) e no formato binário (.topo).
+'''
+import math
+import os
+
+import numpy as np
+
+from aleatorio import make_rng
+from topologia import write_binary_topology, write_text_topology
+
+FIELD_SIZE = 1000.0
+LAYOUTS = ('uniform', 'clustered', 'grid', 'corridor')
+SCALING_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+def uniform_layout(num_nodes, field_size, rng):
+    return rng.uniform(0, field_size, (num_nodes, 2))
+
+def clustered_layout(num_nodes, field_size, rng, clusters=8, cluster_std=None):
+    '''Sensores sorteados entre manchas gaussianas; cluster_std é o desvio padrão de cada mancha (5% do campo por padrão).'''
+    if cluster_std is None:
+        cluster_std = 0.05 * field_size
+    centers = rng.uniform(0, field_size, (clusters, 2))
+    members = rng.integers(0, clusters, num_nodes)
+    coords = centers[members] + rng.normal(0, cluster_std, (num_nodes, 2))
+    return np.clip(coords, 0, field_size)
+
+def grid_layout(num_nodes, field_size):
+    '''Grade com o menor lado inteiro que comporta num_nodes, com os sensores no centro de cada célula.'''
+    side = max(1, math.ceil(math.sqrt(num_nodes)))
+    spacing = field_size / side
+    cells = np.arange(num_nodes)
+    return np.column_stack(((cells % side + 0.5) * spacing, (cells // side + 0.5) * spacing))
+
+def corridor_layout(num_nodes, field_size, rng, corridor_width=None):
+    '''Faixa horizontal centrada no campo; corridor_width é 10% do campo por padrão.'''
+    if corridor_width is None:
+        corridor_width = 0.1 * field_size
+    x = rng.uniform(0, field_size, num_nodes)
+    y = rng.uniform((field_size - corridor_width) / 2, (field_size + corridor_width) / 2, num_nodes)
+    return np.column_stack((x, y))
+
+def generate_topology(num_nodes, layout='uniform', field_size=FIELD_SIZE, bs_pos=None, seed=0, **options):
+    '''Gera (bs_pos, coords) para a disposição pedida. options vai para a função da disposição
+    (clusters e cluster_std em 'clustered', corridor_width em 'corridor').'''
+    rng = make_rng(seed)
+    if bs_pos is None:
+        bs_pos = (field_size / 2, field_size / 2)
+
+    if layout == 'uniform':
+        coords = uniform_layout(num_nodes, field_size, rng)
+    elif layout == 'clustered':
+        coords = clustered_layout(num_nodes, field_size, rng, **options)
+    elif layout == 'grid':
+        coords = grid_layout(num_nodes, field_size)
+    elif layout == 'corridor':
+        coords = corridor_layout(num_nodes, field_size, rng, **options)
+    else:
+        raise ValueError(f"Disposição desconhecida: {layout} (use uma de {LAYOUTS})")
+
+    return (float(bs_pos[0]), float(bs_pos[1])), coords
+
+def write_topology(base_path, bs_pos, coords, formats=('txt', 'topo')):
+    '''Grava a topologia em base_path.txt e/ou base_path.topo e retorna os caminhos gravados.'''
+    paths = []
+    for fmt in formats:
+        path = f'{base_path}.{fmt}'
+        if fmt == 'txt':
+            write_text_topology(path, bs_pos, coords)
+        elif fmt == 'topo':
+            write_binary_topology(path, bs_pos, coords)
+        else:
+            raise ValueError(f"Formato de topologia desconhecido: {fmt}")
+        paths.append(path)
+    return paths
+
+def dataset_name(num_nodes, layout='uniform'):
+    '''Nome do arquivo em dataset/: "1000" para a disposição uniforme e "1000_clustered" para as demais.'''
+    return str(num_nodes) if layout == 'uniform' else f'{num_nodes}_{layout}'
+
+def generate_datasets(sizes=SCALING_SIZES, layouts=('uniform',), directory='../dataset', seed=0,
+                      formats=('txt', 'topo'), **options):
+    '''Gera e grava uma topologia para cada combinação de tamanho e disposição.'''
+    paths = []
+    for layout in layouts:
+        for num_nodes in sizes:
+            bs_pos, coords = generate_topology(num_nodes, layout, seed=seed, **options)
+            paths += write_topology(os.path.join(directory, dataset_name(num_nodes, layout)), bs_pos, coords, formats)
+    return paths
@@ -0,0 +1,202 @@
+'''
+Geração dos gráficos comparativos, sem depender de tela.
+
+O matplotlib só é importado quando um gráfico é desenhado (simulações sem gráficos não pagam o
+custo da importação) e, com headless=True, usa o backend Agg, que apenas grava o arquivo e nunca
+abre janela nem bloqueia em plt.show(). As séries longas são reduzidas antes de desenhar: cada
+balde de rodadas contribui com o seu mínimo e o seu máximo, o que preserva picos, vales e quedas
+bruscas da curva com alguns milhares de pontos, e os marcadores são desenhados só a cada
+tantos pontos. Vários gráficos podem ser gerados ao mesmo tempo em processos separados
+(render_figures).
+'''
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Quantidade máxima de pontos desenhados por série (metade dos baldes dá o mínimo, metade o máximo)
+MAX_POINTS = 2000
+# Quantidade aproximada de marcadores por curva
+MARKERS_PER_SERIES = 40
+
+COLORS = {
+    'Direta': 'blue',
+    'LEACH': 'green',
+    'E-LEACH': 'red',
+    'PEGASIS': 'purple',
+    'Direta (fast-forward)': 'navy',
+    'Direta (eventos)': 'cornflowerblue',
+    'LEACH (vetorizado)': 'limegreen',
+    'E-LEACH (vetorizado)': 'salmon',
+    'K-means (vetorizado)': 'orange',
+    'Multissalto': 'brown',
+}
+# Estilo de linha e marcador de cada protocolo nos gráficos de uma única execução
+STYLES = {
+    'Direta': ('-', '.'),
+    'LEACH': ('--', 'x'),
+    'E-LEACH': ('-.', 'o'),
+    'PEGASIS': (':', 's'),
+    'Direta (fast-forward)': ('-', '+'),
+    'Direta (eventos)': ('--', '.'),
+    'LEACH (vetorizado)': ('--', '+'),
+    'E-LEACH (vetorizado)': ('-.', '^'),
+    'K-means (vetorizado)': (':', 'D'),
+    'Multissalto': ('-', 'v'),
+}
+
+def pyplot(headless=False):
+    '''Importa o pyplot sob demanda; com headless=True usa o backend Agg (só grava arquivos).'''
+    import matplotlib
+    if headless:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def downsample(values, max_points=MAX_POINTS):
+    '''Índices dos pontos mantidos de uma série: o primeiro, o último e o mínimo e o máximo de cada balde.'''
+    values = np.asarray(values)
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n)
+
+    buckets = max(1, (max_points - 2) // 2)
+    size = -(-n // buckets)
+    # Completa o último balde repetindo o último valor, para todos terem o mesmo tamanho
+    padded = np.concatenate((values, np.repeat(values[-1:], buckets * size - n))).reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    keep = np.concatenate(([0, n - 1], offsets + padded.argmin(axis=1), offsets + padded.argmax(axis=1)))
+    return np.unique(np.minimum(keep, n - 1))
+
+def _plot_series(plt, values, label, color, linestyle='-', marker=None, max_points=MAX_POINTS):
+    '''Desenha uma série por rodada (rodada 1 no índice 0) já reduzida.'''
+    values = np.asarray(values)
+    idx = downsample(values, max_points)
+    markevery = max(1, len(idx) // MARKERS_PER_SERIES)
+    plt.plot(idx + 1, values[idx], label=label, linestyle=linestyle, marker=marker, markevery=markevery, color=color)
+
+def _finish(plt, path, show):
+    plt.tight_layout()
+    if path is not None:
+        plt.savefig(path)
+    if show:
+        plt.show()
+    plt.close()
+    return path
+
+def plot_comparison(path, alive, energy, media_vida, vida_util, show=False, headless=True, max_points=MAX_POINTS):
+    '''Figura 2x2 de uma execução de cada protocolo: nós vivos e energia média por rodada (até a
+    menor vida útil), média de rodadas vividas e vida útil. Os argumentos são dicionários por protocolo.'''
+    plt = pyplot(headless)
+    protocolos = list(alive)
+    menor_vida_util = min(vida_util.values())
+
+    plt.figure(figsize=(14, 10))
+
+    # Subplot 4: Vida Útil da Rede
+    plt.subplot(2, 2, 4)
+    plt.bar(protocolos, [vida_util[p] for p in protocolos], color=[COLORS[p] for p in protocolos])
+    plt.title('Vida Útil da Rede')
+    plt.ylabel('Rodadas')
+    plt.grid(axis='y')
+
+    for posicao, series, titulo, ylabel in [(1, alive, 'Nós Vivos por Rodada', 'Número de Nós Vivos'),
+                                            (2, energy, 'Energia Média por Rodada (Sensores Vivos)', 'Energia Média (J)')]:
+        plt.subplot(2, 2, posicao)
+        for p in protocolos:
+            linestyle, marker = STYLES[p]
+            _plot_series(plt, np.asarray(series[p])[:menor_vida_util], p, COLORS[p], linestyle, marker, max_points)
+        plt.title(titulo)
+        plt.xlabel('Rodada')
+        plt.ylabel(ylabel)
+        plt.grid(True)
+        plt.legend()
+
+    # Subplot 3: Média de Vida dos Nós
+    plt.subplot(2, 2, 3)
+    plt.bar(protocolos, [media_vida[p] for p in protocolos], color=[COLORS[p] for p in protocolos])
+    plt.title('Média de Rodadas Vividas por Sensor')
+    plt.ylabel('Rodadas')
+    plt.grid(axis='y')
+
+    return _finish(plt, path, show)
+
+def plot_monte_carlo(path, resultados, show=False, headless=True, max_points=MAX_POINTS):
+    '''Figura 2x2 das repetições Monte Carlo: médias com faixa de percentis e barras com intervalo de confiança.'''
+    plt = pyplot(headless)
+    protocolos = list(resultados)
+    # O eixo X vai até a maior vida útil observada em qualquer repetição
+    maior_vida_util = max(max(r.vida_util) for r in resultados.values())
+
+    plt.figure(figsize=(14, 10))
+
+    for posicao, media, faixa, titulo, ylabel in [(1, 'alive_mean', 'alive_band', 'Nós Vivos por Rodada', 'Número de Nós Vivos'),
+                                                  (2, 'energy_mean', 'energy_band', 'Energia Média por Rodada (Sensores Vivos)', 'Energia Média (J)')]:
+        plt.subplot(2, 2, posicao)
+        for p in protocolos:
+            r = resultados[p]
+            mean = getattr(r, media)[:maior_vida_util]
+            low, high = (band[:maior_vida_util] for band in getattr(r, faixa))
+            _plot_series(plt, mean, p, COLORS[p], max_points=max_points)
+            # A faixa mantém os pontos escolhidos para cada um dos dois percentis
+            idx = np.union1d(downsample(low, max_points), downsample(high, max_points))
+            plt.fill_between(idx + 1, low[idx], high[idx], color=COLORS[p], alpha=0.2)
+        plt.title(titulo)
+        plt.xlabel('Rodada')
+        plt.ylabel(ylabel)
+        plt.grid(True)
+        plt.legend()
+
+    # Subplots 3 e 4: barras com a média e o intervalo de confiança
+    for posicao, titulo, metrica in [(3, 'Média de Rodadas Vividas por Sensor', 'media_vida_nos_ci'),
+                                     (4, 'Vida Útil da Rede', 'vida_util_ci')]:
+        plt.subplot(2, 2, posicao)
+        ics = [getattr(resultados[p], metrica) for p in protocolos]
+        medias = [ic[0] for ic in ics]
+        erros = [[ic[0] - ic[1] for ic in ics], [ic[2] - ic[0] for ic in ics]]
+        plt.bar(protocolos, medias, yerr=erros, capsize=6, color=[COLORS[p] for p in protocolos])
+        plt.title(titulo)
+        plt.ylabel('Rodadas')
+        plt.grid(axis='y')
+
+    return _finish(plt, path, show)
+
+def _render(job):
+    plot, kwargs = job
+    return plot(**kwargs, show=False, headless=True)
+
+def render_figures(jobs, max_workers=None):
+    '''Gera vários gráficos em paralelo, cada um em um processo com o backend Agg.
+
+    jobs é uma lista de (função, kwargs), por exemplo (plot_comparison, {'path': ..., 'alive': ...});
+    retorna os caminhos gravados, na ordem dos jobs.
+    '''
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    max_workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+    if max_workers == 1:
+        return [_render(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_render, jobs))
+
+def plot_run(path, alive, energy, protocolo, titulo=None, show=False, headless=True, max_points=MAX_POINTS):
+    '''Figura 1x2 de uma única execução: nós vivos e energia média por rodada.'''
+    plt = pyplot(headless)
+    color = COLORS.get(protocolo, 'black')
+    linestyle, marker = STYLES.get(protocolo, ('-', None))
+
+    plt.figure(figsize=(14, 5))
+    for posicao, series, subtitulo, ylabel in [(1, alive, 'Nós Vivos por Rodada', 'Número de Nós Vivos'),
+                                               (2, energy, 'Energia Média por Rodada (Sensores Vivos)', 'Energia Média (J)')]:
+        plt.subplot(1, 2, posicao)
+        _plot_series(plt, series, protocolo, color, linestyle, marker, max_points)
+        plt.title(subtitulo)
+        plt.xlabel('Rodada')
+        plt.ylabel(ylabel)
+        plt.grid(True)
+        plt.legend()
+    if titulo:
+        plt.suptitle(titulo)
+
+    return _finish(plt, path, show)
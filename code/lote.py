@@ -0,0 +1,210 @@
+'''
+Execução em lote, sem perguntas no terminal: todas as combinações (topologia, protocolo, rodadas,
+semente) informadas na linha de comando rodam em um ProcessPoolExecutor, e cada uma grava os
+próprios resultados assim que termina:
+
+- <saída>/<topologia>/<protocolo>_r<rodadas>_s<semente>.csv: métricas por rodada (metricas.CSVSink);
+- o mesmo nome com .json: métricas escalares e tempo de execução;
+- o mesmo nome com .png: nós vivos e energia média por rodada (graficos.plot_run, backend Agg);
+- <saída>/resumo.csv: uma linha por execução, na ordem em que terminaram;
+- <saída>/<topologia>/comparacao_r<rodadas>_s<semente>.png: a figura 2x2 de graficos.plot_comparison
+  com todos os protocolos da mesma topologia, rodadas e semente, geradas em paralelo ao final
+  (graficos.render_figures).
+
+As execuções maiores (tamanho do arquivo da topologia vezes rodadas) são submetidas primeiro,
+para que a mais lenta não comece por último e a matriz termine perto do tempo dela.
+
+Exemplo (de dentro da pasta code):
+    python lote.py --datasets 50 100 200 400 --protocolos Direta LEACH E-LEACH --rodadas 2000 --sementes 0 1 2
+'''
+import argparse
+import csv
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from aleatorio import seed_label
+from cache_resultados import make_cache, run_cached
+from desempenho import ENGINES
+from graficos import plot_comparison, plot_run, render_figures
+from metricas import CSVSink, read_metrics_csv
+from monte_carlo import PROTOCOLOS, replica_seeds
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dataset')
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'results', 'lote')
+
+SUMMARY_FIELDS = ['dataset', 'protocolo', 'rounds', 'seed', 'executed_rounds', 'vida_util', 'media_vida_nos',
+                  'first_node_death_round', 'final_alive', 'seconds', 'metrics', 'figure']
+
+def resolve_dataset(name, dataset_dir=DATASET_DIR):
+    '''Caminho da topologia: um arquivo existente ou um nome da pasta dataset (.txt ou .topo), como em main.py.'''
+    if os.path.isfile(name):
+        return name
+    for extension in ('.txt', '.topo'):
+        path = os.path.join(dataset_dir, name + extension)
+        if os.path.isfile(path):
+            return path
+    raise FileNotFoundError(f'Topologia não encontrada: {name}')
+
+def _slug(text):
+    return re.sub(r'[^0-9A-Za-z]+', '-', text).strip('-').lower()
+
+def job_prefix(output_dir, dataset, protocolo, num_rounds, seed):
+    '''Caminho, sem extensão, dos arquivos de uma execução.'''
+    return os.path.join(output_dir, dataset, f'{_slug(protocolo)}_r{num_rounds}_s{seed_label(seed)}')
+
+def run_job(dataset, file_path, protocolo, num_rounds, seed, output_dir, figures=True, cache=None):
+    '''Executa uma combinação sem saída no terminal, grava CSV, JSON e figura e devolve a linha do resumo.
+
+    Com cache (ver cache_resultados.make_cache), uma combinação já executada só regrava os arquivos.
+    '''
+    prefix = job_prefix(output_dir, dataset, protocolo, num_rounds, seed)
+    os.makedirs(os.path.dirname(prefix), exist_ok=True)
+
+    start = time.perf_counter()
+    result = run_cached(cache, protocolo, ENGINES[protocolo], file_path, num_rounds, seed)
+    seconds = time.perf_counter() - start
+    media_vida_nos = result['media_vida_nos']
+    first_node_death_round = result['first_node_death_round']
+
+    sink = CSVSink(prefix + '.csv')
+    sink.extend(**result['columns'])
+    sink.close()
+
+    alive = result['columns']['alive']
+    energy = result['columns']['mean_energy']
+    figure = None
+    if figures and len(alive):
+        figure = plot_run(prefix + '.png', alive, energy, protocolo,
+                          titulo=f'{protocolo} - {dataset} (semente {seed_label(seed)})')
+
+    row = {
+        'dataset': dataset,
+        'protocolo': protocolo,
+        'rounds': num_rounds,
+        'seed': seed_label(seed),
+        'executed_rounds': len(alive),
+        'vida_util': int(np.count_nonzero(alive)),
+        'media_vida_nos': media_vida_nos,
+        'first_node_death_round': first_node_death_round,
+        'final_alive': int(alive[-1]) if len(alive) else None,
+        'seconds': seconds,
+        'metrics': prefix + '.csv',
+        'figure': figure,
+    }
+    with open(prefix + '.json', 'w', encoding='utf-8') as f:
+        json.dump(row, f, indent=2)
+    return row
+
+def _run_job(job):
+    return run_job(*job)
+
+def make_jobs(datasets, protocolos, rounds, seeds, output_dir, figures=True, dataset_dir=DATASET_DIR, cache=None):
+    '''Todas as combinações, das mais caras para as mais baratas.'''
+    jobs = []
+    for name in datasets:
+        file_path = resolve_dataset(name, dataset_dir)
+        dataset = os.path.splitext(os.path.basename(file_path))[0]
+        size = os.path.getsize(file_path)
+        for protocolo in protocolos:
+            if protocolo not in ENGINES:
+                raise KeyError(f'Protocolo desconhecido: {protocolo}')
+            for num_rounds in rounds:
+                for seed in seeds:
+                    jobs.append((size * num_rounds, (dataset, file_path, protocolo, num_rounds, seed, output_dir, figures, cache)))
+    jobs.sort(key=lambda job: job[0], reverse=True)
+    return [job for _, job in jobs]
+
+def run_batch(datasets, protocolos=tuple(PROTOCOLOS), rounds=(1000,), seeds=(0,), output_dir=DEFAULT_OUTPUT,
+              figures=True, max_workers=None, dataset_dir=DATASET_DIR, progress=print, cache=None):
+    '''Executa todas as combinações em processos e grava <output_dir>/resumo.csv; devolve as linhas do resumo.'''
+    jobs = make_jobs(datasets, protocolos, rounds, seeds, output_dir, figures, dataset_dir, make_cache(cache))
+    os.makedirs(output_dir, exist_ok=True)
+    rows = []
+    if not jobs:
+        return rows
+
+    with open(os.path.join(output_dir, 'resumo.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        f.flush()
+
+        executor = ProcessPoolExecutor(max_workers=min(len(jobs), max_workers or os.cpu_count() or 1))
+        try:
+            futures = [executor.submit(_run_job, job) for job in jobs]
+            for done, future in enumerate(as_completed(futures), start=1):
+                row = future.result()
+                writer.writerow(row)
+                f.flush()
+                rows.append(row)
+                if progress is not None:
+                    progress(f"[{done}/{len(jobs)}] {row['protocolo']} em {row['dataset']} "
+                             f"({row['rounds']} rodadas, semente {row['seed']}): vida útil {row['vida_util']} "
+                             f"rodadas, {row['seconds']:.2f} s")
+        finally:
+            # Com erro em uma execução ou interrupção, as já concluídas ficam gravadas e as pendentes
+            # são descartadas
+            executor.shutdown(cancel_futures=True)
+
+    if figures:
+        render_figures(comparison_figures(rows, output_dir), max_workers)
+    return rows
+
+def comparison_figures(rows, output_dir):
+    '''Jobs de render_figures com a comparação dos protocolos de cada (topologia, rodadas, semente).'''
+    groups = {}
+    for row in rows:
+        groups.setdefault((row['dataset'], row['rounds'], row['seed']), []).append(row)
+
+    jobs = []
+    for (dataset, num_rounds, seed), group in groups.items():
+        if len(group) < 2:
+            continue
+        group.sort(key=lambda row: row['protocolo'])
+        alive, energy = {}, {}
+        for row in group:
+            table = read_metrics_csv(row['metrics'])
+            alive[row['protocolo']] = table['alive']
+            energy[row['protocolo']] = table['mean_energy']
+        jobs.append((plot_comparison, {
+            'path': os.path.join(output_dir, dataset, f'comparacao_r{num_rounds}_s{seed}.png'),
+            'alive': alive,
+            'energy': energy,
+            'media_vida': {row['protocolo']: row['media_vida_nos'] for row in group},
+            'vida_util': {row['protocolo']: row['vida_util'] for row in group},
+        }))
+    return jobs
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Executa em lote as combinações de topologias, protocolos, rodadas e sementes.')
+    parser.add_argument('--datasets', nargs='+', required=True,
+                        help='nomes da pasta dataset (ex.: 100, 1000_clustered) ou caminhos de arquivos de topologia')
+    parser.add_argument('--protocolos', nargs='+', default=list(PROTOCOLOS), choices=list(ENGINES), metavar='PROTOCOLO',
+                        help='protocolos a executar (padrão: %(default)s); opções: ' + ', '.join(ENGINES))
+    parser.add_argument('--rodadas', nargs='+', type=int, default=[1000], help='quantidades de rodadas (padrão: 1000)')
+    sementes = parser.add_mutually_exclusive_group()
+    sementes.add_argument('--sementes', nargs='+', type=int, default=[0], help='sementes de cada execução (padrão: 0)')
+    sementes.add_argument('--repeticoes', type=int,
+                          help='quantidade de sementes derivadas de --semente-base (as mesmas em todos os protocolos)')
+    parser.add_argument('--semente-base', type=int, default=0, help='semente base de --repeticoes (padrão: 0)')
+    parser.add_argument('--saida', default=DEFAULT_OUTPUT, help='pasta dos resultados (padrão: results/lote)')
+    parser.add_argument('--processos', type=int, default=None, help='quantidade de processos (padrão: núcleos da máquina)')
+    parser.add_argument('--sem-graficos', action='store_true', help='não gera as figuras')
+    parser.add_argument('--cache', nargs='?', const=True, default=None, metavar='PASTA',
+                        help='reaproveita os resultados já calculados (padrão: results/.cache)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    seeds = replica_seeds(args.semente_base, args.repeticoes) if args.repeticoes else args.sementes
+    start = time.perf_counter()
+    rows = run_batch(args.datasets, args.protocolos, args.rodadas, seeds, args.saida,
+                     figures=not args.sem_graficos, max_workers=args.processos, cache=args.cache)
+    print(f"{len(rows)} execuções em {time.perf_counter() - start:.2f} s; resumo em {os.path.join(args.saida, 'resumo.csv')}")
+
+if __name__ == "__main__":
+    main()
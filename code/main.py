@@ -1,116 +1,87 @@
 # ***** Para executar o código e salvar as imagens, entre na pasta CODE *****
-from direto import simulate_direct_communication
-from LEACH import simulate_leach
-from ELEACH import simulate_eleach
-import matplotlib.pyplot as plt
+from cache_resultados import run_cached
+from custos import LinkCostCache
+from monte_carlo import PROTOCOLOS, run_monte_carlo, show_monte_carlo_summary
+from graficos import plot_comparison, plot_monte_carlo
+from topologia import read_coordinates_from_file
 import os.path
 
-def plota_informacoes_com_vida_util(NUM_RODADAS, ARQUIVO_COORDENADAS):
-    # Simulações
-    _, _, alive_direct, energy_direct, media_vida_direct, _ = simulate_direct_communication(
-        file_path=ARQUIVO_COORDENADAS,
-        num_rounds=NUM_RODADAS,
-    )
+def plota_informacoes_com_vida_util(NUM_RODADAS, ARQUIVO_COORDENADAS, headless=False, seed=None, cache=None):
+    # Os protocolos usam a mesma topologia, então compartilham o cache de custos de enlace
+    _, bs_pos, sensor_coords = read_coordinates_from_file(ARQUIVO_COORDENADAS)
+    custos = LinkCostCache(sensor_coords, bs_pos)
 
-    _, _, alive_leach, energy_leach, media_vida_leach, _ = simulate_leach(
-        file_path=ARQUIVO_COORDENADAS,
-        num_rounds=NUM_RODADAS,
-    )
+    # Simulações; com semente e cache (cache_resultados.py), execuções já feitas são lidas do disco
+    def simula(protocolo):
+        r = run_cached(cache, protocolo, PROTOCOLOS[protocolo], ARQUIVO_COORDENADAS, NUM_RODADAS, seed,
+                       costs=custos, log=None)
+        return r['columns']['alive'], r['columns']['mean_energy'], r['media_vida_nos']
 
-    _, _, alive_eleach, energy_eleach, media_vida_eleach, _ = simulate_eleach(
-        file_path=ARQUIVO_COORDENADAS,
-        num_rounds=NUM_RODADAS,
-    )
+    alive_direct, energy_direct, media_vida_direct = simula('Direta')
+    alive_leach, energy_leach, media_vida_leach = simula('LEACH')
+    alive_eleach, energy_eleach, media_vida_eleach = simula('E-LEACH')
+    alive_pegasis, energy_pegasis, media_vida_pegasis = simula('PEGASIS')
 
     # Calcula a vida útil para cada abordagem
     vida_direct = calcular_vida_util(alive_direct)
     vida_leach = calcular_vida_util(alive_leach)
     vida_eleach = calcular_vida_util(alive_eleach)
-
-    # Determina o limite do eixo X com base na menor vida útil
-    menor_vida_util = min(vida_direct, vida_leach, vida_eleach)
-    round_axis = range(1, menor_vida_util + 1)
-
-    # Definindo cores fixas para os protocolos
-    colors = {
-        'Direta': 'blue',
-        'LEACH': 'green',
-        'E-LEACH': 'red'
-    }
-
-    # Criação da figura com 2 linhas e 2 colunas
-    plt.figure(figsize=(14, 10))
-
-    # Subplot 4: Vida Útil da Rede
-    plt.subplot(2, 2, 4)
-    protocolos = ['Direta', 'LEACH', 'E-LEACH']
-    vidas = [vida_direct, vida_leach, vida_eleach]
-    plt.bar(protocolos, vidas, color=[colors[p] for p in protocolos])
-    plt.title('Vida Útil da Rede')
-    plt.ylabel('Rodadas')
-    plt.grid(axis='y')
-
-    # Subplot 2: Nós Vivos
-    plt.subplot(2, 2, 1)
-    plt.plot(round_axis, alive_direct[:menor_vida_util], label='Direta', linestyle='-', marker='.', color=colors['Direta'])
-    plt.plot(round_axis, alive_leach[:menor_vida_util], label='LEACH', linestyle='--', marker='x', color=colors['LEACH'])
-    plt.plot(round_axis, alive_eleach[:menor_vida_util], label='E-LEACH', linestyle='-.', marker='o', color=colors['E-LEACH'])
-    plt.title('Nós Vivos por Rodada')
-    plt.xlabel('Rodada')
-    plt.ylabel('Número de Nós Vivos')
-    plt.grid(True)
-    plt.legend()
-
-    # Subplot 3: Energia Média
-    plt.subplot(2, 2, 2)
-    plt.plot(round_axis, energy_direct[:menor_vida_util], label='Direta', linestyle='-', marker='.', color=colors['Direta'])
-    plt.plot(round_axis, energy_leach[:menor_vida_util], label='LEACH', linestyle='--', marker='x', color=colors['LEACH'])
-    plt.plot(round_axis, energy_eleach[:menor_vida_util], label='E-LEACH', linestyle='-.', marker='o', color=colors['E-LEACH'])
-    plt.title('Energia Média por Rodada (Sensores Vivos)')
-    plt.xlabel('Rodada')
-    plt.ylabel('Energia Média (J)')
-    plt.grid(True)
-    plt.legend()
-
-    # Subplot 1: Média de Vida dos Nós
-    plt.subplot(2, 2, 3)
-    medias_vida = [media_vida_direct, media_vida_leach, media_vida_eleach]
-    plt.bar(protocolos, medias_vida, color=[colors[p] for p in protocolos])
-    plt.title('Média de Rodadas Vividas por Sensor')
-    plt.ylabel('Rodadas')
-    plt.grid(axis='y')
-
-    # Ajusta layout e salva
-    plt.tight_layout()
-    nome_base = ARQUIVO_COORDENADAS.replace('.txt', '').replace('../dataset/', '')
-    plt.savefig(f"../results/comparacao_protocolos_2x2_MEDIA_VIVA_{nome_base}.png")
+    vida_pegasis = calcular_vida_util(alive_pegasis)
+
+    # Figura 2x2; as séries longas são reduzidas antes de desenhar (graficos.py)
+    nome_base = os.path.splitext(os.path.basename(ARQUIVO_COORDENADAS))[0]
+    plot_comparison(
+        f"../results/comparacao_protocolos_2x2_MEDIA_VIVA_{nome_base}.png",
+        alive={'Direta': alive_direct, 'LEACH': alive_leach, 'E-LEACH': alive_eleach, 'PEGASIS': alive_pegasis},
+        energy={'Direta': energy_direct, 'LEACH': energy_leach, 'E-LEACH': energy_eleach, 'PEGASIS': energy_pegasis},
+        media_vida={'Direta': media_vida_direct, 'LEACH': media_vida_leach, 'E-LEACH': media_vida_eleach,
+                    'PEGASIS': media_vida_pegasis},
+        vida_util={'Direta': vida_direct, 'LEACH': vida_leach, 'E-LEACH': vida_eleach, 'PEGASIS': vida_pegasis},
+        show=not headless,
+        headless=headless,
+    )
     print(f"\nGráfico salvo como 'comparacao_protocolos_2x2_MEDIA_VIVA_{nome_base}.png'")
-    print(f"Vida útil (últimos nós vivos): Direta={vida_direct}, LEACH={vida_leach}, E-LEACH={vida_eleach}")
-    plt.show()
+    print(f"Vida útil (últimos nós vivos): Direta={vida_direct}, LEACH={vida_leach}, E-LEACH={vida_eleach}, PEGASIS={vida_pegasis}")
    
     print("\n====== Resultados Numéricos ======")
     print(f"Quantidade final de nós vivos:")
     print(f"  Direta: {alive_direct[-1]}")
     print(f"  LEACH: {alive_leach[-1]}")
     print(f"  E-LEACH: {alive_eleach[-1]}")
+    print(f"  PEGASIS: {alive_pegasis[-1]}")
 
     print("\nEnergia média na última rodada:")
     print(f"  Direta: {energy_direct[-1]:.4f} J")
     print(f"  LEACH: {energy_leach[-1]:.4f} J")
     print(f"  E-LEACH: {energy_eleach[-1]:.4f} J")
+    print(f"  PEGASIS: {energy_pegasis[-1]:.4f} J")
 
     print("\nMédia de rodadas vividas por sensor:")
     print(f"  Direta: {media_vida_direct:.2f}")
     print(f"  LEACH: {media_vida_leach:.2f}")
     print(f"  E-LEACH: {media_vida_eleach:.2f}")
+    print(f"  PEGASIS: {media_vida_pegasis:.2f}")
 
     print("\nVida útil da rede (rodadas até o último nó morrer ou for inferior ao limiar funcional):")
     print(f"  Direta: {vida_direct}")
     print(f"  LEACH: {vida_leach}")
     print(f"  E-LEACH: {vida_eleach}")
+    print(f"  PEGASIS: {vida_pegasis}")
 
 
-    return round(max(vida_direct, vida_leach, vida_eleach))
+    return round(max(vida_direct, vida_leach, vida_eleach, vida_pegasis))
+
+def plota_monte_carlo(NUM_RODADAS, ARQUIVO_COORDENADAS, REPETICOES, headless=False, cache=None):
+    # Simulações: REPETICOES execuções com sementes fixas de cada protocolo, em paralelo
+    resultados = run_monte_carlo(ARQUIVO_COORDENADAS, NUM_RODADAS, replicas=REPETICOES, cache=cache)
+    show_monte_carlo_summary(resultados)
+
+    nome_base = os.path.splitext(os.path.basename(ARQUIVO_COORDENADAS))[0]
+    plot_monte_carlo(f"../results/comparacao_protocolos_monte_carlo_{nome_base}.png", resultados,
+                     show=not headless, headless=headless)
+    print(f"\nGráfico salvo como 'comparacao_protocolos_monte_carlo_{nome_base}.png'")
+
+    return resultados
 
 def calcular_vida_util(alive_list):
     # Conta quantas rodadas ainda havia nós vivos
@@ -122,7 +93,10 @@ def main():
     print('Inicialmente, estão disponíveis quatro arquivos com 50, 100, 200 e 400 sensores.')
     quantidade_sensores = input('Digite a quantidade de sensores desejada (50, 100, 200, 400): ')
 
+    # Aceita também as topologias do gerador (ex.: "1000_clustered") e o formato binário (.topo)
     ARQUIVO_COORDENADAS=f"../dataset/{quantidade_sensores}.txt"
+    if not os.path.isfile(ARQUIVO_COORDENADAS):
+        ARQUIVO_COORDENADAS=f"../dataset/{quantidade_sensores}.topo"
 
     if not os.path.isfile(ARQUIVO_COORDENADAS):
         print('Arquivo não encontrado.')
@@ -134,7 +108,25 @@ def main():
         print('Quantidade de rodadas inválida.')
         return
 
-    plota_informacoes_com_vida_util(NUM_RODADAS, ARQUIVO_COORDENADAS)
+    try:
+        REPETICOES = int(input('Digite a quantidade de repetições (1 para uma única execução): ') or 1)
+    except:
+        print('Quantidade de repetições inválida.')
+        return
+
+    # As repetições Monte Carlo já usam sementes fixas; uma execução única só é reaproveitada com semente
+    if REPETICOES > 1:
+        plota_monte_carlo(NUM_RODADAS, ARQUIVO_COORDENADAS, REPETICOES, cache=True)
+        return
+
+    try:
+        semente = input('Digite a semente (Enter para uma execução aleatória, sem cache): ')
+        SEMENTE = int(semente) if semente else None
+    except:
+        print('Semente inválida.')
+        return
+
+    plota_informacoes_com_vida_util(NUM_RODADAS, ARQUIVO_COORDENADAS, seed=SEMENTE, cache=SEMENTE is not None)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,42 @@
+'''
+Medição da memória ocupada por sensor no modelo orientado a objetos (direto.py, LEACH.py e ELEACH.py).
+
+Os sensores são criados com tracemalloc ativo e cada um recebe uma leitura no buffer, como no
+meio de uma rodada. O valor por sensor permite estimar se uma rede de 1 milhão de nós cabe na
+memória antes de rodar a simulação (o motor vetorizado continua sendo o mais econômico).
+'''
+import tracemalloc
+
+import direto
+import LEACH
+import ELEACH
+from registro import SILENT
+
+MODULOS = {
+    'Direta': direto,
+    'LEACH': LEACH,
+    'E-LEACH': ELEACH,
+}
+
+def node_footprint(module, num_nodes=100_000):
+    '''Bytes alocados por SensorNode do módulo informado (objeto, buffer de leituras e id).'''
+    base_station = module.BaseStation(0.0, 0.0, log=SILENT)
+    coords = [(float(i), float(i)) for i in range(num_nodes)]
+
+    tracemalloc.start()
+    try:
+        nodes = [module.SensorNode(i, x, y, base_station) for i, (x, y) in enumerate(coords)]
+        for node in nodes:
+            node.data.append(25.0)
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return allocated / num_nodes
+
+def show_node_footprint(num_nodes=100_000, target_nodes=1_000_000):
+    '''Mostra os bytes por sensor de cada protocolo e a estimativa para uma rede de target_nodes.'''
+    for protocolo, module in MODULOS.items():
+        per_node = node_footprint(module, num_nodes)
+        print(f"{protocolo}: {per_node:.0f} bytes por sensor "
+              f"(~{per_node * target_nodes / 1024**2:.0f} MiB para {target_nodes} sensores)")
@@ -0,0 +1,248 @@
+'''
+Registro das métricas de cada rodada em um coletor incremental.
+
+Em vez de pré-alocar listas com num_rounds posições, as simulações entregam um registro por
+rodada executada (nós vivos, energia média, quantidade de CHs e pacotes enviados direto à ERB,
+aos CHs e dos CHs à ERB) a um coletor:
+
+- MemorySink: arrays NumPy que crescem dobrando de tamanho (padrão);
+- CSVSink: uma linha por rodada em um arquivo CSV, gravada à medida que a simulação avança;
+- ColumnarSink: um diretório com um arquivo binário por coluna e um meta.json, gravado em blocos.
+
+Ao final, close() devolve um RoundMetrics (guardado também em sink.result), que só carrega as colunas quando elas são acessadas
+(no formato colunar elas são abertas com np.memmap, sem ler o arquivo inteiro).
+'''
+import csv
+import json
+import os
+
+import numpy as np
+
+ROUND_FIELDS = ('round', 'alive', 'mean_energy', 'cluster_heads', 'sent_direct', 'sent_to_ch', 'sent_to_bs')
+
+FIELD_DTYPES = {
+    'round': np.int64,
+    'alive': np.int64,
+    'mean_energy': np.float64,
+    'cluster_heads': np.int64,
+    'sent_direct': np.int64,
+    'sent_to_ch': np.int64,
+    'sent_to_bs': np.int64,
+}
+
+class RoundMetrics:
+    '''Métricas por rodada carregadas sob demanda. metrics['alive'] ou metrics.alive devolvem a coluna.'''
+    def __init__(self, loader, rows):
+        self._loader = loader
+        self._columns = {}
+        self.rows = rows
+        # Perfil das fases da simulação (perfil.PhaseProfiler), quando ela foi instrumentada
+        self.profile = None
+
+    def __getitem__(self, field):
+        if field not in FIELD_DTYPES:
+            raise KeyError(field)
+        column = self._columns.get(field)
+        if column is None:
+            column = self._columns[field] = self._loader(field)
+        return column
+
+    def __getattr__(self, field):
+        if field.startswith('_'):
+            raise AttributeError(field)
+        try:
+            return self[field]
+        except KeyError:
+            raise AttributeError(field) from None
+
+    def __len__(self):
+        return self.rows
+
+    def padded(self, field, num_rounds):
+        '''Coluna completada com zeros até num_rounds (formato das antigas listas de histórico).'''
+        column = np.zeros(num_rounds, dtype=FIELD_DTYPES[field])
+        column[:self.rows] = self[field][:num_rounds]
+        return column
+
+    def as_dict(self):
+        return {field: self[field] for field in ROUND_FIELDS}
+
+class SimulationResult(tuple):
+    '''Tupla (nodes, base_station, alive, mean_energy, media_vida_nos, first_node_death_round)
+    devolvida pelos simulate_*, que continua podendo ser desempacotada como antes. O RoundMetrics
+    completo fica em .metrics e o perfil das fases (profile=True) em .profile.'''
+    def __new__(cls, values, metrics=None):
+        self = super().__new__(cls, values)
+        self.metrics = metrics
+        return self
+
+    @property
+    def profile(self):
+        return None if self.metrics is None else self.metrics.profile
+
+class MemorySink:
+    '''Guarda as rodadas em arrays NumPy que dobram de tamanho quando enchem.'''
+    def __init__(self, capacity=1024):
+        self.rows = 0
+        self.result = None
+        self._columns = {field: np.zeros(capacity, dtype=FIELD_DTYPES[field]) for field in ROUND_FIELDS}
+
+    def _reserve(self, rows):
+        capacity = len(self._columns['round'])
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        for field, column in self._columns.items():
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.rows] = column[:self.rows]
+            self._columns[field] = grown
+
+    def push(self, round_num, alive, mean_energy, cluster_heads=0, sent_direct=0, sent_to_ch=0, sent_to_bs=0):
+        self._reserve(self.rows + 1)
+        i = self.rows
+        columns = self._columns
+        columns['round'][i] = round_num
+        columns['alive'][i] = alive
+        columns['mean_energy'][i] = mean_energy
+        columns['cluster_heads'][i] = cluster_heads
+        columns['sent_direct'][i] = sent_direct
+        columns['sent_to_ch'][i] = sent_to_ch
+        columns['sent_to_bs'][i] = sent_to_bs
+        self.rows += 1
+
+    def extend(self, **columns):
+        '''Acrescenta várias rodadas de uma vez (colunas ausentes ficam com zero).'''
+        rows = len(columns['round'])
+        self._reserve(self.rows + rows)
+        for field in ROUND_FIELDS:
+            if field in columns:
+                self._columns[field][self.rows:self.rows + rows] = columns[field]
+        self.rows += rows
+
+    def snapshot(self):
+        '''Cópia das colunas das rodadas registradas até agora.'''
+        return {field: column[:self.rows].copy() for field, column in self._columns.items()}
+
+    def close(self):
+        columns = {field: column[:self.rows] for field, column in self._columns.items()}
+        self.result = RoundMetrics(columns.__getitem__, self.rows)
+        return self.result
+
+class CSVSink:
+    '''Escreve uma linha por rodada no arquivo CSV informado.'''
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.result = None
+        self._table = None
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(ROUND_FIELDS)
+
+    def push(self, round_num, alive, mean_energy, cluster_heads=0, sent_direct=0, sent_to_ch=0, sent_to_bs=0):
+        self._writer.writerow((round_num, alive, repr(float(mean_energy)), cluster_heads, sent_direct, sent_to_ch, sent_to_bs))
+        self.rows += 1
+
+    def extend(self, **columns):
+        rows = len(columns['round'])
+        values = [columns.get(field, np.zeros(rows, dtype=FIELD_DTYPES[field])) for field in ROUND_FIELDS]
+        for row in zip(*values):
+            self.push(*row)
+
+    def snapshot(self):
+        self._file.flush()
+        return read_metrics_csv(self.path)
+
+    def close(self):
+        self._file.close()
+        self.result = RoundMetrics(self._load, self.rows)
+        return self.result
+
+    def _load(self, field):
+        if self._table is None:
+            self._table = read_metrics_csv(self.path)
+        return self._table[field]
+
+class ColumnarSink:
+    '''Grava cada coluna em <directory>/<campo>.bin em blocos de chunk_rounds rodadas.'''
+    def __init__(self, directory, chunk_rounds=4096):
+        self.directory = directory
+        self.rows = 0
+        self.result = None
+        self.chunk_rounds = chunk_rounds
+        os.makedirs(directory, exist_ok=True)
+        self._buffer = MemorySink(chunk_rounds)
+        self._files = {field: open(os.path.join(directory, f'{field}.bin'), 'wb') for field in ROUND_FIELDS}
+
+    def push(self, round_num, alive, mean_energy, cluster_heads=0, sent_direct=0, sent_to_ch=0, sent_to_bs=0):
+        self._buffer.push(round_num, alive, mean_energy, cluster_heads, sent_direct, sent_to_ch, sent_to_bs)
+        self.rows += 1
+        if self._buffer.rows >= self.chunk_rounds:
+            self._flush()
+
+    def extend(self, **columns):
+        self._buffer.extend(**columns)
+        self.rows += len(columns['round'])
+        self._flush()
+
+    def _flush(self):
+        buffered = self._buffer.close()
+        for field, handle in self._files.items():
+            handle.write(np.ascontiguousarray(buffered[field]).tobytes())
+        self._buffer = MemorySink(self.chunk_rounds)
+
+    def snapshot(self):
+        self._flush()
+        columns = {}
+        for field, handle in self._files.items():
+            handle.flush()
+            columns[field] = np.fromfile(handle.name, dtype=FIELD_DTYPES[field], count=self.rows)
+        return columns
+
+    def close(self):
+        self._flush()
+        for handle in self._files.values():
+            handle.close()
+        meta = {'rows': self.rows, 'fields': {field: np.dtype(FIELD_DTYPES[field]).str for field in ROUND_FIELDS}}
+        with open(os.path.join(self.directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        self.result = open_columnar(self.directory)
+        return self.result
+
+def read_metrics_csv(path):
+    '''Lê um CSV escrito pelo CSVSink e devolve um dicionário campo -> array.'''
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+    return {
+        field: np.array([row[i] for row in rows], dtype=FIELD_DTYPES[field]) if rows
+        else np.zeros(0, dtype=FIELD_DTYPES[field])
+        for i, field in enumerate(header)
+    }
+
+def open_columnar(directory):
+    '''Abre as métricas gravadas pelo ColumnarSink; cada coluna é mapeada só quando acessada.'''
+    with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    rows = meta['rows']
+
+    def load(field):
+        dtype = np.dtype(meta['fields'][field])
+        if rows == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(os.path.join(directory, f'{field}.bin'), dtype=dtype, mode='r', shape=(rows,))
+
+    return RoundMetrics(load, rows)
+
+def make_sink(metrics=None):
+    '''Retorna o coletor informado; com None cria um MemorySink e, com um caminho, um CSVSink
+    (arquivos .csv) ou um ColumnarSink (diretório).'''
+    if metrics is None:
+        return MemorySink()
+    if isinstance(metrics, (str, os.PathLike)):
+        if os.fspath(metrics).endswith('.csv'):
+            return CSVSink(metrics)
+        return ColumnarSink(metrics)
+    return metrics
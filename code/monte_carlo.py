@@ -0,0 +1,147 @@
+'''
+Execução Monte Carlo dos protocolos: K repetições com sementes fixas de cada protocolo, distribuídas
+entre processos, com as curvas agregadas em média e faixas de percentis e as métricas escalares
+(vida útil, morte do primeiro nó e média de rodadas vividas) resumidas com intervalos de confiança.
+'''
+import os
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+import numpy as np
+
+from aleatorio import spawn_seeds
+from cache_resultados import make_cache, run_cached
+from direto import simulate_direct_communication
+from LEACH import simulate_leach
+from ELEACH import simulate_eleach
+from PEGASIS import simulate_pegasis
+from parametros import DEFAULT_PARAMS
+
+PROTOCOLOS = {
+    'Direta': simulate_direct_communication,
+    'LEACH': simulate_leach,
+    'E-LEACH': simulate_eleach,
+    'PEGASIS': simulate_pegasis,
+}
+
+# Sementes das repetições: SeedSequences derivadas por spawn, com fluxos independentes entre si; a
+# repetição k usa a mesma semente em todos os protocolos (números aleatórios comuns)
+def replica_seeds(base_seed, replicas):
+    return spawn_seeds(base_seed, replicas)
+
+def run_replica(protocolo, file_path, num_rounds, seed, params=DEFAULT_PARAMS, cache=None):
+    '''Executa uma repetição sem saída no terminal e devolve apenas os históricos e as métricas.
+
+    Com cache (ver cache_resultados.make_cache), uma repetição já executada com as mesmas entradas
+    não roda de novo.
+    '''
+    return _replica(run_cached(cache, protocolo, PROTOCOLOS[protocolo], file_path, num_rounds, seed, params), num_rounds)
+
+def _replica(result, num_rounds):
+    alive_history = result['columns']['alive']
+    energy_history = result['columns']['mean_energy']
+
+    # Os históricos só cobrem as rodadas executadas; completa com zeros para empilhar as repetições
+    alive = np.zeros(num_rounds, dtype=np.int64)
+    alive[:len(alive_history)] = alive_history
+    energy = np.zeros(num_rounds, dtype=np.float64)
+    energy[:len(energy_history)] = energy_history
+    return {
+        'alive': alive,
+        'energy': energy,
+        'vida_util': int(np.count_nonzero(alive)),
+        'media_vida_nos': result['media_vida_nos'],
+        'first_node_death_round': result['first_node_death_round'],
+    }
+
+def _run_replica(job):
+    return run_replica(*job)
+
+def confidence_interval(values, confidence=0.95):
+    '''Média e intervalo de confiança (aproximação normal) de uma amostra; None se a amostra estiver vazia.'''
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return None
+    mean = float(values.mean())
+    if len(values) < 2:
+        return mean, mean, mean
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    half = z * float(values.std(ddof=1)) / np.sqrt(len(values))
+    return mean, mean - half, mean + half
+
+class MonteCarloResult:
+    def __init__(self, protocolo, seeds, replicas, percentiles=(5, 95), confidence=0.95):
+        self.protocolo = protocolo
+        self.seeds = seeds
+        self.replicas = len(replicas)
+        self.percentiles = percentiles
+        self.confidence = confidence
+
+        alive = np.stack([r['alive'] for r in replicas])
+        energy = np.stack([r['energy'] for r in replicas])
+        self.alive_mean = alive.mean(axis=0)
+        self.alive_band = np.percentile(alive, percentiles, axis=0)
+        self.energy_mean = energy.mean(axis=0)
+        self.energy_band = np.percentile(energy, percentiles, axis=0)
+
+        self.vida_util = [r['vida_util'] for r in replicas]
+        self.media_vida_nos = [r['media_vida_nos'] for r in replicas]
+        self.first_node_death_round = [r['first_node_death_round'] for r in replicas]
+
+    @property
+    def vida_util_ci(self):
+        return confidence_interval(self.vida_util, self.confidence)
+
+    @property
+    def media_vida_nos_ci(self):
+        return confidence_interval(self.media_vida_nos, self.confidence)
+
+    @property
+    def first_node_death_ci(self):
+        # Repetições em que nenhum nó morreu dentro das rodadas simuladas ficam de fora
+        return confidence_interval([r for r in self.first_node_death_round if r is not None], self.confidence)
+
+def run_monte_carlo(file_path, num_rounds, replicas=30, protocolos=tuple(PROTOCOLOS), base_seed=0,
+                    max_workers=None, percentiles=(5, 95), confidence=0.95, params=DEFAULT_PARAMS, cache=None):
+    '''Executa as repetições de todos os protocolos em um ProcessPoolExecutor e agrega os resultados.
+
+    Com cache, as repetições já guardadas são lidas do disco sem abrir processos.
+    '''
+    seeds = replica_seeds(base_seed, replicas)
+    cache = make_cache(cache)
+    jobs = [(protocolo, file_path, num_rounds, seed, params, cache) for protocolo in protocolos for seed in seeds]
+
+    # Repetições já guardadas no cache são lidas aqui; só as que faltam vão para os processos
+    outputs = [None] * len(jobs)
+    pending = []
+    for i, (protocolo, _, _, seed, _, _) in enumerate(jobs):
+        stored = None
+        if cache is not None:
+            stored = cache.get(cache.key(file_path, protocolo, PROTOCOLOS[protocolo], num_rounds, seed, params))
+        if stored is None:
+            pending.append(i)
+        else:
+            outputs[i] = _replica(stored, num_rounds)
+
+    if pending:
+        max_workers = min(len(pending), max_workers or os.cpu_count() or 1)
+        chunksize = max(1, len(pending) // (4 * max_workers))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for i, output in zip(pending, executor.map(_run_replica, [jobs[i] for i in pending], chunksize=chunksize)):
+                outputs[i] = output
+
+    results = {}
+    for i, protocolo in enumerate(protocolos):
+        results[protocolo] = MonteCarloResult(protocolo, seeds, outputs[i * replicas:(i + 1) * replicas],
+                                              percentiles, confidence)
+    return results
+
+def show_monte_carlo_summary(results):
+    '''Mostra as métricas escalares de cada protocolo com os intervalos de confiança.'''
+    def fmt(ci):
+        return "-" if ci is None else f"{ci[0]:.2f} [{ci[1]:.2f}, {ci[2]:.2f}]"
+
+    for protocolo, result in results.items():
+        print(f"\n--- {protocolo} ({result.replicas} repetições, IC {result.confidence:.0%}) ---")
+        print(f"Vida útil da rede: {fmt(result.vida_util_ci)}")
+        print(f"Média de rodadas vividas por sensor: {fmt(result.media_vida_nos_ci)}")
+        print(f"Morte do primeiro nó: {fmt(result.first_node_death_ci)}")
@@ -0,0 +1,322 @@
+'''
+Roteamento multissalto de energia mínima até a ERB.
+
+A rede é um grafo em que cada sensor alcança os vizinhos a no máximo radius metros (e sempre a
+ERB, diretamente). O peso de uma aresta é a energia para levar um pacote por ela: a transmissão
+pelo modelo de transmit_energy mais a recepção no vizinho (a ERB não gasta energia). Cada sensor
+encaminha o pacote pela árvore de caminhos mínimos até a ERB, e os sensores intermediários
+recebem e retransmitem os pacotes dos sensores abaixo deles na árvore.
+
+A árvore é montada uma vez com Dijkstra. Quando sensores morrem, só a subárvore que passava por
+eles perde o caminho: as distâncias dos demais não mudam (remover vértices não encurta caminhos),
+então Dijkstra é refeito apenas sobre essa subárvore, partindo das melhores ligações dela com o
+resto da árvore. Em redes com dezenas de milhares de sensores isso custa uma fração do
+recálculo completo a cada rodada.
+'''
+import heapq
+import math
+
+import numpy as np
+
+from aleatorio import make_rng
+from custos import cost_cache_for, per_bit_cost
+from espacial import _expand, radius_pairs
+from metricas import SimulationResult, make_sink
+from parametros import DEFAULT_PARAMS
+from perfil import make_profiler
+from registro import make_log
+from topologia import read_coordinates_from_file
+from vetorizado import BaseStationSummary, show_final_results
+
+# Pai de um sensor na árvore: o índice do vizinho, TO_BS (envia direto à ERB) ou NO_ROUTE (morto)
+TO_BS = -1
+NO_ROUTE = -2
+
+# Quantidade média de vizinhos usada para escolher o raio quando ele não é informado
+TARGET_NEIGHBORS = 16
+
+def default_radius(coords, params=DEFAULT_PARAMS):
+    '''Raio com ~TARGET_NEIGHBORS vizinhos por sensor, limitado a D_THRESHOLD (acima dele vale o modelo d^4).'''
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if len(coords) < 2:
+        return params.D_THRESHOLD
+    width, height = np.ptp(coords, axis=0)
+    area = max(width * height, 1.0)
+    return min(params.D_THRESHOLD, math.sqrt(TARGET_NEIGHBORS * area / (math.pi * len(coords))))
+
+class ShortestPathTree:
+    '''Árvore de caminhos de energia mínima até a ERB, com reparo incremental quando sensores morrem.'''
+    def __init__(self, coords, bs_per_bit, radius, params=DEFAULT_PARAMS):
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        num_nodes = len(coords)
+        k = params.PACKET_SIZE
+        self.num_nodes = num_nodes
+        self.rx_cost = k * params.E_ELEC
+
+        # Lista de adjacência (CSR) com as duas direções de cada par de vizinhos
+        i, j, distances = radius_pairs(coords[:, 0], coords[:, 1], radius)
+        src = np.concatenate((i, j))
+        dst = np.concatenate((j, i))
+        tx = k * per_bit_cost(np.concatenate((distances, distances)), params)
+        order = np.argsort(src, kind='stable')
+        self.neighbors = dst[order]
+        self.edge_tx = tx[order]
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(src, minlength=num_nodes))))
+        self.bs_tx = k * np.asarray(bs_per_bit, dtype=np.float64)
+
+        self.dist = np.full(num_nodes, np.inf)
+        self.parent = np.full(num_nodes, NO_ROUTE, dtype=np.int64)
+        self.hop_tx = np.zeros(num_nodes, dtype=np.float64)  # energia de transmissão até o pai
+        self.alive = np.ones(num_nodes, dtype=bool)
+        self.repaired = 0
+
+        # Versões em lista para o laço de Dijkstra (acesso elemento a elemento)
+        self._indptr = self.indptr.tolist()
+        self._neighbors = self.neighbors.tolist()
+        self._edge_weight = (self.edge_tx + self.rx_cost).tolist()
+        self._repair(np.arange(num_nodes))
+
+    def _repair(self, nodes):
+        '''Recalcula dist/parent dos sensores em nodes; os demais sensores vivos já têm distância correta.'''
+        if len(nodes) == 0:
+            return
+        inside = np.zeros(self.num_nodes, dtype=bool)
+        inside[nodes] = True
+
+        # Ponto de partida: enviar direto à ERB ou pela melhor aresta até um sensor fora do conjunto
+        dist = self.bs_tx[nodes].copy()
+        parent = np.full(len(nodes), TO_BS, dtype=np.int64)
+        hop_tx = self.bs_tx[nodes].copy()
+
+        degree = self.indptr[nodes + 1] - self.indptr[nodes]
+        edges = _expand(self.indptr[nodes], degree)
+        owner = np.repeat(np.arange(len(nodes)), degree)
+        target = self.neighbors[edges]
+        usable = self.alive[target] & ~inside[target]
+        edges, owner, target = edges[usable], owner[usable], target[usable]
+        through = self.edge_tx[edges] + self.rx_cost + self.dist[target]
+        best = np.lexsort((through, owner))
+        first = best[np.concatenate(([True], owner[best][1:] != owner[best][:-1]))] if len(best) else best
+        better = through[first] < dist[owner[first]]
+        chosen = first[better]
+        dist[owner[chosen]] = through[chosen]
+        parent[owner[chosen]] = target[chosen]
+        hop_tx[owner[chosen]] = self.edge_tx[edges[chosen]]
+
+        self.dist[nodes] = dist
+        self.parent[nodes] = parent
+        self.hop_tx[nodes] = hop_tx
+
+        # Dijkstra restrito ao conjunto: as distâncias de fora são fixas
+        all_dist = self.dist.tolist()
+        open_nodes = (inside & self.alive).tolist()
+        via_edge = {}
+        indptr, neighbors, edge_weight = self._indptr, self._neighbors, self._edge_weight
+        heap = list(zip(dist.tolist(), nodes.tolist()))
+        heapq.heapify(heap)
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > all_dist[u]:
+                continue
+            start = indptr[u]
+            for offset, (v, w) in enumerate(zip(neighbors[start:indptr[u + 1]], edge_weight[start:indptr[u + 1]])):
+                if open_nodes[v] and d + w < all_dist[v]:
+                    all_dist[v] = d + w
+                    via_edge[v] = (u, start + offset)
+                    heapq.heappush(heap, (d + w, v))
+
+        self.dist[nodes] = np.asarray(all_dist)[nodes]
+        if via_edge:
+            relayed = np.fromiter(via_edge.keys(), dtype=np.int64, count=len(via_edge))
+            parent_edge = np.array(list(via_edge.values()), dtype=np.int64)
+            self.parent[relayed] = parent_edge[:, 0]
+            self.hop_tx[relayed] = self.edge_tx[parent_edge[:, 1]]
+        self.repaired += len(nodes)
+
+    def subtree(self, roots):
+        '''Sensores vivos cujo caminho até a ERB passa por algum dos roots (incluindo os roots).'''
+        affected = np.zeros(self.num_nodes, dtype=bool)
+        affected[roots] = True
+        frontier = affected.copy()
+        while True:
+            routed = self.parent >= 0
+            below = np.zeros(self.num_nodes, dtype=bool)
+            below[routed] = frontier[self.parent[routed]]
+            below &= ~affected
+            if not below.any():
+                return np.flatnonzero(affected)
+            affected |= below
+            frontier = below
+
+    def remove(self, dead):
+        '''Retira os sensores mortos e refaz os caminhos dos sensores que dependiam deles.'''
+        dead = np.asarray(dead, dtype=np.int64)
+        if len(dead) == 0:
+            return
+        affected = self.subtree(dead)
+        self.alive[dead] = False
+        self.dist[dead] = np.inf
+        self.parent[dead] = NO_ROUTE
+        self._repair(affected[self.alive[affected]])
+
+# Estado dos sensores no formato struct-of-arrays (mesmos campos usados por BaseStationSummary)
+class MultihopState:
+    def __init__(self, num_nodes, params=DEFAULT_PARAMS):
+        self.num_nodes = num_nodes
+        self.energy = np.full(num_nodes, params.INITIAL_ENERGY, dtype=np.float64)
+        self.alive = np.ones(num_nodes, dtype=bool)
+        self.rounds_alive = np.zeros(num_nodes, dtype=np.int64)
+        self.pending_readings = np.zeros(num_nodes, dtype=np.int64)
+        self.pending_alerts = np.zeros(num_nodes, dtype=np.int64)
+
+    def kill(self, idx):
+        self.alive[idx] = False
+        self.energy[idx] = 0
+
+def forward_phase(state, tree, base_station):
+    '''Cada sensor vivo envia seu pacote e retransmite os que recebeu, das folhas para a ERB.
+
+    Um sensor sem energia para receber e transmitir tudo o que lhe cabe morre e os pacotes que
+    ele carregava se perdem (as leituras continuam pendentes na origem). Retorna os envios
+    diretos à ERB, os envios a um vizinho e os pacotes entregues, e os sensores que morreram.
+    '''
+    alive_idx = np.flatnonzero(state.alive)
+    # Filhos têm distância estritamente maior que o pai, então a ordem decrescente vai das folhas à raiz
+    order = alive_idx[np.argsort(-tree.dist[alive_idx], kind='stable')].tolist()
+
+    parent = tree.parent.tolist()
+    hop_tx = tree.hop_tx.tolist()
+    energy = state.energy.tolist()
+    rx_cost = tree.rx_cost
+    carried = [0] * state.num_nodes
+    sent = [False] * state.num_nodes
+    died = []
+
+    for u in order:
+        relayed = carried[u]
+        need = hop_tx[u] * (relayed + 1) + rx_cost * relayed
+        if energy[u] < need:
+            died.append(u)
+            continue
+        energy[u] -= need
+        sent[u] = True
+        if parent[u] >= 0:
+            carried[parent[u]] += relayed + 1
+
+    # O pacote de u chega à ERB se u e todos os sensores acima dele conseguiram transmitir
+    delivered = [False] * state.num_nodes
+    direct = to_relay = 0
+    for u in reversed(order):
+        if not sent[u]:
+            continue
+        if parent[u] == TO_BS:
+            delivered[u] = True
+            direct += 1
+        else:
+            delivered[u] = delivered[parent[u]]
+            to_relay += 1
+
+    state.energy[alive_idx] = np.asarray(energy)[alive_idx]
+    died = np.asarray(died, dtype=np.int64)
+    state.kill(died)
+    arrived = np.flatnonzero(delivered)
+    base_station.receive_from(state, arrived)
+    return direct, to_relay, len(arrived), died
+
+def simulate_multihop(file_path, num_rounds, costs=None, params=DEFAULT_PARAMS, rng=None, log=None, metrics=None,
+                      profile=None, radius=None):
+    '''Executa o roteamento multissalto de energia mínima.
+
+    Nas métricas, sent_direct conta os envios diretos à ERB, sent_to_ch os envios a um vizinho
+    (saltos intermediários) e sent_to_bs os pacotes que chegaram à ERB.
+    '''
+    num_nodes, bs_pos, sensor_coords = read_coordinates_from_file(file_path)
+
+    costs = cost_cache_for(costs, sensor_coords, bs_pos, params)
+    rng = make_rng(rng)
+    log = make_log(log)
+    metrics = make_sink(metrics)
+    profiler = make_profiler(profile)
+
+    state = MultihopState(len(sensor_coords), params)
+    base_station = BaseStationSummary(bs_pos[0], bs_pos[1])
+    num_nodes = state.num_nodes
+    if radius is None:
+        radius = default_radius(sensor_coords, params)
+
+    t = profiler.start()
+    tree = ShortestPathTree(sensor_coords, costs.bs_per_bit, radius, params)
+    t = profiler.lap('tree_build', t)
+
+    log.summary("Iniciando simulação Multissalto com {} nós (raio {:.1f} m, {} arestas).",
+                num_nodes, radius, len(tree.neighbors) // 2)
+    log.summary("Energia Inicial: {} J, Pacote: {} bits", params.INITIAL_ENERGY, params.PACKET_SIZE)
+    log.summary("-" * 30)
+
+    first_node_death_round = None
+    round_num = -1
+    removed = np.zeros(num_nodes, dtype=bool)
+
+    for round_num in range(num_rounds):
+        t = profiler.start()
+        alive_nodes = int(state.alive.sum())
+
+        if alive_nodes != num_nodes and first_node_death_round == None:
+            first_node_death_round = round_num + 1
+
+        if alive_nodes/num_nodes <= params.NETWORK_FUNCTIONAL_THRESHOLD:
+            break
+        t = profiler.lap('round_check', t)
+
+        # Sensoriamento (o sensor sem energia para sensoriar morre)
+        alive_idx = np.flatnonzero(state.alive)
+        temps = rng.uniform(20, 70, len(alive_idx))
+        state.rounds_alive[alive_idx] += 1
+        starving = state.energy[alive_idx] <= params.E_SENSE
+        state.kill(alive_idx[starving])
+        sensed = alive_idx[~starving]
+        state.energy[sensed] -= params.E_SENSE
+        state.pending_readings[sensed] += 1
+        state.pending_alerts[sensed] += temps[~starving] > 60
+        t = profiler.lap('sense', t)
+
+        # Os mortos desde a última rodada saem da árvore antes do encaminhamento
+        dead = np.flatnonzero(~state.alive & ~removed)
+        tree.remove(dead)
+        removed[dead] = True
+        t = profiler.lap('tree_repair', t)
+
+        if not state.alive.any():
+            break
+
+        sent_direct, sent_to_relay, delivered, _ = forward_phase(state, tree, base_station)
+        t = profiler.lap('forward', t)
+
+        # representa o sensor entrar em modo sleep
+        alive_idx = np.flatnonzero(state.alive)
+        exhausted = state.energy[alive_idx] <= params.E_SLEEP
+        state.kill(alive_idx[exhausted])
+        state.energy[alive_idx[~exhausted]] -= params.E_SLEEP
+        t = profiler.lap('sleep', t)
+
+        alive_nodes = int(state.alive.sum())
+        metrics.push(round_num + 1, alive_nodes, float(state.energy[state.alive].sum()) / num_nodes,
+                     0, sent_direct, sent_to_relay, delivered)
+        profiler.count('packets', sent_direct + sent_to_relay)
+        profiler.lap('stats', t)
+
+        if alive_nodes == 0:
+            break
+
+    profiler.count('tree_repaired_nodes', tree.repaired - num_nodes)
+
+    log.summary("\n--- Fim da Simulação (Após {} rodadas) ---", round_num + 1)
+    show_final_results(state, base_station, log)
+
+    media_vida_nos = int(state.rounds_alive.sum()) / num_nodes
+    log.summary("Média de rodadas vividas por nó: {:.2f}", media_vida_nos)
+
+    result = metrics.close()
+    result.profile = profiler if profiler.enabled else None
+    return SimulationResult((state, base_station, result.alive, result.mean_energy, media_vida_nos, first_node_death_round),
+                            result)
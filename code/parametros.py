@@ -0,0 +1,34 @@
+'''
+Parâmetros de energia e de eleição usados pelas simulações.
+
+Os valores padrão são os do artigo do EESRA, para comparação leal (https://ieeexplore.ieee.org/document/8765561).
+Cada simulate_* recebe um SimulationParams, então simulações com parâmetros diferentes podem
+rodar no mesmo processo sem alterar constantes globais.
+'''
+from dataclasses import dataclass, asdict, fields, replace
+
+@dataclass(frozen=True)
+class SimulationParams:
+    E_ELEC: float = 50e-9       # J/bit (Energia para eletrônica)
+    E_FS: float = 10e-12        # J/bit/m² (Energia para espaço livre)
+    E_MP: float = 0.0013e-12    # J/bit/m^4 (Energia para multi-percurso)
+    D_THRESHOLD: float = 75     # Metros (Limiar de distância para modelo de energia)
+    E_DA: float = 5e-9          # J/bit (Energia para agregação de dados)
+    PACKET_SIZE: int = 2000     # bits (Tamanho do pacote)
+    INITIAL_ENERGY: float = 2.0 # Joules (Energia inicial dos nós)
+    P: float = 0.3              # Probabilidade de um nó se tornar CH (fixa)
+    E_SENSE: float = 8e-5       # Joules por leitura (energia do sensoriamento, uma vez por rodada)
+    E_SLEEP: float = 15e-10     # Joules por intervalo de sleep
+    NETWORK_FUNCTIONAL_THRESHOLD: float = 0.12
+
+    def replace(self, **changes):
+        return replace(self, **changes)
+
+    def as_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def field_names(cls):
+        return [f.name for f in fields(cls)]
+
+DEFAULT_PARAMS = SimulationParams()
@@ -0,0 +1,79 @@
+'''
+Instrumentação opcional das fases da rodada.
+
+Com profile=True (ou um PhaseProfiler) as simulações acumulam o tempo de parede e a quantidade de
+execuções de cada fase (set-up dos clusters, sensoriamento, transmissões dos membros, agregação
+nos CHs, sleep e estatísticas) e contadores como pacotes enviados e distâncias calculadas pelo
+cache de custos. Sem instrumentação é usado o NULL_PROFILER, cujos métodos não fazem nada: o custo
+é de algumas chamadas vazias por rodada (nunca por sensor), então ele pode ficar nas varreduras.
+
+O perfil fica em .profile do valor devolvido pela simulação (metricas.SimulationResult, que continua
+sendo a tupla de sempre) e em sink.result.profile do coletor de métricas:
+
+    result = simulate_leach(arquivo, 100, profile=True)
+    result.profile.show()
+'''
+from time import perf_counter
+
+from registro import make_log
+
+class PhaseProfiler:
+    enabled = True
+
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+        self.counters = {}
+
+    def start(self):
+        return perf_counter()
+
+    def lap(self, phase, started):
+        '''Soma o tempo desde started à fase e retorna o instante atual (início da próxima fase).'''
+        now = perf_counter()
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + (now - started)
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        return now
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def as_dict(self):
+        return {'seconds': dict(self.seconds), 'calls': dict(self.calls), 'counters': dict(self.counters)}
+
+    def table(self):
+        total = sum(self.seconds.values())
+        lines = [f"{'Fase':<14} {'Tempo (s)':>10} {'%':>6} {'Execuções':>10} {'ms/execução':>12}"]
+        for phase, seconds in sorted(self.seconds.items(), key=lambda item: -item[1]):
+            calls = self.calls[phase]
+            share = 100 * seconds / total if total > 0 else 0.0
+            lines.append(f"{phase:<14} {seconds:>10.4f} {share:>6.1f} {calls:>10} {1000 * seconds / calls:>12.4f}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name}: {value}")
+        return '\n'.join(lines)
+
+    def show(self, log=None):
+        make_log(log).summary("{}", self.table())
+
+class NullProfiler:
+    '''Perfil desativado: mesma interface do PhaseProfiler, sem medir nada.'''
+    enabled = False
+
+    def start(self):
+        return 0.0
+
+    def lap(self, phase, started):
+        return 0.0
+
+    def count(self, name, amount=1):
+        pass
+
+NULL_PROFILER = NullProfiler()
+
+def make_profiler(profile=None):
+    '''Retorna o perfil informado, cria um com True ou, com None/False, o perfil desativado.'''
+    if profile is None or profile is False:
+        return NULL_PROFILER
+    if profile is True:
+        return PhaseProfiler()
+    return profile
@@ -0,0 +1,74 @@
+'''
+Registro de eventos das simulações com níveis de detalhe.
+
+Níveis: SILENT (nada), SUMMARY (início e resultados finais), ROUND (resumo de cada rodada) e
+PACKET (também os alertas de cada leitura recebida pela ERB). As mensagens são modelos de
+str.format e só são formatadas quando o nível delas está habilitado, então uma execução em
+SILENT não paga o custo de montar nenhuma linha.
+
+Além do terminal, as mensagens podem ir para um buffer em memória (as últimas buffer_size
+linhas) ou para um arquivo com rotação por tamanho.
+'''
+import logging
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+SILENT = 0
+SUMMARY = 1
+ROUND = 2
+PACKET = 3
+
+# Tamanho máximo (bytes) de cada arquivo de registro antes da rotação
+MAX_LOG_BYTES = 10 * 1024 * 1024
+
+class SimulationLog:
+    def __init__(self, level=PACKET, echo=True, buffer_size=None, file_path=None,
+                 max_bytes=MAX_LOG_BYTES, backup_count=3):
+        self.level = level
+        self.echo = echo
+        self.buffer = deque(maxlen=buffer_size) if buffer_size is not None else None
+
+        self._file = None
+        if file_path is not None:
+            self._file = logging.Logger(f'rssf:{file_path}')
+            handler = RotatingFileHandler(file_path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._file.addHandler(handler)
+
+    def enabled(self, level):
+        return level <= self.level
+
+    def write(self, level, message, *args):
+        if level > self.level:
+            return
+        if args:
+            message = message.format(*args)
+        if self.echo:
+            print(message)
+        if self.buffer is not None:
+            self.buffer.append(message)
+        if self._file is not None:
+            self._file.info(message)
+
+    def summary(self, message, *args):
+        self.write(SUMMARY, message, *args)
+
+    def round(self, message, *args):
+        self.write(ROUND, message, *args)
+
+    def packet(self, message, *args):
+        self.write(PACKET, message, *args)
+
+    def close(self):
+        if self._file is not None:
+            for handler in list(self._file.handlers):
+                handler.close()
+                self._file.removeHandler(handler)
+
+def make_log(log=None):
+    '''Retorna o registro informado, cria um com o nível dado ou, com None, um que imprime tudo no terminal.'''
+    if isinstance(log, SimulationLog):
+        return log
+    if log is None:
+        return SimulationLog()
+    return SimulationLog(level=log)
@@ -0,0 +1,145 @@
+'''
+Armazenamento das leituras e alertas recebidos pela ERB com memória limitada.
+
+Guardar toda temperatura recebida faz a memória crescer com N·rodadas. Por padrão a ERB mantém
+apenas estatísticas por nó (quantidade, mínimo, máximo e média, atualizadas pelo método de
+Welford) e os alertas mais recentes; a retenção completa continua disponível, mas só quando
+pedida explicitamente (FULL_RETENTION).
+
+Modos das leituras: 'stats' (só estatísticas), 'recent' (estatísticas e as últimas recent_size
+leituras de cada nó) e 'full' (estatísticas e todas as leituras).
+Modos dos alertas: 'capped' (os últimos max_alerts), 'dedup' (o primeiro alerta de cada nó,
+com a contagem e a maior temperatura por nó) e 'full' (todos).
+'''
+import math
+from collections import deque
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    readings: str = 'stats'
+    recent_size: int = 16
+    alerts: str = 'capped'
+    max_alerts: int = 1000
+
+DEFAULT_RETENTION = RetentionPolicy()
+FULL_RETENTION = RetentionPolicy(readings='full', alerts='full')
+
+class NodeStats:
+    '''Estatísticas de uma sequência de leituras, atualizadas uma a uma (Welford).'''
+    __slots__ = ('count', 'min', 'max', 'mean', 'm2')
+
+    def __init__(self):
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def extend(self, values):
+        '''Mesmo resultado de update() em cada valor, com os acumuladores em variáveis locais (uma chamada por pacote).'''
+        count, mean, m2, low, high = self.count, self.mean, self.m2, self.min, self.max
+        for value in values:
+            count += 1
+            delta = value - mean
+            mean += delta / count
+            m2 += delta * (value - mean)
+            if value < low:
+                low = value
+            if value > high:
+                high = value
+        self.count, self.mean, self.m2, self.min, self.max = count, mean, m2, low, high
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+class ReadingStore:
+    '''Leituras recebidas por nó. store[node_id] devolve as leituras retidas (vazio no modo 'stats').'''
+    def __init__(self, mode='stats', recent_size=16):
+        if mode not in ('stats', 'recent', 'full'):
+            raise ValueError(f"Modo de retenção de leituras desconhecido: {mode}")
+        self.mode = mode
+        self.recent_size = recent_size
+        self.stats = {}
+        self._readings = {}
+        self.total = 0
+
+    def extend(self, node_id, data):
+        stats = self.stats.get(node_id)
+        if stats is None:
+            stats = self.stats[node_id] = NodeStats()
+        stats.extend(data)
+        self.total += len(data)
+
+        if self.mode == 'stats':
+            return
+        readings = self._readings.get(node_id)
+        if readings is None:
+            readings = self._readings[node_id] = [] if self.mode == 'full' else deque(maxlen=self.recent_size)
+        readings.extend(data)
+
+    def __getitem__(self, node_id):
+        return list(self._readings.get(node_id, ()))
+
+    def __contains__(self, node_id):
+        return node_id in self.stats
+
+    def __len__(self):
+        return len(self.stats)
+
+    def keys(self):
+        return self.stats.keys()
+
+class AlertStore:
+    '''Alertas recebidos. len() é sempre o total de alertas, mesmo quando só uma parte é guardada.'''
+    def __init__(self, mode='capped', max_alerts=1000):
+        if mode not in ('capped', 'dedup', 'full'):
+            raise ValueError(f"Modo de retenção de alertas desconhecido: {mode}")
+        self.mode = mode
+        self.count = 0
+        self.per_node = {}  # node_id -> [quantidade, maior temperatura] (modo 'dedup')
+        if mode == 'capped':
+            self._alerts = deque(maxlen=max_alerts)
+        else:
+            self._alerts = []
+
+    def append(self, alert):
+        self.count += 1
+        if self.mode != 'dedup':
+            self._alerts.append(alert)
+            return
+
+        node_id, temp = alert
+        seen = self.per_node.get(node_id)
+        if seen is None:
+            self.per_node[node_id] = [1, temp]
+            self._alerts.append(alert)
+        else:
+            seen[0] += 1
+            seen[1] = max(seen[1], temp)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self._alerts)
+
+    def retained(self):
+        return list(self._alerts)
+
+def make_stores(retention=None):
+    '''Cria o armazenamento de leituras e de alertas de uma ERB a partir da política (None = padrão).'''
+    retention = retention or DEFAULT_RETENTION
+    return (ReadingStore(retention.readings, retention.recent_size),
+            AlertStore(retention.alerts, retention.max_alerts))
@@ -0,0 +1,101 @@
+'''
+Leitura das topologias (posição da ERB e dos sensores) usada por todos os protocolos.
+
+Dois formatos são aceitos:
+
+- texto (dataset/*.txt): quantidade de nós na primeira linha, posição da ERB na segunda e uma
+  linha "x, y" por sensor (aspas e vírgulas são ignoradas);
+- binário: um cabeçalho fixo (TOPOLOGY_HEADER, 40 bytes) com a quantidade de nós e a posição da
+  ERB, seguido das coordenadas em float64 (x0, y0, x1, y1, ...). O arquivo é aberto com
+  np.memmap, então redes com milhões de sensores são carregadas sem analisar texto e as páginas
+  só são lidas quando usadas.
+
+read_coordinates_from_file identifica o formato pelo número mágico do arquivo e devolve sempre
+(num_nodes, bs_pos, coords), com coords em um array (N, 2).
+'''
+import os
+
+import numpy as np
+
+TOPOLOGY_MAGIC = b'RSSFTOPO'
+TOPOLOGY_VERSION = 1
+TOPOLOGY_HEADER = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('reserved', '<u4'),
+    ('num_nodes', '<u8'),
+    ('bs', '<f8', (2,)),
+])
+
+def is_binary_topology(file_path):
+    with open(file_path, 'rb') as file:
+        return file.read(len(TOPOLOGY_MAGIC)) == TOPOLOGY_MAGIC
+
+def _parse_pair(line):
+    parts = line.replace('"', '').replace("'", "").replace(',', ' ').split()
+    return float(parts[0]), float(parts[1])
+
+def read_text_topology(file_path):
+    '''Lê o formato texto. As linhas dos sensores são convertidas de uma vez só pelo NumPy.'''
+    with open(file_path, 'r') as file:
+        num_nodes = int(file.readline().strip())
+        bs_pos = _parse_pair(file.readline().strip())
+        # Lê as próximas num_nodes linhas, ignorando as vazias (como a leitura original, linha a linha)
+        lines = [line for line in (file.readline().strip() for _ in range(num_nodes)) if line]
+
+    text = ' '.join(lines).replace('"', '').replace("'", "").replace(',', ' ')
+    values = np.array(text.split(), dtype=np.float64)
+    if len(values) == 2 * len(lines):
+        coords = values.reshape(-1, 2)
+    else:
+        # Alguma linha tem mais de duas colunas: usa só as duas primeiras de cada linha
+        coords = np.array([_parse_pair(line) for line in lines], dtype=np.float64).reshape(-1, 2)
+    return num_nodes, bs_pos, coords
+
+def read_binary_topology(file_path):
+    '''Abre o formato binário; as coordenadas ficam mapeadas em memória (somente leitura).'''
+    header = np.fromfile(file_path, dtype=TOPOLOGY_HEADER, count=1)
+    if len(header) == 0 or header['magic'][0] != TOPOLOGY_MAGIC:
+        raise ValueError(f"{file_path} não é uma topologia binária")
+    if header['version'][0] != TOPOLOGY_VERSION:
+        raise ValueError(f"Versão de topologia binária não suportada: {header['version'][0]}")
+
+    num_nodes = int(header['num_nodes'][0])
+    bs_pos = (float(header['bs'][0][0]), float(header['bs'][0][1]))
+    if num_nodes == 0:
+        return num_nodes, bs_pos, np.zeros((0, 2), dtype=np.float64)
+    coords = np.memmap(file_path, dtype='<f8', mode='r', offset=TOPOLOGY_HEADER.itemsize, shape=(num_nodes, 2))
+    return num_nodes, bs_pos, coords
+
+def write_binary_topology(file_path, bs_pos, coords):
+    coords = np.ascontiguousarray(coords, dtype='<f8').reshape(-1, 2)
+    header = np.zeros(1, dtype=TOPOLOGY_HEADER)
+    header['magic'] = TOPOLOGY_MAGIC
+    header['version'] = TOPOLOGY_VERSION
+    header['num_nodes'] = len(coords)
+    header['bs'] = bs_pos
+    with open(file_path, 'wb') as file:
+        file.write(header.tobytes())
+        file.write(coords.tobytes())
+
+def write_text_topology(file_path, bs_pos, coords):
+    '''Grava no formato texto de dataset/ (os valores são escritos com repr, sem perda de precisão).'''
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    with open(file_path, 'w') as file:
+        file.write(f"{len(coords)}\n")
+        file.write(f"{float(bs_pos[0])!r}, {float(bs_pos[1])!r}\n")
+        file.writelines(f"{x!r}, {y!r}\n" for x, y in coords.tolist())
+
+def convert_text_to_binary(text_path, binary_path=None):
+    '''Converte uma topologia em texto para o formato binário (por padrão, troca .txt por .topo).'''
+    if binary_path is None:
+        binary_path = os.path.splitext(text_path)[0] + '.topo'
+    _, bs_pos, coords = read_text_topology(text_path)
+    write_binary_topology(binary_path, bs_pos, coords)
+    return binary_path
+
+def read_coordinates_from_file(file_path):
+    '''Lê uma topologia em qualquer um dos formatos e retorna (num_nodes, bs_pos, coords).'''
+    if is_binary_topology(file_path):
+        return read_binary_topology(file_path)
+    return read_text_topology(file_path)
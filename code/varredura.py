@@ -0,0 +1,121 @@
+'''
+Varredura de parâmetros: executa os protocolos para cada conjunto de parâmetros de uma grade
+ou de um hipercubo latino, distribuindo as simulações entre processos.
+
+Cada simulação concluída vira uma linha do CSV de resultados, gravada assim que termina. Ao
+rodar de novo com o mesmo arquivo, as linhas já presentes são puladas, então uma varredura
+interrompida continua de onde parou.
+'''
+import csv
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+from aleatorio import seed_label
+from cache_resultados import file_digest, make_cache
+from monte_carlo import PROTOCOLOS, replica_seeds, run_replica
+from parametros import DEFAULT_PARAMS, SimulationParams
+
+METRICAS = ['vida_util', 'media_vida_nos', 'first_node_death_round']
+
+def grid(base=DEFAULT_PARAMS, **axes):
+    '''Produto cartesiano dos valores de cada parâmetro, ex.: grid(P=[0.1, 0.2], INITIAL_ENERGY=[1, 2]).'''
+    names = list(axes)
+    return [base.replace(**dict(zip(names, values))) for values in itertools.product(*(axes[n] for n in names))]
+
+def latin_hypercube(n, ranges, seed=0, base=DEFAULT_PARAMS):
+    '''n conjuntos de parâmetros amostrados por hipercubo latino nos intervalos ranges = {nome: (mín, máx)}.'''
+    rng = np.random.default_rng(seed)
+    names = list(ranges)
+    columns = {}
+    for name in names:
+        low, high = ranges[name]
+        # Um ponto em cada um dos n estratos, com os estratos embaralhados de forma independente por parâmetro
+        u = (rng.permutation(n) + rng.random(n)) / n
+        columns[name] = low + u * (high - low)
+
+    types = {name: SimulationParams.__dataclass_fields__[name].type for name in names}
+    param_sets = []
+    for i in range(n):
+        changes = {}
+        for name in names:
+            value = float(columns[name][i])
+            changes[name] = int(round(value)) if types[name] in (int, 'int') else value
+        param_sets.append(base.replace(**changes))
+    return param_sets
+
+def _row_key(dataset_digest, num_rounds, params, protocolo, seed):
+    '''Chave estável de uma simulação, usada para pular as linhas já gravadas ao retomar.
+
+    Inclui o conteúdo da topologia (cache_resultados.file_digest) e a quantidade de rodadas, então
+    varreduras de outra topologia ou com outro número de rodadas no mesmo CSV não se confundem.
+    '''
+    return json.dumps([dataset_digest, num_rounds, params.as_dict(), protocolo, seed_label(seed)], sort_keys=True)
+
+def _completed_keys(output_csv, header):
+    if not os.path.exists(output_csv) or os.path.getsize(output_csv) == 0:
+        return set()
+    with open(output_csv, newline='') as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames != header:
+            raise ValueError(f"{output_csv} tem colunas diferentes das desta varredura; use outro arquivo.")
+        return {row['key'] for row in reader}
+
+def _run_job(job):
+    protocolo, file_path, num_rounds, seed, params, cache = job
+    result = run_replica(protocolo, file_path, num_rounds, seed, params, cache)
+    return {name: result[name] for name in METRICAS}
+
+def run_sweep(file_path, num_rounds, param_sets, output_csv, protocolos=tuple(PROTOCOLOS), replicas=1,
+              base_seed=0, max_workers=None, cache=None):
+    '''Executa todas as combinações (parâmetros, protocolo, semente) e grava cada resultado em output_csv.
+
+    Com cache (ver cache_resultados.make_cache), as simulações já guardadas são lidas do disco em
+    vez de executadas, ex.: para refazer o CSV de uma varredura depois de apagá-lo.
+
+    Retorna a quantidade de simulações executadas nesta chamada.
+    '''
+    seeds = replica_seeds(base_seed, replicas)
+    cache = make_cache(cache)
+    header = ['key', 'dataset', 'num_rounds', 'protocolo', 'seed'] + SimulationParams.field_names() + METRICAS
+    done = _completed_keys(output_csv, header)
+    dataset_digest = file_digest(file_path)
+    jobs = {}
+    for params in param_sets:
+        for protocolo in protocolos:
+            for seed in seeds:
+                key = _row_key(dataset_digest, num_rounds, params, protocolo, seed)
+                if key not in done and key not in jobs:
+                    jobs[key] = (protocolo, file_path, num_rounds, seed, params, cache)
+
+    if not jobs:
+        return 0
+
+    write_header = not os.path.exists(output_csv) or os.path.getsize(output_csv) == 0
+    executed = 0
+
+    with open(output_csv, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=header)
+        if write_header:
+            writer.writeheader()
+            f.flush()
+
+        executor = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1)
+        try:
+            futures = {executor.submit(_run_job, job): key for key, job in jobs.items()}
+            for future in as_completed(futures):
+                protocolo, _, _, seed, params, _ = jobs[futures[future]]
+                metrics = future.result()
+                writer.writerow({'key': futures[future], 'dataset': file_path, 'num_rounds': num_rounds,
+                                 'protocolo': protocolo, 'seed': seed_label(seed),
+                                 **params.as_dict(), **metrics})
+                f.flush()
+                executed += 1
+        finally:
+            # Com erro em uma simulação ou interrupção, as linhas já gravadas ficam no arquivo e as
+            # simulações pendentes são descartadas
+            executor.shutdown(cancel_futures=True)
+
+    return executed
@@ -0,0 +1,427 @@
+'''
+Motor vetorizado (struct-of-arrays) para os protocolos LEACH e E-LEACH.
+
+O estado de todos os sensores é mantido em arrays NumPy e cada fase da rodada
+(set-up, sensoriamento, envio ao CH, agregação e sleep) é executada como uma
+operação mascarada sobre esses arrays, em vez de um laço sobre objetos SensorNode.
+As regras de energia e os sorteios em lote são os mesmos de LEACH.py e ELEACH.py,
+então, para a mesma semente (rng), os resultados são equivalentes.
+'''
+import numpy as np
+
+from aleatorio import make_rng
+from parametros import DEFAULT_PARAMS
+from registro import make_log
+from metricas import SimulationResult, make_sink
+from perfil import make_profiler
+from custos import cost_cache_for
+from espacial import QuadTreeIndex
+from topologia import read_coordinates_from_file
+
+# Estado da rede em formato struct-of-arrays. O índice i de cada array corresponde ao sensor de node_id i.
+class SensorArrays:
+    def __init__(self, sensor_coords, bs_pos, costs=None, params=DEFAULT_PARAMS, rng=None):
+        coords = np.asarray(sensor_coords, dtype=np.float64).reshape(-1, 2)
+        num_nodes = len(coords)
+
+        self.num_nodes = num_nodes
+        self.params = params
+        self.rng = make_rng(rng)
+        self.x = coords[:, 0].copy()
+        self.y = coords[:, 1].copy()
+        self.bs_x, self.bs_y = bs_pos
+        self.energy = np.full(num_nodes, params.INITIAL_ENERGY, dtype=np.float64)
+        self.alive = np.ones(num_nodes, dtype=bool)
+        self.is_cluster_head = np.zeros(num_nodes, dtype=bool)
+        self.cluster_head = np.full(num_nodes, -1, dtype=np.int64)  # -1 = sem CH
+        self.is_direct = np.zeros(num_nodes, dtype=bool)
+        self.last_ch_round = np.full(num_nodes, -1, dtype=np.int64)
+        self.rounds_alive = np.zeros(num_nodes, dtype=np.int64)
+
+        # Leituras sensoriadas que ainda não chegaram à ERB (e quantas delas são alertas)
+        self.pending_readings = np.zeros(num_nodes, dtype=np.int64)
+        self.pending_alerts = np.zeros(num_nodes, dtype=np.int64)
+
+        # As posições não mudam, então a distância e o custo de envio à ERB vêm do cache de custos
+        costs = cost_cache_for(costs, coords, bs_pos, params)
+        self.costs = costs
+        self.dist_to_bs = costs.bs_distance
+        self.tx_to_bs = params.PACKET_SIZE * costs.bs_per_bit
+        self.dist_to_ch = np.zeros(num_nodes, dtype=np.float64)
+        self.member_count = np.zeros(num_nodes, dtype=np.int64)
+
+    def kill(self, idx):
+        self.alive[idx] = False
+        self.energy[idx] = 0
+
+# Equivalente à BaseStation, mas guarda apenas os totais de leituras e alertas recebidos
+class BaseStationSummary:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.energy = float('inf')
+        self.readings_received = 0
+        self.alert_count = 0
+
+    def receive_from(self, state, idx):
+        self.readings_received += int(state.pending_readings[idx].sum())
+        self.alert_count += int(state.pending_alerts[idx].sum())
+        state.pending_readings[idx] = 0
+        state.pending_alerts[idx] = 0
+
+# Versão vetorizada de SensorNode.transmit_energy (k e d podem ser arrays)
+def transmit_energy(k, d, params=DEFAULT_PARAMS):
+    d = np.asarray(d, dtype=np.float64)
+    return np.where(d <= params.D_THRESHOLD, k * (params.E_ELEC + params.E_FS * d**2), k * (params.E_ELEC + params.E_MP * d**4))
+
+def elect_leach(state, round_num):
+    '''Seleção de CHs usando o limiar T(n) do LEACH original'''
+    params = state.params
+    alive_idx = np.flatnonzero(state.alive)
+    # Um sorteio por sensor vivo, como em setup_leach
+    draws = state.rng.random(len(alive_idx))
+    eligible = (round_num - state.last_ch_round[alive_idx]) >= 1/params.P
+    return alive_idx[eligible & (params.P/(1 - params.P * (round_num % (1/params.P))) > draws)]
+
+def elect_eleach(state, round_num):
+    '''Seleção de CHs usando o limiar do E-LEACH, que considera a energia residual'''
+    params = state.params
+    alive_idx = np.flatnonzero(state.alive)
+    # Um sorteio por sensor vivo, como em setup_eleach
+    draws = state.rng.random(len(alive_idx))
+    eligible = (round_num - state.last_ch_round[alive_idx]) >= 1/params.P
+    high_energy = state.energy[alive_idx] > params.INITIAL_ENERGY * 0.5
+
+    # Sensores elegíveis com pouca energia não podem ser eleitos
+    leach_threshold = params.P/(1 - params.P * (round_num % (1/params.P)))
+    energy_threshold = 2 * params.P * (state.energy[alive_idx]/params.INITIAL_ENERGY)
+    elected = np.where(eligible, high_energy & (leach_threshold > draws), energy_threshold >= draws)
+    return alive_idx[elected]
+
+def optimal_cluster_count(num_nodes, field_side, mean_dist_to_bs, params=DEFAULT_PARAMS):
+    '''Quantidade ótima de clusters do modelo de energia do LEACH-C:
+    k = sqrt(N / 2π) · sqrt(E_FS / E_MP) · M / d_ERB², limitada a [1, N].'''
+    if num_nodes == 0:
+        return 0
+    k = (np.sqrt(num_nodes / (2 * np.pi)) * np.sqrt(params.E_FS / params.E_MP)
+         * field_side / max(mean_dist_to_bs, 1e-9)**2)
+    return int(min(max(round(k), 1), num_nodes))
+
+class KMeansElection:
+    '''Eleição centralizada de CHs (como no LEACH-C) por k-means ponderado pela energia residual.
+
+    A cada rodada, k vem de optimal_cluster_count para os sensores vivos (ou é fixo, com
+    num_clusters). Os centroides partem dos da rodada anterior e passam por iterações de Lloyd
+    em lote (atribuição por produto de matrizes em blocos e argmin, média ponderada com bincount)
+    até se deslocarem menos que tolerance · lado do campo; na primeira rodada, ou quando k cresce,
+    os centroides que faltam são sorteados por k-means++. O CH de cada cluster é o sensor vivo mais próximo do
+    centroide entre os que têm energia acima da média.
+    '''
+    def __init__(self, num_clusters=None, max_iterations=20, tolerance=1e-3):
+        self.num_clusters = num_clusters
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+        self.centroids = None
+        self.iterations = 0
+
+    def _seed(self, x, y, weights, centroids, k, rng):
+        '''Completa centroids até k pontos com k-means++ (probabilidade proporcional a peso · distância²).'''
+        if len(centroids) == 0:
+            first = rng.choice(len(x), p=weights / weights.sum())
+            centroids = np.array([[x[first], y[first]]])
+        d2 = np.min((x[:, None] - centroids[:, 0])**2 + (y[:, None] - centroids[:, 1])**2, axis=1)
+        chosen = [centroids]
+        while sum(len(c) for c in chosen) < k:
+            score = weights * d2
+            total = score.sum()
+            pick = rng.choice(len(x), p=score / total) if total > 0 else rng.integers(len(x))
+            chosen.append(np.array([[x[pick], y[pick]]]))
+            d2 = np.minimum(d2, (x - x[pick])**2 + (y - y[pick])**2)
+        return np.concatenate(chosen)
+
+    @staticmethod
+    def _assign(points, centroids, block=16384):
+        '''Posição do centroide mais próximo de cada ponto. Com k na casa das dezenas a comparação com
+        todos os centroides sai mais barata que montar um índice a cada iteração; |p - c|² é ordenado
+        por |c|² - 2 p·c, um produto de matrizes por bloco de pontos.'''
+        label = np.empty(len(points), dtype=np.int64)
+        norms = (centroids**2).sum(axis=1)
+        for start in range(0, len(points), block):
+            scores = points[start:start + block] @ (-2 * centroids.T)
+            scores += norms
+            label[start:start + block] = scores.argmin(axis=1)
+        return label
+
+    def __call__(self, state, round_num):
+        alive_idx = np.flatnonzero(state.alive)
+        if len(alive_idx) == 0:
+            return alive_idx
+        x, y = state.x[alive_idx], state.y[alive_idx]
+        weights = np.maximum(state.energy[alive_idx], 0)
+        if weights.sum() <= 0:
+            weights = np.ones(len(alive_idx))
+
+        k = self.num_clusters
+        if k is None:
+            field_side = np.sqrt(max(np.ptp(x) * np.ptp(y), 1.0))
+            k = optimal_cluster_count(len(alive_idx), field_side, float(state.dist_to_bs[alive_idx].mean()), state.params)
+        k = min(k, len(alive_idx))
+
+        # Início a quente: os centroides da rodada anterior, com os de maior peso primeiro
+        centroids = np.empty((0, 2)) if self.centroids is None else self.centroids[:k]
+        if len(centroids) < k:
+            centroids = self._seed(x, y, weights, centroids, k, state.rng)
+
+        limit = self.tolerance * max(np.ptp(x), np.ptp(y), 1.0)
+        points = np.column_stack((x, y))
+        for _ in range(self.max_iterations):
+            self.iterations += 1
+            label = self._assign(points, centroids)
+            mass = np.bincount(label, weights=weights, minlength=k)
+            moved = centroids.copy()
+            filled = mass > 0
+            moved[filled, 0] = np.bincount(label, weights=weights * x, minlength=k)[filled] / mass[filled]
+            moved[filled, 1] = np.bincount(label, weights=weights * y, minlength=k)[filled] / mass[filled]
+            shift = np.sqrt(((moved - centroids)**2).sum(axis=1)).max()
+            centroids = moved
+            if shift < limit:
+                break
+
+        order = np.argsort(-np.bincount(label, weights=weights, minlength=k), kind='stable')
+        self.centroids = centroids[order]
+
+        # CH: o sensor com energia acima da média mais próximo de cada centroide
+        eligible = alive_idx[weights >= weights.mean()]
+        pos = self._assign(centroids, np.column_stack((state.x[eligible], state.y[eligible])))
+        return np.unique(eligible[pos])
+
+# Busca, para cada sensor em members, o CH mais próximo (em caso de empate, o de menor índice)
+def nearest_cluster_head(state, members, heads):
+    index = QuadTreeIndex(state.x[heads], state.y[heads])
+    pos, distances = index.nearest(state.x[members], state.y[members])
+    return heads[pos], distances
+
+def setup_clusters(state, round_num, elect):
+    '''Fase de set-up: elege os CHs e associa cada sensor ao CH mais próximo ou à ERB'''
+    state.is_cluster_head[:] = False
+    state.cluster_head[:] = -1
+    state.is_direct[:] = False
+    state.member_count[:] = 0
+
+    if not state.alive.any():
+        return np.empty(0, dtype=np.int64)
+
+    heads = elect(state, round_num)
+    state.is_cluster_head[heads] = True
+    state.last_ch_round[heads] = round_num
+
+    members = np.flatnonzero(state.alive & ~state.is_cluster_head)
+    if len(heads) == 0:
+        # Caso não exista nenhum cluster head, os nós enviam diretamente para a ERB
+        state.is_direct[members] = True
+        return heads
+
+    closest, dist_to_ch = nearest_cluster_head(state, members, heads)
+
+    # Caso a distância entre o sensor e a ERB seja menor que o sensor e o CH, envie diretamente para a ERB
+    direct = state.dist_to_bs[members] < dist_to_ch
+    state.is_direct[members[direct]] = True
+    attached = members[~direct]
+    state.cluster_head[attached] = closest[~direct]
+    state.dist_to_ch[attached] = dist_to_ch[~direct]
+    state.member_count += np.bincount(closest[~direct], minlength=state.num_nodes)
+
+    return heads
+
+def sense_phase(state):
+    '''Todos os nós vivos sensoriam; quem não tem energia para sensoriar morre'''
+    params = state.params
+    active = np.flatnonzero(state.alive)
+    state.rounds_alive[active] += 1
+    temps = state.rng.uniform(20, 70, len(active))
+
+    broke = state.energy[active] < params.E_SENSE
+    state.kill(active[broke])
+
+    sensed = active[~broke]
+    state.energy[sensed] -= params.E_SENSE
+    state.pending_readings[sensed] += 1
+    state.pending_alerts[sensed] += temps[~broke] > 60
+
+def send_direct_phase(state, base_station):
+    '''Sensores marcados como diretos enviam suas leituras à ERB'''
+    senders = np.flatnonzero(state.alive & state.is_direct & (state.pending_readings > 0))
+    cost = state.tx_to_bs[senders]
+
+    broke = state.energy[senders] < cost
+    state.kill(senders[broke])
+
+    sent = senders[~broke]
+    state.energy[sent] -= cost[~broke]
+    base_station.receive_from(state, sent)
+    state.kill(sent[state.energy[sent] <= 0])
+    return len(sent)
+
+def send_to_cluster_head_phase(state):
+    '''Membros enviam suas leituras ao CH, respeitando a energia de recepção restante de cada CH'''
+    params = state.params
+    senders = np.flatnonzero(state.alive & (state.cluster_head >= 0) & (state.pending_readings > 0))
+    senders = senders[state.alive[state.cluster_head[senders]]]
+    tx_cost = transmit_energy(params.PACKET_SIZE, state.dist_to_ch[senders], params)
+
+    broke = state.energy[senders] < tx_cost
+    state.kill(senders[broke])
+    able = senders[~broke]
+    tx_cost = tx_cost[~broke]
+    heads = state.cluster_head[able]
+
+    # No laço original os membros chegam ao CH na ordem dos node_ids e o CH recusa pacotes
+    # assim que sua energia fica abaixo do custo de recepção: calcula a posição de cada membro na fila do seu CH
+    order = np.argsort(heads, kind='stable')
+    sorted_heads = heads[order]
+    rank = np.empty(len(able), dtype=np.int64)
+    rank[order] = np.arange(len(able)) - np.searchsorted(sorted_heads, sorted_heads, side='left')
+
+    rx_cost = params.PACKET_SIZE * params.E_ELEC
+    capacity = np.floor(np.maximum(state.energy[heads], 0) / rx_cost)
+    accepted = rank < capacity
+
+    sent = able[accepted]
+    sent_heads = heads[accepted]
+    state.energy[sent] -= tx_cost[accepted]
+
+    received = np.bincount(sent_heads, minlength=state.num_nodes)
+    state.energy -= received * rx_cost
+    state.pending_readings += np.bincount(sent_heads, weights=state.pending_readings[sent],
+                                          minlength=state.num_nodes).astype(np.int64)
+    state.pending_alerts += np.bincount(sent_heads, weights=state.pending_alerts[sent],
+                                        minlength=state.num_nodes).astype(np.int64)
+    state.pending_readings[sent] = 0
+    state.pending_alerts[sent] = 0
+
+    touched = np.concatenate((sent, np.unique(sent_heads)))
+    state.kill(touched[state.energy[touched] <= 0])
+    return len(sent)
+
+def send_aggregated_phase(state, base_station, heads):
+    '''CHs enviam à ERB os dados agregados dos sensores membros do cluster'''
+    params = state.params
+    heads = heads[state.alive[heads] & (state.pending_readings[heads] > 0)]
+    aggregate_cost = state.member_count[heads] * params.PACKET_SIZE * params.E_DA
+    cost = transmit_energy(params.PACKET_SIZE + aggregate_cost, state.dist_to_bs[heads], params)
+
+    broke = state.energy[heads] < cost
+    state.kill(heads[broke])
+
+    sent = heads[~broke]
+    state.energy[sent] -= cost[~broke]
+    base_station.receive_from(state, sent)
+    state.kill(sent[state.energy[sent] <= 0])
+    return len(sent)
+
+def _simulate(file_path, num_rounds, elect, protocol_name, costs=None, params=DEFAULT_PARAMS, rng=None, log=None, metrics=None, profile=None):
+    num_nodes, bs_pos, sensor_coords = read_coordinates_from_file(file_path)
+    log = make_log(log)
+    metrics = make_sink(metrics)
+    profiler = make_profiler(profile)
+
+    base_station = BaseStationSummary(bs_pos[0], bs_pos[1])
+    state = SensorArrays(sensor_coords, bs_pos, costs, params, rng)
+    distances_before = state.costs.distance_evaluations
+    num_nodes = state.num_nodes
+
+    log.summary("Iniciando simulação {} (vetorizada) com {} nós.", protocol_name, num_nodes)
+    log.summary("Energia Inicial: {} J, Pacote: {} bits, P={}", params.INITIAL_ENERGY, params.PACKET_SIZE, params.P)
+    log.summary("-" * 30)
+
+    first_node_death_round = None
+    round_num = -1
+
+    for round_num in range(num_rounds):
+        t = profiler.start()
+        alive_nodes = int(state.alive.sum())
+
+        if alive_nodes != num_nodes and first_node_death_round == None:
+            first_node_death_round = round_num + 1
+
+        if alive_nodes/num_nodes <= params.NETWORK_FUNCTIONAL_THRESHOLD:
+            break
+        t = profiler.lap('round_check', t)
+
+        # Fase de Set-Up
+        cluster_heads = setup_clusters(state, round_num, elect)
+
+        if not state.alive.any():
+            break
+        t = profiler.lap('setup', t)
+
+        # Fase de Steady-State
+        sense_phase(state)
+        t = profiler.lap('sense', t)
+        sent_direct = send_direct_phase(state, base_station)
+        sent_to_ch = send_to_cluster_head_phase(state)
+        t = profiler.lap('transmit', t)
+        sent_to_bs = send_aggregated_phase(state, base_station, cluster_heads)
+        t = profiler.lap('aggregate', t)
+
+        # representa o sensor entrar em modo sleep
+        state.energy[state.alive] -= params.E_SLEEP
+        t = profiler.lap('sleep', t)
+
+        # Estatísticas da rodada
+        alive_nodes = int(state.alive.sum())
+        metrics.push(round_num + 1, alive_nodes, float(state.energy[state.alive].sum()) / num_nodes,
+                     len(cluster_heads), sent_direct, sent_to_ch, sent_to_bs)
+        profiler.count('packets', sent_direct + sent_to_ch + sent_to_bs)
+        profiler.count('cluster_heads', len(cluster_heads))
+        profiler.lap('stats', t)
+
+        if alive_nodes == 0:
+            break
+
+    log.summary("\n--- Fim da Simulação (Após {} rodadas) ---", round_num + 1)
+    show_final_results(state, base_station, log)
+
+    media_vida_nos = int(state.rounds_alive.sum()) / num_nodes
+    log.summary("Média de rodadas vividas por nó: {:.2f}", media_vida_nos)
+
+    # Os históricos têm uma posição por rodada executada
+    profiler.count('distance_evaluations', state.costs.distance_evaluations - distances_before)
+    result = metrics.close()
+    result.profile = profiler if profiler.enabled else None
+    return SimulationResult((state, base_station, result.alive, result.mean_energy, media_vida_nos, first_node_death_round),
+                            result)
+
+'''Executa a simulação do LEACH com o motor vetorizado'''
+def simulate_leach_vetorizado(file_path, num_rounds, costs=None, params=DEFAULT_PARAMS, rng=None, log=None, metrics=None, profile=None):
+    return _simulate(file_path, num_rounds, elect_leach, 'LEACH', costs, params, rng, log, metrics, profile)
+
+'''Executa a simulação do E-LEACH com o motor vetorizado'''
+def simulate_eleach_vetorizado(file_path, num_rounds, costs=None, params=DEFAULT_PARAMS, rng=None, log=None, metrics=None, profile=None):
+    return _simulate(file_path, num_rounds, elect_eleach, 'E-LEACH', costs, params, rng, log, metrics, profile)
+
+'''Executa a simulação com eleição centralizada por k-means (KMeansElection) no motor vetorizado'''
+def simulate_kmeans_vetorizado(file_path, num_rounds, costs=None, params=DEFAULT_PARAMS, rng=None, log=None, metrics=None, profile=None,
+                               num_clusters=None):
+    elect = KMeansElection(num_clusters)
+    profiler = make_profiler(profile)
+    result = _simulate(file_path, num_rounds, elect, 'K-means', costs, params, rng, log, metrics, profiler)
+    profiler.count('kmeans_iterations', elect.iterations)
+    return result
+
+def show_final_results(state, base_station, log=None):
+    log = make_log(log)
+    num_nodes = state.num_nodes
+    alive_count = int(state.alive.sum())
+    dead_count = num_nodes - alive_count
+
+    log.summary("\n--- Resultados Finais ---")
+    log.summary("Total de alertas de incêndio: {}", base_station.alert_count)
+    log.summary("Nós Vivos: {}/{}", alive_count, num_nodes)
+    log.summary("Nós Mortos: {}/{}", dead_count, num_nodes)
+
+    if alive_count:
+        avg_energy_alive = float(state.energy[state.alive].sum()) / alive_count
+        log.summary("Energia média final dos nós vivos: {:.6f} J", avg_energy_alive)
+    else:
+        log.summary("Nenhum nó sobreviveu.")